@@ -2,6 +2,7 @@
 #include <avr/interrupt.h>
 #include <ctype.h>
 #include <string.h>
+#include <HID.h>
 #include <Keyboard.h>
 
 static const int ARM_PIN = 2;            // D2 -> GND to arm
@@ -10,8 +11,35 @@ static const int LED_PIN = LED_BUILTIN;  // on-board LED
 static bool hid_allowed = true;          // disabled if ARM held at boot
 
 static constexpr uint8_t  EOT    = 0x04;
+static constexpr uint8_t  ENQ    = 0x05;   // status poll byte, never stored
 static constexpr uint16_t BUF_SZ = 256;
 
+// ---------- LZ payloads (payload_lz.py) ----------
+// META "LZ=<n>" marks an LZ-coded payload of n wire bytes; LEN/SUM16 are
+// those of the decoded text. Matches reach back at most 256 bytes, so the
+// decoder window is a 256-byte ring indexed by a wrapping uint8_t.
+static constexpr uint8_t LZ_ESC = 0x06;
+static constexpr uint8_t LZ_MIN_MATCH = 3;
+
+// ---------- status byte shifted out on MISO ----------
+// bit7=0, bit6=1 marks a valid status (a floating MISO reads 0x00/0xFF)
+// bit0 BUSY       executing (or waiting for ARM)
+// bit1 SLOT_FULL  a received payload is waiting, next one would be dropped
+// bit2-3 RESULT   of the last finished payload
+// bit4-5 DONE     finished-payload counter, mod 4
+static constexpr uint8_t ST_VALID     = 0x40;
+static constexpr uint8_t ST_BUSY      = 0x01;
+static constexpr uint8_t ST_SLOT_FULL = 0x02;
+
+static constexpr uint8_t RES_NONE    = 0;
+static constexpr uint8_t RES_OK      = 1;
+static constexpr uint8_t RES_FAIL    = 2;   // META/length/checksum mismatch
+static constexpr uint8_t RES_SKIPPED = 3;   // not armed
+
+volatile bool    busy = false;
+volatile uint8_t lastResult = RES_NONE;
+volatile uint8_t doneCount = 0;
+
 volatile uint8_t  rxBuf[BUF_SZ];
 volatile uint16_t rxIdx = 0;
 volatile uint16_t msgLen = 0;
@@ -19,6 +47,7 @@ volatile bool     msgReady = false;
 volatile bool     overflowed = false;
 
 static uint8_t localBuf[BUF_SZ + 1];
+static char    workBuf[BUF_SZ + 1];   // line splitting, or the LZ window
 static char    upperLine[140];
 static char    lastCmd[140];
 static long    defaultDelayMs = 0;
@@ -115,6 +144,160 @@ static bool armed_for_this_payload() {
   return false;
 }
 
+// ---------- batched keystroke engine ----------
+// STRING text goes out as raw 6KRO reports (report ID 2, as the Keyboard
+// library sends them) instead of a press and a release per character.
+// Up to typeBatch distinct keys with the same shift state ride in one
+// report, and the next report replaces them, so one report both releases
+// a batch and presses the next. Two cases need an all-up report first:
+//   - a key that is still down is needed again ("ll"): a rollover
+//     conflict. Back-to-back conflicts back off, holding the all-up report
+//     1, 2, 4 then 8 ms so a slow host sees the release;
+//   - the shift state changes, so no host sees a key under the wrong case.
+//
+// Set per payload with a header directive (a REM line, so other
+// interpreters ignore it):   REM RATE=<keys/s> BATCH=<1-6>
+// RATE=0, the default, sends reports as fast as the 1 ms USB poll takes
+// them; BATCH defaults to 1 (one key per report).
+static constexpr uint8_t  HID_KBD_REPORT_ID = 2;
+static constexpr uint8_t  HID_MOD_LSHIFT    = 0x02;
+static constexpr uint8_t  HID_KEY_TAB       = 0x2B;
+static constexpr uint8_t  HID_SHIFT_FLAG    = 0x80;   // in asciiHid[]
+static constexpr uint8_t  TYPE_MAX_BATCH    = 6;
+static constexpr uint8_t  TYPE_MAX_BACKOFF  = 3;
+static constexpr long     TYPE_MAX_RATE     = 4000;
+
+// US layout usage IDs for ' '..'~' (HID_SHIFT_FLAG: typed with shift)
+static const uint8_t asciiHid[95] PROGMEM = {
+  0x2C, 0x9E, 0xB4, 0xA0, 0xA1, 0xA2, 0xA4, 0x34,  //  !"#$%&'
+  0xA6, 0xA7, 0xA5, 0xAE, 0x36, 0x2D, 0x37, 0x38,  // ()*+,-./
+  0x27, 0x1E, 0x1F, 0x20, 0x21, 0x22, 0x23, 0x24,  // 01234567
+  0x25, 0x26, 0xB3, 0x33, 0xB6, 0x2E, 0xB7, 0xB8,  // 89:;<=>?
+  0x9F, 0x84, 0x85, 0x86, 0x87, 0x88, 0x89, 0x8A,  // @ABCDEFG
+  0x8B, 0x8C, 0x8D, 0x8E, 0x8F, 0x90, 0x91, 0x92,  // HIJKLMNO
+  0x93, 0x94, 0x95, 0x96, 0x97, 0x98, 0x99, 0x9A,  // PQRSTUVW
+  0x9B, 0x9C, 0x9D, 0x2F, 0x31, 0x30, 0xA3, 0xAD,  // XYZ[\]^_
+  0x35, 0x04, 0x05, 0x06, 0x07, 0x08, 0x09, 0x0A,  // `abcdefg
+  0x0B, 0x0C, 0x0D, 0x0E, 0x0F, 0x10, 0x11, 0x12,  // hijklmno
+  0x13, 0x14, 0x15, 0x16, 0x17, 0x18, 0x19, 0x1A,  // pqrstuvw
+  0x1B, 0x1C, 0x1D, 0xAF, 0xB1, 0xB0, 0xB5,        // xyz{|}~
+};
+
+static uint16_t  typeRate = 0;        // keys/s, 0 = unpaced
+static uint8_t   typeBatch = 1;
+
+static KeyReport typeNext;            // batch being built
+static KeyReport typeDown;            // what the host last saw
+static uint8_t   typeNextCount = 0;
+static uint8_t   typeBackoff = 0;
+static uint32_t  typeDueUs = 0;       // pacing: earliest next report
+
+// Per run, printed after the payload
+static uint32_t  statKeys = 0;
+static uint32_t  statReports = 0;
+static uint16_t  statConflicts = 0;
+static uint32_t  statTypeUs = 0;
+
+static void type_reset() {
+  typeRate = 0;
+  typeBatch = 1;
+  memset(&typeNext, 0, sizeof(typeNext));
+  memset(&typeDown, 0, sizeof(typeDown));
+  typeNextCount = 0;
+  typeBackoff = 0;
+  statKeys = statReports = statTypeUs = 0;
+  statConflicts = 0;
+}
+
+static void type_directive(const char* args) {
+  long rate = -1, batch = -1;
+  int n = sscanf(args, "RATE=%ld BATCH=%ld", &rate, &batch);
+  if (n >= 1) typeRate = (uint16_t)constrain(rate, 0L, TYPE_MAX_RATE);
+  if (n >= 2) typeBatch = (uint8_t)constrain(batch, 1L, (long)TYPE_MAX_BATCH);
+  Serial.print("[HID] rate="); Serial.print(typeRate);
+  Serial.print(" keys/s batch="); Serial.println(typeBatch);
+}
+
+static void type_send(KeyReport* r) {
+  HID().SendReport(HID_KBD_REPORT_ID, r, sizeof(KeyReport));
+  statReports++;
+}
+
+static void type_all_up() {
+  memset(&typeDown, 0, sizeof(typeDown));
+  type_send(&typeDown);
+}
+
+static bool type_in(const KeyReport& r, uint8_t usage) {
+  for (uint8_t i = 0; i < TYPE_MAX_BATCH; i++) if (r.keys[i] == usage) return true;
+  return false;
+}
+
+static void type_flush() {
+  if (!typeNextCount) return;
+
+  bool conflict = false;
+  for (uint8_t i = 0; i < typeNextCount; i++) {
+    if (type_in(typeDown, typeNext.keys[i])) conflict = true;
+  }
+  if (conflict) {
+    statConflicts++;
+    type_all_up();
+    delay(1UL << typeBackoff);
+    if (typeBackoff < TYPE_MAX_BACKOFF) typeBackoff++;
+  } else {
+    typeBackoff = 0;
+    if (typeNext.modifiers != typeDown.modifiers && typeDown.keys[0]) type_all_up();
+  }
+
+  if (typeRate) {
+    while ((int32_t)(micros() - typeDueUs) < 0) {}
+    typeDueUs = micros() + typeNextCount * (1000000UL / typeRate);
+  }
+
+  type_send(&typeNext);
+  typeDown = typeNext;
+  statKeys += typeNextCount;
+  memset(&typeNext, 0, sizeof(typeNext));
+  typeNextCount = 0;
+}
+
+static void type_char(uint8_t c) {
+  uint8_t code;
+  if (c == '\t')                 code = HID_KEY_TAB;
+  else if (c >= 32 && c <= 126) code = pgm_read_byte(&asciiHid[c - 32]);
+  else return;                   // no key for it on a US layout
+
+  uint8_t usage = code & (uint8_t)~HID_SHIFT_FLAG;
+  uint8_t mods = (code & HID_SHIFT_FLAG) ? HID_MOD_LSHIFT : 0;
+
+  if (typeNextCount && (typeNextCount >= typeBatch || mods != typeNext.modifiers
+                        || type_in(typeNext, usage))) {
+    type_flush();
+  }
+  typeNext.modifiers = mods;
+  typeNext.keys[typeNextCount++] = usage;
+}
+
+static void type_string(const char* s) {
+  uint32_t t0 = micros();
+  while (*s) type_char((uint8_t)*s++);
+  type_flush();
+  type_all_up();
+  statTypeUs += micros() - t0;
+}
+
+static void type_report(unsigned long runMs) {
+  uint32_t typeMs = statTypeUs / 1000;
+  Serial.print("[HID] "); Serial.print(statKeys);
+  Serial.print(" keys in "); Serial.print(typeMs);
+  Serial.print(" ms typing ("); Serial.print(typeMs ? statKeys * 1000UL / typeMs : 0UL);
+  Serial.print(" keys/s), "); Serial.print(statReports);
+  Serial.print(" reports, "); Serial.print(statConflicts);
+  Serial.print(" conflicts; run "); Serial.print(runMs);
+  Serial.println(" ms");
+}
+
 // ---------- HID executor ----------
 static void hid_press_and_release(uint8_t k) {
   if (!k) return;
@@ -186,8 +369,11 @@ static void hid_exec_line(const char* raw) {
   char* line = trim(lineBuf);
   if (!*line) return;
 
-  // Comments
-  if (!strncmp(line, "REM ", 4)) return;
+  // Comments (REM RATE= is the typing-rate directive)
+  if (!strncmp(line, "REM ", 4)) {
+    if (!strncmp(line + 4, "RATE=", 5)) type_directive(line + 4);
+    return;
+  }
 
   // Save for REPEAT
   strncpy(lastCmd, line, sizeof(lastCmd) - 1);
@@ -196,7 +382,7 @@ static void hid_exec_line(const char* raw) {
   toUpperCopy(line, upperLine, sizeof(upperLine));
 
   if (!strncmp(upperLine, "STRING ", 7)) {
-    Keyboard.print(line + 7);  // original casing
+    type_string(line + 7);  // original casing
     apply_default_delay();
     return;
   }
@@ -225,15 +411,29 @@ static void hid_exec_line(const char* raw) {
   hid_exec_combo(upperLine);
 }
 
-static void hid_execute_payload(const uint8_t* payload, uint16_t len) {
+static unsigned long runStartMs = 0;
+
+static void hid_run_begin() {
   digitalWrite(LED_PIN, HIGH);
   Keyboard.begin();
 
   defaultDelayMs = 0;
   lastCmd[0] = 0;
+  type_reset();
+  runStartMs = millis();
+}
+
+static void hid_run_end() {
+  Keyboard.end();
+  digitalWrite(LED_PIN, LOW);
+  type_report(millis() - runStartMs);
+}
+
+static void hid_execute_payload(const uint8_t* payload, uint16_t len) {
+  hid_run_begin();
 
   // Copy into a temp mutable buffer for splitting
-  static char buf[BUF_SZ + 1];
+  char* buf = workBuf;
   if (len > BUF_SZ) len = BUF_SZ;
   memcpy(buf, payload, len);
   buf[len] = 0;
@@ -252,25 +452,132 @@ static void hid_execute_payload(const uint8_t* payload, uint16_t len) {
     if (*t) hid_exec_line(t);
   }
 
-  Keyboard.end();
-  digitalWrite(LED_PIN, LOW);
+  hid_run_end();
+}
+
+// ---------- LZ decode ----------
+typedef void (*lz_sink)(uint8_t b);
+
+// Decode in[0..n) byte by byte into emit(); false on a malformed stream
+static bool lz_decode(const uint8_t* in, uint16_t n, lz_sink emit) {
+  uint8_t* win = (uint8_t*)workBuf;
+  uint8_t pos = 0;        // wraps at 256 with the window
+  uint16_t outLen = 0;
+  uint16_t i = 0;
+
+  while (i < n) {
+    uint8_t b = in[i];
+
+    if (b & 0x80) {
+      if (i + 1 >= n) return false;
+      uint8_t len = (uint8_t)(((b >> 2) & 0x1F) + LZ_MIN_MATCH);
+      uint16_t dist = (uint16_t)((((b & 0x03) << 6) | (in[i + 1] & 0x3F)) + 1);
+      if (dist > outLen) return false;
+      uint8_t from = (uint8_t)(pos - dist);   // dist 256 -> pos itself
+      for (uint8_t k = 0; k < len; k++) {
+        uint8_t c = win[from++];
+        win[pos++] = c;
+        emit(c);
+      }
+      outLen += len;
+      i += 2;
+      continue;
+    }
+
+    if (b == LZ_ESC) {
+      if (i + 2 >= n) return false;
+      b = (uint8_t)(((in[i + 1] & 0x0F) << 4) | (in[i + 2] & 0x0F));
+      i += 3;
+    } else {
+      i++;
+    }
+    win[pos++] = b;
+    emit(b);
+    outLen++;
+  }
+  return true;
+}
+
+// Verify pass: length and sum16 of the decoded text, nothing typed
+static uint16_t lzOutLen = 0;
+static uint32_t lzOutSum = 0;
+
+static void lz_count(uint8_t b) {
+  lzOutLen++;
+  lzOutSum += b;
+}
+
+// Execute pass: decoded bytes are assembled into lines as they arrive
+static char    lzLine[140];
+static uint8_t lzLineLen = 0;
+
+static void lz_line_end() {
+  lzLine[lzLineLen] = 0;
+  lzLineLen = 0;
+  char* t = trim(lzLine);
+  if (*t) hid_exec_line(t);
+}
+
+static void lz_exec_byte(uint8_t b) {
+  if (b == '\n' || b == '\r' || b == 0) { lz_line_end(); return; }
+  if (lzLineLen < sizeof(lzLine) - 1) lzLine[lzLineLen++] = (char)b;
+}
+
+static void hid_execute_lz(const uint8_t* in, uint16_t n) {
+  hid_run_begin();
+  lzLineLen = 0;
+
+  lz_decode(in, n, lz_exec_byte);
+  lz_line_end();
+
+  hid_run_end();
+}
+
+// ---------- status ----------
+static inline uint8_t status_byte() {
+  uint8_t st = ST_VALID;
+  if (busy)     st |= ST_BUSY;
+  if (msgReady) st |= ST_SLOT_FULL;
+  st |= (uint8_t)((lastResult & 0x03) << 2);
+  st |= (uint8_t)((doneCount & 0x03) << 4);
+  return st;
+}
+
+// Preload SPDR so the next byte clocked by the Pico reads the fresh status
+static void publish_status() {
+  noInterrupts();
+  SPDR = status_byte();
+  interrupts();
+}
+
+static void finish_payload(uint8_t result) {
+  noInterrupts();
+  lastResult = result;
+  doneCount++;
+  busy = false;
+  interrupts();
+  publish_status();
 }
 
 // ---------- SPI ISR ----------
 ISR(SPI_STC_vect) {
   uint8_t b = SPDR;
 
-  if (msgReady) return;
+  if (b == ENQ) { SPDR = status_byte(); return; }
+
+  if (msgReady) { SPDR = status_byte(); return; }
 
   if (b == EOT) {
     msgLen = rxIdx;
     rxIdx = 0;
     msgReady = true;
+    SPDR = status_byte();
     return;
   }
 
   if (rxIdx < BUF_SZ) rxBuf[rxIdx++] = b;
   else { overflowed = true; rxIdx = 0; }
+  SPDR = status_byte();
 }
 
 void setup() {
@@ -293,6 +600,7 @@ void setup() {
 
   SPCR = _BV(SPE) | _BV(SPIE);
   sei();
+  publish_status();
 
   Serial.println("SPI Ducky HID ready.");
 }
@@ -312,7 +620,9 @@ void loop() {
   for (uint16_t i = 0; i < len; i++) localBuf[i] = rxBuf[i];
   localBuf[len] = 0;
   msgReady = false;
+  busy = true;   // slot is free again: the Pico may stream the next payload
   interrupts();
+  publish_status();
 
   Serial.println();
   Serial.print("[RX] len="); Serial.print(len);
@@ -327,42 +637,71 @@ void loop() {
   char* firstNL = (char*)memchr(localBuf, '\n', len);
   if (!firstNL) {
     Serial.println("[META] missing newline");
+    finish_payload(RES_FAIL);
     return;
   }
 
   *firstNL = 0;
-  long expLen = -1, expSum = -1;
+  long expLen = -1, expSum = -1, wireLen = -1;
+  int fields = sscanf((char*)localBuf, "REM META LEN=%ld SUM16=%ld LZ=%ld",
+                      &expLen, &expSum, &wireLen);
 
-  if (sscanf((char*)localBuf, "REM META LEN=%ld SUM16=%ld", &expLen, &expSum) != 2) {
+  if (fields < 2) {
     *firstNL = '\n';
     Serial.println("[META] header missing or invalid");
+    finish_payload(RES_FAIL);
     return;
   }
 
   uint8_t* payloadStart = (uint8_t*)(firstNL + 1);
   uint16_t payloadLen   = (uint16_t)(len - (payloadStart - localBuf));
-  uint16_t payloadSum   = sum16(payloadStart, payloadLen);
+  bool lz = (fields == 3);
+  uint16_t actualLen = payloadLen;
+  uint16_t actualSum;
+  bool wireOk = true;
+
+  if (lz) {
+    // Decode once without typing: a bad stream must not type half a payload
+    lzOutLen = 0;
+    lzOutSum = 0;
+    wireOk = ((long)payloadLen == wireLen) && lz_decode(payloadStart, payloadLen, lz_count);
+    actualLen = lzOutLen;
+    actualSum = (uint16_t)(lzOutSum & 0xFFFF);
+
+    Serial.print("[LZ] wire len="); Serial.print(payloadLen);
+    Serial.print(" expected "); Serial.print(wireLen);
+    Serial.print(" -> decoded "); Serial.print(actualLen);
+    Serial.println(wireOk ? "" : " (malformed)");
+  } else {
+    actualSum = sum16(payloadStart, payloadLen);
+  }
 
-  bool pass = ((long)payloadLen == expLen && (long)payloadSum == expSum);
+  bool pass = wireOk && ((long)actualLen == expLen && (long)actualSum == expSum);
 
   Serial.print("[META] expected len="); Serial.print(expLen);
   Serial.print(" sum16="); Serial.print(expSum);
-  Serial.print(" | actual len="); Serial.print(payloadLen);
-  Serial.print(" sum16="); Serial.print(payloadSum);
+  Serial.print(" | actual len="); Serial.print(actualLen);
+  Serial.print(" sum16="); Serial.print(actualSum);
   Serial.println(pass ? "  ✅ PASS" : "  ❌ FAIL");
 
   *firstNL = '\n';
 
-  if (!pass) return;
+  if (!pass) {
+    finish_payload(RES_FAIL);
+    return;
+  }
 
   // Execute only if armed
   if (armed_for_this_payload()) {
     Serial.println("[HID] ARMED. Executing payload...");
     delay(500); // tiny settle before typing
-    hid_execute_payload(payloadStart, payloadLen);
+    if (lz) hid_execute_lz(payloadStart, payloadLen);
+    else    hid_execute_payload(payloadStart, payloadLen);
     Serial.println("[HID] Done.");
+    finish_payload(RES_OK);
   } else {
     Serial.println("[HID] Not armed. Skipping execution.");
+    finish_payload(RES_SKIPPED);
   }
 }
 
@@ -0,0 +1,411 @@
+# build_bundle.py (host side, CPython)
+# Build a deployable CIRCUITPY bundle and check it against a budget.
+#
+#   python build_bundle.py                         # build into ./bundle
+#   python build_bundle.py --deploy /media/CIRCUITPY
+#   python build_bundle.py --no-mpy --flash-budget 900000
+#
+# Starts from the same validated, minified asset set upload_menu.py syncs,
+# then:
+#   - cross-compiles every project module except code.py/boot.py (and any
+#     loose .py under lib/) to .mpy with CircuitPython's mpy-cross, so the
+#     device loads bytecode instead of compiling source on every boot
+#   - rewrites 24/32-bit BMPs that use <= 256 colours as indexed BMPs
+#     (same colours, a fraction of the bytes OnDiskBitmap has to read)
+#   - checks sprite configs against their sheets
+#   - writes bundle_manifest.json with per-file sizes and hashes
+#
+# mpy-cross must match the firmware's CircuitPython major version (the pip
+# "mpy-cross" package is MicroPython's and produces files CircuitPython
+# rejects). It is looked up via --mpy-cross, $MPY_CROSS, then PATH.
+#
+# The build fails (exit 1) when the flash footprint or the estimated boot
+# import time exceeds its budget.
+
+import argparse
+import ast
+import hashlib
+import json
+import os
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+
+import upload_menu
+
+SRC_DIR = upload_menu.SRC_DIR
+OUT_DIR = "bundle"
+MANIFEST = "bundle_manifest.json"
+
+# Run from source by the firmware, never compiled
+KEEP_SOURCE = {"code.py", "boot.py"}
+
+# Budgets. The Pico's CIRCUITPY volume is ~1 MB; files occupy whole clusters.
+FLASH_BUDGET = 1000 * 1024
+IMPORT_BUDGET_MS = 1500
+CLUSTER = 512
+
+# Rough RP2040 boot costs, ms per KB of file (calibrate against the
+# loop/boot timings metrics.py reports on the real board)
+COMPILE_MS_PER_KB = 12.0   # parse + compile a .py
+MPY_MS_PER_KB = 1.5        # load a .mpy
+JSON_MS_PER_KB = 4.0       # json.load of config/menus at boot
+MODULE_MS = 3.0            # per-module lookup/exec overhead
+
+class BuildError(ValueError):
+    pass
+
+##########################
+#     mpy-cross step     #
+##########################
+def find_mpy_cross(path=None):
+    for cand in (path, os.environ.get("MPY_CROSS"), shutil.which("mpy-cross")):
+        if cand and os.path.isfile(cand):
+            return cand
+    return None
+
+def compile_mpy(mpy_cross, rel, source):
+    """Compile one module's source bytes; returns the .mpy bytes."""
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "m.py")
+        out = os.path.join(tmp, "m.mpy")
+        with open(src, "wb") as f:
+            f.write(source)
+        # -s keeps the drive path in tracebacks
+        proc = subprocess.run(
+            [mpy_cross, "-o", out, "-s", rel, src],
+            capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            raise BuildError(f"{rel}: mpy-cross failed: {proc.stderr.strip()}")
+        with open(out, "rb") as f:
+            return f.read()
+
+def compile_target(rel):
+    if not rel.endswith(".py"):
+        return False
+    if "/" not in rel:
+        return rel not in KEEP_SOURCE
+    return rel.startswith(upload_menu.LIB_DIR + "/")
+
+#############################
+#     BMP preprocessing     #
+#############################
+def _read_pixels(data):
+    """(width, height, rows of (r, g, b)) for an uncompressed 24/32-bit BMP, else None."""
+    if data[:2] != b"BM" or len(data) < 54:
+        return None
+    offset = struct.unpack_from("<I", data, 10)[0]
+    hsize, width, height, _, bpp, comp = struct.unpack_from("<IiiHHI", data, 14)
+    if bpp not in (24, 32) or comp not in (0, 3):
+        return None
+
+    masks = (0xFF0000, 0x00FF00, 0x0000FF, 0xFF000000)
+    if comp == 3:
+        if hsize >= 56:
+            masks = struct.unpack_from("<IIII", data, 54)
+        else:
+            masks = struct.unpack_from("<III", data, 54) + (0,)
+    shifts = [(m & -m).bit_length() - 1 if m else 0 for m in masks]
+
+    bottom_up = height > 0
+    height = abs(height)
+    step = bpp // 8
+    stride = (width * step + 3) & ~3
+    rows = []
+    alphas = set()
+    for y in range(height):
+        base = offset + y * stride
+        row = []
+        for x in range(width):
+            p = base + x * step
+            v = int.from_bytes(data[p:p + step], "little")
+            if bpp == 32 and masks[3]:
+                alphas.add((v & masks[3]) >> shifts[3])
+            row.append(tuple((v & masks[c]) >> shifts[c] for c in range(3)))
+        rows.append(row)
+    if len(alphas) > 1:
+        # Varying alpha would be lost; only flatten fully opaque images
+        return None
+    if bottom_up:
+        rows.reverse()
+    return width, height, rows
+
+def _write_indexed(width, height, rows, palette):
+    bpp = 1 if len(palette) <= 2 else 4 if len(palette) <= 16 else 8
+    index = {c: i for i, c in enumerate(palette)}
+    stride = ((width * bpp + 31) // 32) * 4
+    per_byte = 8 // bpp
+
+    body = bytearray()
+    for row in reversed(rows):
+        line = bytearray(stride)
+        for x, c in enumerate(row):
+            shift = (per_byte - 1 - x % per_byte) * bpp
+            line[x // per_byte] |= index[c] << shift
+        body += line
+
+    pal = b"".join(bytes((b, g, r, 0)) for (r, g, b) in palette)
+    offset = 14 + 40 + len(pal)
+    header = struct.pack("<2sIHHI", b"BM", offset + len(body), 0, 0, offset)
+    info = struct.pack("<IiiHHIIiiII", 40, width, height, 1, bpp, 0, len(body),
+                       2835, 2835, len(palette), len(palette))
+    return header + info + pal + bytes(body)
+
+def optimize_bmp(data):
+    """Indexed copy of a true-colour BMP when that is smaller, else the input."""
+    parsed = _read_pixels(data)
+    if parsed is None:
+        return data
+    width, height, rows = parsed
+    palette = []
+    seen = set()
+    for row in rows:
+        for c in row:
+            if c not in seen:
+                seen.add(c)
+                palette.append(c)
+                if len(palette) > 256:
+                    return data
+    # Keep first-seen order so index 0 is the top-left (usually background) colour
+    out = _write_indexed(width, height, rows, palette)
+    return out if len(out) < len(data) else data
+
+def bmp_size(data):
+    if data[:2] != b"BM":
+        return None
+    width, height = struct.unpack_from("<ii", data, 18)
+    return width, abs(height)
+
+####################################
+#     Sprite config validation     #
+####################################
+def check_sprites(assets):
+    errors = []
+    for rel, data in assets.items():
+        if not (rel.startswith("sprites/") and rel.endswith(".json")):
+            continue
+        cfg = json.loads(data)
+        sheet = cfg.get("sheet", "").lstrip("/")
+        if sheet not in assets:
+            errors.append(f"{rel}: sheet '{cfg.get('sheet')}' is not in the bundle")
+            continue
+        size = bmp_size(assets[sheet])
+        fw, fh, cols = cfg.get("frame_w", 0), cfg.get("frame_h", 0), cfg.get("cols", 0)
+        if not size or not fw or not fh or not cols:
+            errors.append(f"{rel}: needs frame_w, frame_h, cols and a BMP sheet")
+            continue
+        if size[0] % fw or size[1] % fh or size[0] // fw != cols:
+            errors.append(f"{rel}: {size[0]}x{size[1]} sheet does not split into {cols} columns of {fw}x{fh}")
+            continue
+        tiles = cols * (size[1] // fh)
+        for name, c in cfg.get("clips", {}).items():
+            start = c["start"] if c.get("start") is not None else c.get("row", 0) * cols
+            if start + c.get("count", 1) > tiles:
+                errors.append(f"{rel}: clip '{name}' runs past tile {tiles - 1}")
+    return errors
+
+##############################
+#     Boot import estimate   #
+##############################
+def _imports(source):
+    names = []
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return names
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.extend(a.name.split(".")[0] for a in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.append(node.module.split(".")[0])
+    return names
+
+def _module_file(bundle, name):
+    for rel in (f"{name}.py", f"{name}.mpy", f"lib/{name}.py", f"lib/{name}.mpy",
+                f"lib/{name}/__init__.py", f"lib/{name}/__init__.mpy"):
+        if rel in bundle:
+            return rel
+    return None
+
+def estimate_boot(bundle, sources):
+    """
+    Walk imports from code.py through bundled modules. Returns
+    (total_ms, [(rel, ms)]) including the JSON files read at boot.
+    """
+    costs = []
+    seen = set()
+    todo = ["code"]
+    while todo:
+        name = todo.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        rel = "code.py" if name == "code" else _module_file(bundle, name)
+        if rel is None:
+            continue   # built into the firmware
+        kb = len(bundle[rel]) / 1024
+        rate = MPY_MS_PER_KB if rel.endswith(".mpy") else COMPILE_MS_PER_KB
+        costs.append((rel, MODULE_MS + kb * rate))
+        src = sources.get(rel[:-4] + ".py" if rel.endswith(".mpy") else rel)
+        if src is not None:
+            todo.extend(_imports(src))
+
+    for rel in sorted(bundle):
+        if rel == "config.json" or (rel.startswith("menus/") and rel.endswith(".json")):
+            costs.append((rel, len(bundle[rel]) / 1024 * JSON_MS_PER_KB))
+    return sum(ms for _, ms in costs), costs
+
+#####################
+#     Build         #
+#####################
+def on_flash(size):
+    return max(1, (size + CLUSTER - 1) // CLUSTER) * CLUSTER
+
+def build(src=SRC_DIR, mpy_cross=None, use_mpy=True):
+    """Return (bundle, manifest). bundle maps drive paths to bytes."""
+    assets, raw_sizes, errors, warnings = upload_menu.collect_assets(src)
+    errors.extend(check_sprites(assets))
+    if errors:
+        raise BuildError("\n".join(errors))
+
+    if use_mpy:
+        mpy_cross = find_mpy_cross(mpy_cross)
+        if mpy_cross is None:
+            raise BuildError("mpy-cross not found (use --mpy-cross, $MPY_CROSS or --no-mpy)")
+
+    bundle = {}
+    sources = {}
+    files = {}
+    for rel in sorted(assets):
+        data = assets[rel]
+        kind = rel.rsplit(".", 1)[-1]
+        out_rel = rel
+        if rel.endswith(".py"):
+            sources[rel] = data
+            if use_mpy and compile_target(rel):
+                data = compile_mpy(mpy_cross, rel, data)
+                out_rel = rel[:-3] + ".mpy"
+                kind = "mpy"
+        elif rel.endswith(".bmp"):
+            data = optimize_bmp(data)
+        bundle[out_rel] = data
+        files[out_rel] = {
+            "kind": kind,
+            "size": len(data),
+            "source_size": raw_sizes.get(rel, len(data)),
+            "sha256": hashlib.sha256(data).hexdigest(),
+        }
+
+    import_ms, costs = estimate_boot(bundle, sources)
+    manifest = {
+        "files": files,
+        "bytes": sum(f["size"] for f in files.values()),
+        "source_bytes": sum(f["source_size"] for f in files.values()),
+        "flash_bytes": sum(on_flash(f["size"]) for f in files.values()),
+        "import_ms_est": round(import_ms, 1),
+        "boot_costs": {rel: round(ms, 1) for rel, ms in costs},
+        "warnings": warnings,
+    }
+    return bundle, manifest
+
+def write_bundle(bundle, manifest, out_dir):
+    if os.path.isdir(out_dir) and os.listdir(out_dir):
+        if not os.path.isfile(os.path.join(out_dir, MANIFEST)):
+            raise BuildError(f"{out_dir} is not empty and is not a previous bundle")
+        shutil.rmtree(out_dir)
+    for rel, data in bundle.items():
+        dest = os.path.join(out_dir, rel)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        with open(dest, "wb") as f:
+            f.write(data)
+    with open(os.path.join(out_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+
+def deploy(bundle, manifest, target, out=sys.stdout):
+    """Delta-sync onto a drive; drops .py files a new .mpy would be shadowed by."""
+    payload = dict(bundle)
+    payload[MANIFEST] = json.dumps(manifest, sort_keys=True).encode("utf-8")
+    changed = upload_menu.plan_sync(payload, target)
+    upload_menu.write_batch(payload, changed, target)
+    # CircuitPython imports name.py before name.mpy from the same folder
+    removed = []
+    for rel in bundle:
+        if rel.endswith(".mpy"):
+            stale = os.path.join(target, rel[:-4] + ".py")
+            if os.path.isfile(stale):
+                os.remove(stale)
+                removed.append(rel[:-4] + ".py")
+    for rel in changed:
+        print(f"  wrote {rel} ({len(payload[rel])} bytes)", file=out)
+    for rel in removed:
+        print(f"  removed {rel} (shadowed its .mpy)", file=out)
+    return changed, removed
+
+def report(manifest, flash_budget, import_budget_ms, out=sys.stdout):
+    """Print the size/boot summary; returns the list of budget failures."""
+    files = manifest["files"]
+    print(f"{'file':40} {'source':>9} {'bundle':>9}", file=out)
+    for rel in sorted(files, key=lambda r: -files[r]["size"]):
+        f = files[rel]
+        print(f"{rel:40} {f['source_size']:>9} {f['size']:>9}", file=out)
+    print(
+        f"{len(files)} files, {manifest['source_bytes']} -> {manifest['bytes']} bytes, "
+        f"{manifest['flash_bytes']} on flash (budget {flash_budget})",
+        file=out,
+    )
+    print(f"boot import estimate {manifest['import_ms_est']} ms (budget {import_budget_ms} ms)", file=out)
+    for rel, ms in sorted(manifest["boot_costs"].items(), key=lambda kv: -kv[1])[:5]:
+        print(f"  {rel:38} {ms:>7} ms", file=out)
+    for w in manifest.get("warnings", ()):
+        print(f"[WARN] {w}", file=out)
+
+    failures = []
+    if manifest["flash_bytes"] > flash_budget:
+        failures.append(f"flash {manifest['flash_bytes']} > {flash_budget} bytes")
+    if manifest["import_ms_est"] > import_budget_ms:
+        failures.append(f"boot import {manifest['import_ms_est']} > {import_budget_ms} ms")
+    return failures
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build a deployable Pico Pebble bundle")
+    parser.add_argument("--src", default=SRC_DIR, help="project directory (default: this script's directory)")
+    parser.add_argument("--out", default=None, help=f"output directory (default: <src>/{OUT_DIR})")
+    parser.add_argument("--mpy-cross", default=None, help="path to CircuitPython's mpy-cross")
+    parser.add_argument("--no-mpy", action="store_true", help="ship modules as source")
+    parser.add_argument("--flash-budget", type=int, default=FLASH_BUDGET, help="max bytes on flash")
+    parser.add_argument("--import-budget-ms", type=float, default=IMPORT_BUDGET_MS,
+                        help="max estimated boot import time")
+    parser.add_argument("--deploy", metavar="TARGET", help="also delta-sync the bundle to a mounted drive")
+    args = parser.parse_args(argv)
+
+    try:
+        bundle, manifest = build(args.src, mpy_cross=args.mpy_cross, use_mpy=not args.no_mpy)
+    except BuildError as e:
+        print(f"[ERR] {e}")
+        return 1
+
+    failures = report(manifest, args.flash_budget, args.import_budget_ms)
+    if failures:
+        for f in failures:
+            print(f"[ERR] over budget: {f}")
+        return 1
+
+    out_dir = args.out or os.path.join(args.src, OUT_DIR)
+    try:
+        write_bundle(bundle, manifest, out_dir)
+    except BuildError as e:
+        print(f"[ERR] {e}")
+        return 1
+    print(f"bundle written to {out_dir}")
+
+    if args.deploy:
+        if not os.path.isdir(args.deploy):
+            parser.error(f"{args.deploy} is not a directory")
+        deploy(bundle, manifest, args.deploy)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
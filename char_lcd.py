@@ -0,0 +1,146 @@
+# char_lcd.py (CircuitPython)
+# HD44780 character LCD on a PCF8574 I2C backpack, with diff-based updates.
+#
+# Text goes into a target buffer; show() compares it with a shadow of what
+# the LCD already displays and sends only the changed runs of characters,
+# each preceded by one set-DDRAM-address command. Everything for one show()
+# is packed into a single I2C write, so moving a menu cursor costs a handful
+# of characters instead of a clear plus full rewrite.
+#
+# Backpack wiring (the common one): P0=RS P1=RW P2=EN P3=backlight P4-7=D4-7
+
+import time
+
+RS = 0x01
+EN = 0x04
+BACKLIGHT = 0x08
+
+CMD_CLEAR = 0x01
+CMD_ENTRY_MODE = 0x06        # increment, no shift
+CMD_DISPLAY_ON = 0x0C        # display on, cursor off, blink off
+CMD_FUNCTION_4BIT_2LINE = 0x28
+CMD_SET_DDRAM = 0x80
+
+ROW_OFFSETS = (0x00, 0x40, 0x14, 0x54)
+
+class CharLCD:
+    def __init__(self, i2c, address=0x27, cols=16, rows=2):
+        self.i2c = i2c
+        self.address = address
+        self.cols = cols
+        self.rows = rows
+        self._backlight = BACKLIGHT
+
+        self._target = [bytearray(b" " * cols) for _ in range(rows)]
+        self._shadow = [bytearray(b" " * cols) for _ in range(rows)]
+        self._out = bytearray()
+
+        # Transfer accounting
+        self.bytes_sent = 0
+        self.transactions = 0
+
+        self._init_display()
+
+    ##########################
+    #     Low-level I/O      #
+    ##########################
+    def _nibble(self, nibble, mode):
+        data = (nibble << 4) | mode | self._backlight
+        self._out.append(data | EN)
+        self._out.append(data)
+
+    def _byte(self, value, mode=0):
+        self._nibble(value >> 4, mode)
+        self._nibble(value & 0x0F, mode)
+
+    def _flush_out(self):
+        if not self._out:
+            return
+        while not self.i2c.try_lock():
+            pass
+        try:
+            self.i2c.writeto(self.address, self._out)
+        finally:
+            self.i2c.unlock()
+        self.bytes_sent += len(self._out)
+        self.transactions += 1
+        self._out = bytearray()
+
+    def _init_display(self):
+        time.sleep(0.05)
+        # 4-bit wake-up sequence from the HD44780 datasheet
+        for delay in (0.0045, 0.0045, 0.00015):
+            self._nibble(0x03, 0)
+            self._flush_out()
+            time.sleep(delay)
+        self._nibble(0x02, 0)
+        self._byte(CMD_FUNCTION_4BIT_2LINE)
+        self._byte(CMD_DISPLAY_ON)
+        self._byte(CMD_ENTRY_MODE)
+        self._byte(CMD_CLEAR)
+        self._flush_out()
+        time.sleep(0.002)
+
+    ############################
+    #     Buffer operations    #
+    ############################
+    def write(self, row, col, text):
+        if row < 0 or row >= self.rows or col >= self.cols:
+            return
+        line = self._target[row]
+        for ch in str(text):
+            if col >= self.cols:
+                break
+            if col >= 0:
+                code = ord(ch)
+                line[col] = code if 32 <= code < 127 else 0x3F  # '?'
+            col += 1
+
+    def write_line(self, row, text):
+        """Replace a whole row, padding with spaces."""
+        if 0 <= row < self.rows:
+            self._target[row][:] = b" " * self.cols
+            self.write(row, 0, text)
+
+    def line(self, row):
+        """Text of a row as it will be after the next show()."""
+        return self._target[row].decode()
+
+    def clear(self):
+        for line in self._target:
+            line[:] = b" " * self.cols
+
+    def show(self):
+        """Send only the characters that differ from the shadow."""
+        for row in range(self.rows):
+            target = self._target[row]
+            shadow = self._shadow[row]
+            col = 0
+            while col < self.cols:
+                if target[col] == shadow[col]:
+                    col += 1
+                    continue
+                start = col
+                # Extend the run; one unchanged char between two changes
+                # costs the same 4 bytes as a new address command, so bridge it
+                while col < self.cols and (
+                    target[col] != shadow[col]
+                    or (col + 1 < self.cols and target[col + 1] != shadow[col + 1])
+                ):
+                    col += 1
+                self._byte(CMD_SET_DDRAM | (ROW_OFFSETS[row] + start))
+                for i in range(start, col):
+                    self._byte(target[i], RS)
+                    shadow[i] = target[i]
+        self._flush_out()
+
+    @property
+    def backlight(self):
+        return bool(self._backlight)
+
+    @backlight.setter
+    def backlight(self, on):
+        self._backlight = BACKLIGHT if on else 0
+        # Any write latches the backlight bit; an empty EN-less byte is enough
+        self._out.append(self._backlight)
+        self._flush_out()
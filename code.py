@@ -5,58 +5,28 @@ import time
 import sys
 import select
 import terminalio
+import supervisor
+import textlayout
 #time.sleep(5)
 #print("booting... ")
 from spi_comm import SPIComm
 from payloader import load_payload
+import payloader
+import payload_queue
 from flipper_menu import Menu
 from menu_loader import load_menus
 from screen import Screen
 from config_loader import load_config
+import sprite_api
 from sprite_api import Sprite
-from ir import IRLed
-
-#####################
-#   Def Functions   #
-#####################
-
-def wrap_words(text, width):
-    text = str(text).strip()
-    if not text:
-        return [""]
-
-    words = text.split(" ")
-    lines = []
-    line = ""
-
-    for w in words:
-        #print(f"for {w} in words:")
-        if w == "":
-            continue
-
-        # If the word itself is longer than width, hard-split it
-        while len(w) > width:
-            if line:
-                lines.append(line)
-                line = ""
-            lines.append(w[:width])
-            w = w[width:]
-
-        # Normal word add
-        if not line:
-            line = w
-        elif len(line) + 1 + len(w) <= width:
-            line = line + " " + w
-        else:
-            lines.append(line)
-            #print(w)
-            line = w
-
-    if line:
-        lines.append(line)
-
-    return lines
-
+from hot_reload import HotReloader
+from state_store import StateStore
+from power import IdleManager
+import metrics
+import log
+import ircontrol
+import input_macro
+from input_macro import Recorder, Macro, SimScreen
 
 ###########################
 #     Initialize Pins     #
@@ -93,9 +63,20 @@ PINBACK.pull = digitalio.Pull.UP
 
 config = load_config()
 
+# Menu/config/sprite edits are picked up by HotReloader instead of
+# re-running this whole file (and the intro) on every save
+if config.get("hot_reload"):
+    supervisor.runtime.autoreload = False
+
+# Levels and optional flash log; debug_mode lowers the threshold to DEBUG
+log.configure(config)
 if config["debug_mode"]:
     debugmsg = True
-    print("Debug mode is ON")
+    log.info("BOOT", "debug mode is on")
+
+# Receiver boards sharing the payload SPI bus (GP17 "main" is always there)
+# and whether payloads go out LZ-compressed
+payloader.configure(config)
 
 ###################################
 #     Initialize UART Display     #
@@ -124,7 +105,10 @@ screen = Screen(
     uart,
     display_type = config["display_type"],
     i2c = None,
-    address=int(config["i2c_address"], 16)
+    address=int(config["i2c_address"], 16),
+    lcd_size=(config["lcd_cols"], config["lcd_rows"]),
+    partial=config["oled_partial"],
+    fps=config["oled_fps"]
 )
 screen.clear()
 
@@ -133,6 +117,10 @@ screen.clear()
 if config["invert_on_start"]:
     screen.invert()
 
+# Host-side view of the screen, see mirror_viewer.py
+if config["mirror_fps"]:
+    screen.enable_mirror(fps=config["mirror_fps"])
+
 
 ####################################################
 #                New Draw Functions                #
@@ -167,24 +155,30 @@ if config["invert_on_start"]:
 # sprite1.tgwait("idle", 2.0)
 # sprite1.tgwait("sit", 2.0)
 
-sprite2 = Sprite.from_config(screen, "sprites/otter.json", x=130, y=-30)
+# Decoded sprite frames shared by all sprites (0 = always read from disk)
+sprite_api.tiles.budget = config["sprite_cache_kb"] * 1024
+
+sprite2 = None
+if screen.dt == "oled":
+    sprite2 = Sprite.from_config(screen, "sprites/otter.json", x=130, y=-30)
 
-sprite2.tgmove("run", dx=-275, dy=0, speed=150)
-sprite2.tgwait("sleep", 0.5)
-sprite2.tgmove("run", dx=275, dy=0, speed=150)
-sprite2.tgwait("sleep", 0.5)
-sprite2.tgmove("run", dx=-100, dy=0, speed=150)
-sprite2.tgmove("jump", dx=-10, dy=-15, speed=50)
-sprite2.tgmove("jump", dx=-5, dy=0, speed=50)
-sprite2.tgmove("jump", dx=-10, dy=15, speed=50)
-sprite2.tgwait("land", 0.5)
-sprite2.tgwait("idle-alt", 2.0)
-sprite2.tgwait("sleep", 2.0)
-sprite2.set_pos(140, 0)
+    # then= warms the next clip's frames while the current one plays
+    sprite2.warm("run", block=True)
+    sprite2.tgmove("run", dx=-275, dy=0, speed=150, then="sleep")
+    sprite2.tgwait("sleep", 0.5)
+    sprite2.tgmove("run", dx=275, dy=0, speed=150)
+    sprite2.tgwait("sleep", 0.5)
+    sprite2.tgmove("run", dx=-100, dy=0, speed=150, then="jump")
+    sprite2.tgmove("jump", dx=-10, dy=-15, speed=50)
+    sprite2.tgmove("jump", dx=-5, dy=0, speed=50)
+    sprite2.tgmove("jump", dx=-10, dy=15, speed=50, then="land")
+    sprite2.tgwait("land", 0.5, then="idle-alt")
+    sprite2.tgwait("idle-alt", 2.0)
+    sprite2.tgwait("sleep", 2.0)
+    sprite2.set_pos(140, 0)
 
-ir = IRLed(board.GP22)
-ir.blink(times=5, on_time=0.2, off_time=0.2)
-ir.deinit()
+# Queued, driven by ircontrol.poll() in the main loop
+ircontrol.get_led("GP22").blink(times=5, on_time=0.2, off_time=0.2)
 
 
 ################################
@@ -193,11 +187,8 @@ ir.deinit()
 if config.get("boot_message"):
     msg = str(config["boot_message"])
 
-    # Calculate max characters per line based on font + display width
-    fw, _ = terminalio.FONT.get_bounding_box()
-    max_chars = max(1, screen.display.width // fw)
-
-    lines = wrap_words(msg, max_chars)
+    # Measured against the active display's font (cells on the LCD)
+    lines = textlayout.wrap(msg, screen.text_width, screen.font, max_lines=2)
 
     screen.print_line("1:" + (lines[0] if len(lines) > 0 else ""))
     screen.print_line("2:" + (lines[1] if len(lines) > 1 else ""))
@@ -222,7 +213,7 @@ def display(msg):
 #     Returns a Menu instance ready to use     #
 ################################################
 try:
-    menu = load_menus(screen)
+    menu = load_menus(screen, config)
     # screen.print_line("1: Menu Loaded!")
     # screen.flush()
 except Exception as e:
@@ -231,10 +222,81 @@ except Exception as e:
     screen.flush()
     raise
 
+def show_queue_progress(q):
+    screen.toast(q.summary(), seconds=3.0)
+
+payload_queue.jobs.on_progress = show_queue_progress
+
+##################################################
+#     Restore last menu position / UI state      #
+##################################################
+state = StateStore(save_delay=config["state_save_delay_ms"] / 1000)
+state.restore(menu, screen)
+if menu.debug_enabled:
+    log.set_debug(True)
+menu.on_change = lambda: state.note(menu, screen)
+
+reloader = None
+if config.get("hot_reload"):
+    reloader = HotReloader(menu, screen, config)
+    if sprite2:
+        reloader.watch_sprite(sprite2)
+    menu.on_reload = reloader.check
+
+# Dim/sleep the display when idle and slow the loop down meanwhile
+idle = IdleManager.from_config(screen, config)
+
+C_KEYS = metrics.counter("input.keys")
+H_LOOP = metrics.histogram("loop_ms")
+
+##################################################
+#     Macro record / replay / soak (serial)      #
+##################################################
+recorder = Recorder()
+
+def macro_command(char):
+    """r: start/stop recording, p/f: replay at 1x/flat out,
+    k: soak on this screen, j: soak on a headless SimScreen."""
+    if char == 'r':
+        if recorder.active:
+            macro = recorder.stop()
+            screen.toast(f"Recorded {len(macro)} keys")
+        else:
+            recorder.start()
+            screen.toast("Recording")
+        return
+    try:
+        macro = Macro.load()
+    except (OSError, ValueError) as e:
+        log.error("MACRO", "%s", e)
+        screen.toast("No macro")
+        return
+    if char in ('p', 'f'):
+        stats = input_macro.replay(menu, macro, speed=1.0 if char == 'p' else 0)
+        print(input_macro.report(stats))
+        return
+
+    target = menu
+    target_screen = screen
+    if char == 'j':
+        target_screen = SimScreen(screen.page_size, screen.cols)
+        target = Menu(menu.menus, target_screen)
+    screen.show_overlay("Soak test", f"{config['soak_iterations']} runs")
+    stats = input_macro.soak(
+        target, target_screen, macro, iterations=config["soak_iterations"],
+        progress=lambda i, s: log.info("SOAK", "iter %d p95 %d ms", i, s.percentile(95)),
+    )
+    failures = input_macro.check(stats)
+    log.flush()
+    print(input_macro.report(stats, failures))
+    screen.dismiss_overlay()
+    menu.render()
+
 #####################
 #     Main loop     #
 #####################
 while True:
+    loop_t0 = metrics.start()
     data = uart.read(1)  # Read one byte
 
     if not data:
@@ -244,11 +306,17 @@ while True:
                 data = char.encode('utf-8')
         except Exception:
             pass
+
+    # Any input restores full speed; while asleep it only wakes the display
+    pressed = not (PINUP.value and PINDOWN.value and PINSELECT.value and PINBACK.value)
+    if (data or pressed) and idle.activity():
+        time.sleep(0.2)
+        continue
+
     # Serial input handling
     if data:
         char = data.decode('utf-8').strip().lower()
-        if config["debug_mode"]:
-            print(f"Char: {char}")
+        log.debug("INPUT", "char %r", char)
         if char == 'u':
             menu.move_up()
         if char == 'd':
@@ -257,6 +325,16 @@ while True:
             menu.select()
         if char == 'b':
             menu.back()
+        if char == 'm':
+            metrics.dump()
+        if char == 'z':
+            metrics.reset()
+            log.info("METRICS", "reset")
+        if char in ('u', 'd', 's', 'b'):
+            metrics.inc(C_KEYS)
+            recorder.note(char)
+        if char in ('r', 'p', 'f', 'k', 'j'):
+            macro_command(char)
         #if char not in ('', '\n', '\r', 'u', 'd', 's', 'b'):
         #    screen.print_line(f"1: Unknown input:")
         #    screen.print_line(f"2: {char}")
@@ -264,22 +342,55 @@ while True:
 
     # Physical button checks (run every cycle)
     if not PINUP.value:
-        print("UP button pressed")
+        log.debug("INPUT", "up")
+        recorder.note("u")
         menu.move_up()
+        metrics.inc(C_KEYS)
         time.sleep(0.2)
     if not PINDOWN.value:
-        print("Down button pressed")
+        log.debug("INPUT", "down")
+        recorder.note("d")
         menu.move_down()
+        metrics.inc(C_KEYS)
         time.sleep(0.2)
     if not PINSELECT.value:
-        print("Select button pressed")
+        log.debug("INPUT", "select")
+        recorder.note("s")
         menu.select()
+        metrics.inc(C_KEYS)
         time.sleep(0.2)
     if not PINBACK.value:
-        print("Back button pressed")
+        log.debug("INPUT", "back")
+        recorder.note("b")
         menu.back()
+        metrics.inc(C_KEYS)
         time.sleep(0.2)
 
-    time.sleep(0.05)
+    if reloader:
+        reloader.poll()
+
+    # One coalesced write once the UI has been idle for a moment
+    state.poll()
+
+    # IR blinks / repeat bursts
+    ircontrol.poll()
+
+    # Stream queued payloads to the receiver as its slot frees up
+    payload_queue.poll_all()
+
+    # Toast timeout + mirroring changed display pages to the host
+    screen.poll()
+
+    # Prepare payload frames while the cursor rests on a run entry
+    menu.tick()
+
+    # A few buffered log records, only while the console can take them
+    log.drain()
+
+    metrics.stop(H_LOOP, loop_t0)
+
+    # Fast poll while active or while queued work is in flight
+    idle.poll(busy=not payload_queue.all_idle() or ircontrol.busy())
+    time.sleep(idle.poll_interval())
 
 
@@ -2,6 +2,7 @@
 # Loads /config.json and provides configuration dictionary
 
 import json
+import log
 
 #################################
 #     Default Configuration     #
@@ -11,7 +12,27 @@ DEFAULT_CONFIG = {
     "i2c_address": "0x27",
     "invert_on_start": False,
     "boot_message": "Welcome to Pico Pebble",
-    "debug_mode": False
+    "debug_mode": False,
+    "prefetch_dwell_ms": 400,
+    "hot_reload": True,
+    "state_save_delay_ms": 2000,
+    "lcd_cols": 16,
+    "lcd_rows": 2,
+    "mirror_fps": 0,
+    "sprite_cache_kb": 32,
+    "dim_after_s": 30,
+    "sleep_after_s": 120,
+    "idle_poll_ms": 250,
+    "wake_target_ms": 100,
+    "log_level": "info",
+    "log_file": "",
+    "log_file_kb": 16,
+    "marquee_speed": 24,
+    "oled_partial": False,
+    "oled_fps": 10,
+    "spi_devices": [],
+    "soak_iterations": 1000,
+    "payload_compress": False
 }
 
 ###############################
@@ -31,6 +52,6 @@ def load_config():
             config.update(data)
             return config
     except Exception as e:
-        print("Failed to load config.json:", e)
+        log.error("CONFIG", "failed to load config.json: %s", e)
         return DEFAULT_CONFIG
 
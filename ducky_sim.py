@@ -0,0 +1,460 @@
+# ducky_sim.py (host side, CPython)
+# Dry-run DuckyScript payloads against the receiver's rules, no device needed.
+#
+#   python ducky_sim.py payloads/                 # every .dd in a folder
+#   python ducky_sim.py payloads/payload_a.dd -v  # with a per-line trace
+#   python ducky_sim.py payloads/ --json          # machine-readable report
+#   python ducky_sim.py payloads/ --lz            # frames as payload_compress sends them
+#
+# Mirrors SPI_Pro_Micro.ino step by step: the frame payloader.py sends
+# (REM META line + payload + EOT) goes through the SPI ISR's 256-byte buffer,
+# the META check in loop(), then hid_execute_payload()/hid_exec_line():
+# STRING, DELAY, DEFAULT_DELAY, REPEAT, REM and key combos, with lines cut to
+# 139 characters. Anything the receiver would truncate, drop or choke on is
+# reported, together with an execution-time estimate. LZ frames (META LZ=)
+# are decoded and checked the way the receiver's verify pass does, then run
+# without the 256-byte cap, since the receiver streams them into the executor.
+#
+# Timing model: every Keyboard.press/release/releaseAll sends one HID report,
+# and a report takes about one USB poll interval (--report-ms, 1 ms on a
+# full-speed host). delay() calls are taken at face value. STRING goes
+# through the receiver's batched keystroke engine (type_string()), replayed
+# report for report, including its REM RATE= pacing and conflict back-off.
+
+import argparse
+import json
+import os
+import re
+import sys
+
+import payload_lz
+import payload_pack
+
+# Receiver limits / constants (SPI_Pro_Micro.ino)
+BUF_SZ = 256
+LINE_SZ = 140              # char lineBuf[140]: 139 usable characters
+EOT = 0x04
+ENQ = 0x05
+SETTLE_MS = 500            # delay(500) after arming, before typing
+COMBO_HOLD_MS = 10         # hid_exec_combo: delay(10) before releaseAll
+MAX_KEYS = 6
+MAX_DEPTH = 16             # REPEAT recursion before we call it a hang
+MAX_BATCH = 6              # TYPE_MAX_BATCH
+MAX_BACKOFF = 3            # TYPE_MAX_BACKOFF: all-up held 1, 2, 4, 8 ms
+MAX_RATE = 4000            # TYPE_MAX_RATE, keys/s
+RATE_RE = re.compile(r"RATE=([-+]?\d+)(?: BATCH=([-+]?\d+))?")
+
+# US layout: shifted character -> the key it shares (asciiHid[])
+SHIFTED = dict(zip('~!@#$%^&*()_+{}|:"<>?', "`1234567890-=[]\\;',./"))
+
+# Host side (payloader.py / spi_comm.py)
+SPI_BAUD = 500000
+CS_SETTLE_MS = 2.0
+SEND_GAP_MS = 2.0
+
+REPORT_MS = 1.0
+
+MODIFIERS = {
+    "CTRL": "CTRL", "CONTROL": "CTRL", "SHIFT": "SHIFT",
+    "ALT": "ALT", "OPTION": "ALT",
+    "GUI": "GUI", "WINDOWS": "GUI", "WIN": "GUI", "COMMAND": "GUI",
+}
+KEY_NAMES = {
+    "ENTER", "TAB", "ESC", "ESCAPE", "BACKSPACE", "DELETE", "SPACE",
+    "UP", "DOWN", "LEFT", "RIGHT", "HOME", "END", "PAGEUP", "PAGEDOWN",
+}
+META_RE = re.compile(rb"REM META LEN=([-+]?\d+) SUM16=([-+]?\d+)(?: LZ=([-+]?\d+))?")
+
+def _atol(s):
+    # C atol(): optional sign and leading digits, 0 if none
+    m = re.match(r"\s*([-+]?\d+)", s)
+    return int(m.group(1)) if m else 0
+
+def _trim(s):
+    # The receiver's trim() only strips C isspace(); so does str.strip() for ASCII
+    return s.strip(" \t\n\r\v\f")
+
+def key_for_char(ch):
+    """(key, shifted) for a STRING character, None if it has no key."""
+    if ch == "\t":
+        return "\t", False
+    if "A" <= ch <= "Z":
+        return ch.lower(), True
+    if ch in SHIFTED:
+        return SHIFTED[ch], True
+    if 32 <= ord(ch) <= 126:
+        return ch, False
+    return None
+
+def key_known(tok):
+    """keycode_for_name() != 0 (after the RETURN/DEL renames)."""
+    if tok in KEY_NAMES:
+        return True
+    if tok[:1] == "F" and tok[1:2].isdigit():
+        if 1 <= _atol(tok[1:]) <= 12:
+            return True
+    return len(tok) == 1 and 32 <= ord(tok) <= 126
+
+###################################
+#     SPI receive + META check    #
+###################################
+def receive(frame):
+    """
+    Feed frame + EOT through the ISR. Returns (stored bytes, issues).
+    Past BUF_SZ the ISR flags overflow and restarts at index 0; ENQ bytes are
+    never stored and the first EOT ends the message.
+    """
+    issues = []
+    buf = bytearray(BUF_SZ)
+    idx = 0
+    overflowed = False
+    data = bytes(frame) + bytes((EOT,))
+    for i, b in enumerate(data):
+        if b == ENQ:
+            issues.append(("error", None, f"byte {i} is ENQ (0x05): the receiver drops it"))
+            continue
+        if b == EOT:
+            if i != len(data) - 1:
+                issues.append(("error", None, f"byte {i} is EOT (0x04): the frame ends early"))
+            break
+        if idx < BUF_SZ:
+            buf[idx] = b
+            idx += 1
+        else:
+            overflowed = True
+            idx = 0
+    if overflowed:
+        issues.append((
+            "error", None,
+            f"frame is {len(frame)} bytes; the receive buffer holds {BUF_SZ} "
+            "and wraps, so the payload arrives corrupted",
+        ))
+    return bytes(buf[:idx]), issues
+
+def check_meta(rx):
+    """
+    loop()'s META verify. Returns (payload bytes or None, issues, lz); for an
+    LZ frame the payload is the decoded text.
+    """
+    rx = rx.replace(b"\r", b"\n")
+    nl = rx.find(b"\n")
+    if nl < 0:
+        return None, [("error", None, "META: missing newline")], False
+    m = META_RE.match(rx[:nl])
+    if not m:
+        return None, [("error", None, "META: header missing or invalid")], False
+    payload = rx[nl + 1:]
+    exp_len, exp_sum = int(m.group(1)), int(m.group(2))
+    lz = m.group(3) is not None
+    if lz:
+        if len(payload) != int(m.group(3)):
+            return None, [(
+                "error", None,
+                f"LZ: expected {int(m.group(3))} wire bytes, received {len(payload)}",
+            )], lz
+        try:
+            payload = payload_lz.decompress(payload)
+        except ValueError as e:
+            return None, [("error", None, f"LZ: malformed stream ({e})")], lz
+    if len(payload) != exp_len or payload_pack.sum16(payload) != exp_sum:
+        return None, [(
+            "error", None,
+            f"META: expected len={exp_len} sum16={exp_sum}, received "
+            f"len={len(payload)} sum16={payload_pack.sum16(payload)}",
+        )], lz
+    return payload, [], lz
+
+#######################
+#     HID executor    #
+#######################
+class Executor:
+    """hid_execute_payload() with the HID calls replaced by counters."""
+
+    def __init__(self, report_ms=REPORT_MS):
+        self.report_ms = report_ms
+        self.default_delay = 0
+        self.last_cmd = ""
+        self.time_ms = 0.0
+        self.reports = 0
+        self.keystrokes = 0
+        self.type_rate = 0
+        self.type_batch = 1
+        self.type_ms = 0.0
+        self.type_keys = 0
+        self.conflicts = 0
+        self._down = ()         # (shifted, keys) the host last saw
+        self._backoff = 0
+        self.issues = []
+        self.trace = []
+        self.hung = False
+        self._lineno = 0
+
+    def _issue(self, level, msg):
+        self.issues.append((level, self._lineno, msg))
+
+    def _report(self, n=1):
+        self.reports += n
+        self.time_ms += n * self.report_ms
+
+    def _delay(self, ms):
+        if ms > 0:
+            self.time_ms += ms
+
+    def run(self, payload, limit=BUF_SZ):
+        if limit is not None:
+            payload = payload[:limit]
+        text = payload.replace(b"\r", b"\n").decode("latin-1")
+        for lineno, line in enumerate(text.replace("\0", "\n").split("\n"), 1):
+            line = _trim(line)
+            if not line or self.hung:
+                continue
+            self._lineno = lineno
+            t0 = self.time_ms
+            self.exec_line(line, 0)
+            self.trace.append((lineno, t0, self.time_ms - t0, line))
+
+    def exec_line(self, raw, depth):
+        if depth > MAX_DEPTH:
+            self.hung = True
+            self._issue(
+                "error",
+                "REPEAT recurses without end: the receiver saves the REPEAT line "
+                "itself as lastCmd, so this overflows its stack",
+            )
+            return
+        if len(raw) > LINE_SZ - 1 and depth == 0:
+            self._issue("warn", f"{len(raw)} chars, receiver keeps the first {LINE_SZ - 1}")
+        line = _trim(raw[:LINE_SZ - 1])
+        if not line:
+            return
+        if line.startswith("REM "):
+            if line.startswith("REM RATE="):
+                self._directive(line[4:])
+            return
+
+        self.last_cmd = line
+        upper = line.upper()
+
+        if upper.startswith("STRING "):
+            self._type(line[7:])
+            self._delay(self.default_delay)
+        elif upper.startswith("DELAY "):
+            self._delay(_atol(upper[6:]))
+            self._delay(self.default_delay)
+        elif upper.startswith("DEFAULT_DELAY ") or upper.startswith("DEFAULTDELAY "):
+            self.default_delay = _atol(upper.split(" ", 1)[1])
+        elif upper.startswith("REPEAT "):
+            n = _atol(upper[7:])
+            if n <= 0 or not self.last_cmd:
+                return
+            for _ in range(n):
+                self.exec_line(self.last_cmd, depth + 1)
+                if self.hung:
+                    return
+        else:
+            self._combo(upper)
+
+    def _directive(self, args):
+        m = RATE_RE.match(args)
+        if not m:
+            self._issue("warn", "REM RATE= needs a number of keys/s: directive ignored")
+            return
+        rate = int(m.group(1))
+        self.type_rate = min(max(rate, 0), MAX_RATE)
+        if self.type_rate != rate:
+            self._issue("warn", f"RATE={rate} is clamped to {self.type_rate}")
+        if m.group(2) is not None:
+            batch = int(m.group(2))
+            self.type_batch = min(max(batch, 1), MAX_BATCH)
+            if self.type_batch != batch:
+                self._issue("warn", f"BATCH={batch} is clamped to {self.type_batch}")
+
+    def _all_up(self):
+        self._down = ()
+        self._report(1)
+
+    def _send_batch(self, shifted, keys):
+        # type_flush()
+        if self._down and set(keys) & set(self._down[1]):
+            self.conflicts += 1
+            self._all_up()
+            self._delay(1 << self._backoff)
+            self._backoff = min(self._backoff + 1, MAX_BACKOFF)
+        else:
+            self._backoff = 0
+            if self._down and self._down[0] != shifted:
+                self._all_up()
+        if self.type_rate:
+            # Paced: the next report waits until this batch's share is used
+            self.reports += 1
+            self.time_ms += max(self.report_ms, len(keys) * 1000 / self.type_rate)
+        else:
+            self._report(1)
+        self._down = (shifted, tuple(keys))
+        self.type_keys += len(keys)
+
+    def _type(self, text):
+        # type_string(): batches of distinct keys sharing one shift state
+        t0 = self.time_ms
+        shifted, keys = False, []
+        for ch in text:
+            key = key_for_char(ch)
+            if key is None:
+                self._issue("warn", f"character 0x{ord(ch):02X} in STRING has no key and is skipped")
+                continue
+            if keys and (len(keys) >= self.type_batch or key[1] != shifted or key[0] in keys):
+                self._send_batch(shifted, keys)
+                keys = []
+            shifted = key[1]
+            keys.append(key[0])
+            self.keystrokes += 1
+        if keys:
+            self._send_batch(shifted, keys)
+        self._all_up()
+        self.type_ms += self.time_ms - t0
+
+    def _combo(self, upper):
+        mods = []
+        keys = []
+        for tok in upper.split(" "):
+            if not tok:
+                continue
+            if tok in MODIFIERS:
+                if len(mods) < MAX_KEYS:
+                    mods.append(tok)
+                continue
+            tok = {"RETURN": "ENTER", "DEL": "DELETE"}.get(tok, tok)
+            if not key_known(tok):
+                self._issue("warn", f"unknown key '{tok}' is ignored")
+                continue
+            if len(keys) < MAX_KEYS:
+                keys.append(tok)
+            else:
+                self._issue("warn", f"more than {MAX_KEYS} keys: '{tok}' is ignored")
+
+        if not keys and mods:
+            self._issue("warn", "modifiers with no key: nothing is pressed")
+            self._delay(self.default_delay)
+            return
+
+        self.keystrokes += len(keys)
+        self._report(len(mods) + len(keys))
+        self._delay(COMBO_HOLD_MS)
+        self._report(1)   # releaseAll
+        self._delay(self.default_delay)
+
+##################
+#     Report     #
+##################
+def wire_ms(nbytes, baud=SPI_BAUD):
+    return nbytes * 8 * 1000 / baud + 2 * CS_SETTLE_MS + SEND_GAP_MS
+
+def analyze(text, report_ms=REPORT_MS, baud=SPI_BAUD, lz=False):
+    """Run one payload's text through the receiver model. Returns a report dict."""
+    frame, paylen, _ = payload_pack.build_frame(text, lz)
+    rx, issues = receive(frame)
+    payload, meta_issues, lz_frame = check_meta(rx)
+    issues.extend(meta_issues)
+
+    ex = Executor(report_ms)
+    if payload is not None:
+        ex.run(payload, None if lz_frame else BUF_SZ)
+        issues.extend(ex.issues)
+
+    head = frame.index(b"\n") + 1
+    return {
+        "payload_bytes": paylen,
+        "lz": lz_frame,
+        "lz_pct": (len(frame) - head) * 100 // paylen if lz_frame and paylen else None,
+        "frame_bytes": len(frame),
+        "wire_bytes": len(frame) + 1,
+        "wire_ms": round(wire_ms(len(frame) + 1, baud), 2),
+        "buffer": BUF_SZ,
+        "executes": payload is not None and not ex.hung,
+        "hangs": ex.hung,
+        "keystrokes": ex.keystrokes,
+        "hid_reports": ex.reports,
+        "type_kps": round(ex.type_keys * 1000 / ex.type_ms) if ex.type_ms else None,
+        "rate": ex.type_rate,
+        "batch": ex.type_batch,
+        "conflicts": ex.conflicts,
+        "exec_ms": round(ex.time_ms, 1),
+        "settle_ms": SETTLE_MS,
+        "issues": [{"level": lvl, "line": ln, "msg": msg} for lvl, ln, msg in issues],
+        "trace": [
+            {"line": ln, "t_ms": round(t, 1), "ms": round(dt, 1), "text": txt}
+            for ln, t, dt, txt in ex.trace
+        ],
+    }
+
+def print_report(name, r, verbose=False, out=sys.stdout):
+    print(name, file=out)
+    print(
+        f"  frame {r['frame_bytes']}/{r['buffer']} bytes, {r['wire_bytes']} on the wire "
+        f"(~{r['wire_ms']} ms)",
+        file=out,
+    )
+    if r["lz"]:
+        print(f"  LZ payload {r['payload_bytes']} -> {r['lz_pct']}% on the wire", file=out)
+    if r["executes"]:
+        total = (r["exec_ms"] + r["settle_ms"]) / 1000
+        print(
+            f"  {r['keystrokes']} keystrokes, {r['hid_reports']} HID reports, "
+            f"~{total:.2f} s to run ({r['exec_ms']} ms + {r['settle_ms']} ms settle, "
+            "ARM wait not included)",
+            file=out,
+        )
+        if r["type_kps"] is not None:
+            print(
+                f"  STRING at ~{r['type_kps']} keys/s (rate {r['rate'] or 'unpaced'}, "
+                f"batch {r['batch']}, {r['conflicts']} rollover conflicts)",
+                file=out,
+            )
+    elif r["hangs"]:
+        print("  hangs the receiver", file=out)
+    else:
+        print("  would not execute", file=out)
+    if verbose:
+        for t in r["trace"]:
+            print(f"  {t['line']:>4} +{t['t_ms']:>8} ms {t['ms']:>8} ms  {t['text']}", file=out)
+    for i in r["issues"]:
+        where = f"line {i['line']}: " if i["line"] else ""
+        print(f"  [{i['level'].upper()}] {where}{i['msg']}", file=out)
+
+def payload_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(
+                os.path.join(path, n) for n in sorted(os.listdir(path)) if n.endswith(".dd")
+            )
+        else:
+            files.append(path)
+    return files
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate DuckyScript payloads on the Pro Micro receiver")
+    parser.add_argument("paths", nargs="+", help=".dd files or folders")
+    parser.add_argument("-v", "--verbose", action="store_true", help="per-line timing trace")
+    parser.add_argument("--json", action="store_true", help="print the reports as JSON")
+    parser.add_argument("--report-ms", type=float, default=REPORT_MS, help="ms per HID report")
+    parser.add_argument("--baud", type=int, default=SPI_BAUD, help="SPI clock used by payloader.py")
+    parser.add_argument("--lz", action="store_true", help="LZ-code payloads (payload_compress)")
+    args = parser.parse_args(argv)
+
+    reports = {}
+    for path in payload_files(args.paths):
+        with open(path, "r", encoding="utf-8") as f:
+            reports[path] = analyze(f.read(), report_ms=args.report_ms, baud=args.baud, lz=args.lz)
+
+    if args.json:
+        print(json.dumps(reports, indent=1))
+    else:
+        for path, r in reports.items():
+            print_report(path, r, verbose=args.verbose)
+
+    failed = any(i["level"] == "error" for r in reports.values() for i in r["issues"])
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,36 +1,152 @@
 import time
 import board
-from payloader import send_payload
+from payloader import send_payload, prefetch_payload, split_target
+import payload_queue
+import metrics
+import log
+import textlayout
 from ircontrol import try_handle as ir_try_handle
+from menu_model import T_MENU, T_RUN, T_MESSAGE, T_COMMAND, T_ACTION, MAIN_TITLE
 
 
 file1 = '/picoPebbleMenuButton.bmp'
 file2 = '/picoPebbleMenuButtonSelected.bmp'
 file3 = '/picoPebbleMenuButtonPressed.bmp'
 
+C_RENDER = metrics.counter("menu.render")
+H_RENDER = metrics.histogram("menu.render_ms")
+C_PAGE_BUILD = metrics.counter("menu.page_build")
+
 class Menu:
     ###############################
     #     Initialize the menu     #
     ###############################
-    def __init__(self, menus, screen):
+    def __init__(self, menus, screen, prefetch_dwell=None, marquee_speed=24):
         self.screen = screen
-        self.menus = {m["title"]: m for m in menus if "title" in m}
+        # menu_model.MenuModel; `title in self.menus` works as before
+        self.menus = menus
         self.stack = []
-        self.current_title = "Main Menu"
+        self.current_title = MAIN_TITLE
         self.index = 0
         self.debug_enabled = False
+        # Soak/replay: actions are shown but not executed, no pauses
+        self.dry_run = False
+
+        # Seconds the cursor must rest on a run entry before its payload
+        # frame is prepared ahead of select (None disables prefetch)
+        self.prefetch_dwell = prefetch_dwell
+        self._dwell_t = time.monotonic()
+        self._prefetched = False
+        self._select_t = None
+
+        # Set by code.py to the hot-reloader; returns a short status string
+        self.on_reload = None
+        # Set by code.py; called after every redraw (state persistence)
+        self.on_change = None
+
+        # OLED: prebuilt pages of the active menu, (title, first index) ->
+        # screen.MenuPage. tick() builds the neighbours of the shown page.
+        self._pages = {}
+        self._page_key = None
+
+        # Marquee for the selected row (px/s, 0 = ellipsis only): OLED pages
+        # scroll their own label; on the LCD this is
+        # [row, name, textlayout.Marquee, last offset]
+        self.marquee_speed = marquee_speed
+        self._lcd_marquee = None
+
+        self.render()
+
+    #######################################################
+    #     Swap in reloaded menus, keeping stack/cursor     #
+    #######################################################
+    def _reload_menus(self):
+        """One-shot re-read of the menu files when no HotReloader is wired."""
+        import menu_loader      # imports this module, so not at the top
+        try:
+            self.set_menus(menu_loader.reload_all_menu_files(self.screen))
+        except Exception as e:
+            log.error("MENU", "reload failed: %s", e)
+            return "Menu error"
+        return "Menus reloaded"
+
+    def set_menus(self, menus):
+        self.menus = menus
+        self.invalidate_pages()
+        self.stack = [(t, i) for (t, i) in self.stack if t in self.menus]
+        if self.current_title not in self.menus:
+            if self.stack:
+                self.current_title, self.index = self.stack.pop()
+            else:
+                self.current_title = MAIN_TITLE
+                self.index = 0
+        # render() clamps the cursor to the new option count
         self.render()
 
+    def _current(self):
+        rec = self.menus.get(self.current_title)
+        if rec is None and len(self.menus):
+            # Titles can vanish on reload; fall back to the first menu
+            rec = self.menus.records[0]
+            self.current_title = rec.title
+            self.index = 0
+        return rec
+
+    ####################################
+    #     Prebuilt page management     #
+    ####################################
+    def _page(self, rec, start):
+        key = (rec.title, start)
+        page = self._pages.get(key)
+        if page is None:
+            names = rec.names[start:start + self.screen.page_size]
+            page = self.screen.menu_page(names, file1, file2, self.marquee_speed)
+            self._pages[key] = page
+            metrics.inc(C_PAGE_BUILD)
+        return page
+
+    def _neighbours(self, rec, start):
+        size = self.screen.page_size
+        keys = [(rec.title, start)]
+        if start - size >= 0:
+            keys.append((rec.title, start - size))
+        if start + size < len(rec):
+            keys.append((rec.title, start + size))
+        return keys
+
+    def invalidate_pages(self):
+        """Drop every prebuilt page (menus or config reloaded)."""
+        for page in self._pages.values():
+            self.screen.drop_page(page)
+        self._pages.clear()
+        self._page_key = None
+
+    def _prerender_step(self):
+        # One missing neighbour page per main-loop pass
+        if self._page_key is None:
+            return
+        rec = self.menus.get(self._page_key[0])
+        if rec is None:
+            return
+        for key in self._neighbours(rec, self._page_key[1]):
+            if key not in self._pages:
+                self._page(rec, key[1])
+                return
+
     ###############################
     #     Render current view     #
     ###############################
 
     def render(self):
-        PAGE_SIZE = 4
-        line_y = [0, 16, 32, 48]
+        t0 = metrics.start()
+        PAGE_SIZE = self.screen.page_size
+
+        # Every redraw means the cursor (or menu) may have changed
+        self._dwell_t = time.monotonic()
+        self._prefetched = False
 
-        options = self.menus[self.current_title].get("options", [])
-        total = len(options)
+        rec = self._current()
+        total = len(rec) if rec else 0
         if total == 0:
             self.screen.clear()
             self.screen.flush()
@@ -40,6 +156,38 @@ class Menu:
         self.index = min(self.index, max_index)
         start = (self.index // PAGE_SIZE) * PAGE_SIZE
 
+        if self.screen.dt == "oled":
+            self._show_page(rec, start)
+        else:
+            self._draw_page(rec, start, total)
+
+        metrics.stop(H_RENDER, t0)
+        metrics.inc(C_RENDER)
+
+        if self.on_change:
+            self.on_change()
+
+    def _show_page(self, rec, start):
+        # A page flip costs the same as a cursor move: flags only, unless
+        # the page has not been built yet
+        page = self._page(rec, start)
+        page.select(self.index - start)
+        if page.marquee:
+            page.marquee.restart()
+        self.screen.clear()
+        self.screen.show_page(page)
+
+        self._page_key = (rec.title, start)
+        keep = self._neighbours(rec, start)
+        for key in [k for k in self._pages if k not in keep]:
+            self.screen.drop_page(self._pages.pop(key))
+
+    def _draw_page(self, rec, start, total):
+        PAGE_SIZE = self.screen.page_size
+        line_y = [row * 16 for row in range(PAGE_SIZE)]
+        font = self.screen.font
+        self._lcd_marquee = None
+
         self.screen.clear()
 
         for row in range(PAGE_SIZE):
@@ -50,8 +198,18 @@ class Menu:
 
             self.screen.draw_bitmap(bmp, 0, y)
             if global_idx < total:
-                name = options[global_idx]["name"]
-                self.screen.draw_text(name[:19], 6, y + 7)
+                name = rec.names[global_idx]
+                if self.screen.dt == "lcd":
+                    # No button bitmaps on a character LCD: mark with '>'
+                    marker = ">" if selected else " "
+                    room = self.screen.cols - 1
+                    self.screen.draw_text(marker + textlayout.fit(name, room, None), 0, y + 7)
+                    if selected and len(name) > room and self.marquee_speed:
+                        # Cells per second; roughly the OLED pixel speed
+                        speed = max(1, self.marquee_speed // 6)
+                        self._lcd_marquee = [row, name, textlayout.Marquee(len(name) - room, speed), 0]
+                else:
+                    self.screen.draw_text(textlayout.fit(name, self.screen.text_width - 14, font), 6, y + 7)
 
         self.screen.flush()
 
@@ -67,8 +225,8 @@ class Menu:
     #     Move selection down     #
     ###############################
     def move_down(self):
-        options = self.menus[self.current_title].get("options", [])
-        if self.index < len(options) - 1:
+        rec = self._current()
+        if rec and self.index < len(rec) - 1:
             self.index += 1
             self.render()
 
@@ -76,41 +234,84 @@ class Menu:
     #     Select the current action     #
     #####################################
     def select(self):
-        current = self.menus[self.current_title]
-        option = current.get("options", [])[self.index]
-        otype = option.get("type", "action")
-        action = option.get("action")
+        self._select_t = time.monotonic()
+        rec = self._current()
+        if not rec or self.index >= len(rec):
+            return
+        otype = rec.types[self.index]
+        action = rec.actions[self.index]
 
-        if otype == "run":
-            self.screen.clear()
-            self.screen.flush()
-            self.screen.draw_text(f"Running {action}", 2, 30)
-            self.handle_action(action)
-            self.screen.flush()
-            time.sleep(1)
-            self.render()
+        if otype == T_RUN:
+            # Status goes on the overlay layer; the menu layer is only hidden
+            self.screen.show_overlay("Running", str(action))
+            self.handle_action(action, keep_menu=True)
+            if not self.screen.dismiss_overlay():
+                self.render()
 
-        elif otype == "message":
+        elif otype == T_MESSAGE:
             self.screen.clear()
             self.screen.print_line(str(action))
             self.screen.flush()
-            time.sleep(1)
+            self._pause(1)
             self.render()
 
-        elif otype == "menu" and action in self.menus:
+        elif otype == T_MENU and rec.links[self.index] >= 0:
             self.stack.append((self.current_title, self.index))
-            self.current_title = action
+            self.current_title = self.menus.records[rec.links[self.index]].title
             self.index = 0
             self.render()
 
-        elif otype == "command":
+        elif otype == T_COMMAND:
             self.handle_command(action)
             self.render()
 
-        elif otype == "action":
+        elif otype == T_ACTION:
             self.handle_action(action)
             self.render()
 
+    ##############################################################
+    #     Called every main loop pass: page and payload prefetch  #
+    ##############################################################
+    def tick(self, now=None):
+        self._prerender_step()
+        self._marquee_step()
+        if self._prefetched or self.prefetch_dwell is None:
+            return
+        if now is None:
+            now = time.monotonic()
+        if now - self._dwell_t < self.prefetch_dwell:
+            return
+
+        self._prefetched = True
+        rec = self._current()
+        if not rec or self.index >= len(rec):
+            return
+        action = rec.actions[self.index]
+        if rec.types[self.index] == T_RUN and action.startswith("run:"):
+            prefetch_payload(split_target(action.replace("run:", ""))[0])
+
+    def _marquee_step(self):
+        if not self.marquee_speed or not self.screen.awake:
+            return
+        if self.screen.dt == "oled":
+            page = self._pages.get(self._page_key)
+            if page is not None:
+                page.scroll()
+            return
+        m = self._lcd_marquee
+        if m is None:
+            return
+        row, name, marquee, last = m
+        off = marquee.offset()
+        if off == last:
+            return
+        m[3] = off
+        # Only the shifted cells differ from the shadow, so this is cheap
+        room = self.screen.cols - 1
+        text = name[off:off + room] if off else textlayout.fit(name, room, None)
+        self.screen.draw_text(">" + text, 0, row * 16 + 7)
+        self.screen.flush()
+
     ####################################
     #     Go back to previous menu     #
     ####################################
@@ -129,34 +330,35 @@ class Menu:
             self.screen.clear()
         elif action == "toggle_debug":
             self.debug_enabled = not self.debug_enabled
+            log.set_debug(self.debug_enabled)
             self.screen.clear()
             state = "ON" if self.debug_enabled else "OFF"
             self.screen.print_line(f"Debug: {state}")
             self.screen.flush()
-            time.sleep(1)
+            self._pause(1)
         elif action == "reset_cursor":
             self.index = 0
             self.render()
         elif action == "invert_once":
             self.screen.invert()
-            time.sleep(0.5)
+            self._pause(0.5)
             self.screen.invert()
         elif action == "reload_menu":
             self.screen.clear()
             self.screen.print_line("Reloading...")
-            slef.screen.flush()
-            time.sleep(0.75)
+            self.screen.flush()
 
-            # You would ideally re-call load_menus(screen) here
-            # for now, just simulate it with:
-            self.index = 0
+            result = self.on_reload() if self.on_reload else self._reload_menus()
+            self.screen.print_line(f"2: {result}")
+            self.screen.flush()
+            self._pause(0.75)
             self.render()
         elif action == "flash_message":
             self.screen.clear()
             self.screen.print_line("1: * FLASHING *")
             self.screen.print_line("2: Message here")
             self.screen.flush()
-            time.sleep(0.75)
+            self._pause(0.75)
             self.screen.clear()
             self.render()
         else:
@@ -164,23 +366,45 @@ class Menu:
             self.screen.print_line("Unknown command:")
             self.screen.print_line(str(action))
             self.screen.flush()
-            time.sleep(1)
+            self._pause(1)
+
+    def _pause(self, seconds):
+        if not self.dry_run:
+            time.sleep(seconds)
 
     ##############################################
     #     Placeholder for future action handler     #
     ##############################################
-    def handle_action(self, action):
-        self.screen.clear()
+    def handle_action(self, action, keep_menu=False):
+        if not keep_menu:
+            self.screen.clear()
+
+        if self.dry_run:
+            self.screen.print_line(f"Action: {action}")
+            self.screen.flush()
+            return
 
         if ir_try_handle(action, self.screen):
             return 
 
         if action.startswith("run:"):
-            print("got to handle_action")
-            payload_file = action.replace("run:", "")
-            send_payload(payload_file, screen=self.screen)
+            log.debug("MENU", "run %s", action)
+            payload_file, device = split_target(action.replace("run:", ""))
+            send_payload(payload_file, screen=self.screen, t_select=self._select_t, device=device)
+        elif action.startswith("queue:"):
+            names = [n.strip() for n in action.replace("queue:", "").split(",") if n.strip()]
+            try:
+                queues = payload_queue.submit(names)
+            except KeyError as e:
+                log.error("MENU", "queue: no receiver named %s", e.args[0])
+                self.screen.print_line("1: No receiver")
+                self.screen.print_line(f"2: {e.args[0]}")
+            else:
+                summary = queues[-1].summary() if queues else "Queue empty"
+                self.screen.print_line(f"1: Queued {len(names)}")
+                self.screen.print_line(f"2: {summary}")
         else:
             self.screen.print_line(f"Action: {action}")
         self.screen.flush()
-        time.sleep(1)
+        self._pause(1)
 
@@ -0,0 +1,164 @@
+# hot_reload.py (CircuitPython)
+# Picks up edits to /menus/, /config.json and /sprites/ without a board reset.
+#
+# Files are fingerprinted by (mtime, size). Only changed files are re-parsed
+# and swapped into the live Menu/Screen, so the menu stack and cursor survive.
+# Edits to .py files still need a fresh interpreter: those trigger
+# supervisor.reload() instead.
+
+import os
+import time
+import log
+import menu_loader
+import sprite_api
+import payloader
+from menu_loader import MENU_DIR
+from config_loader import load_config, CONFIG_PATH
+
+SPRITE_DIR = "/sprites/"
+CODE_DIR = "/"
+
+#############################
+#     File fingerprints     #
+#############################
+def file_stamp(path):
+    try:
+        st = os.stat(path)
+        return (st[8], st[6])
+    except OSError:
+        return None
+
+def scan_dir(path, suffixes):
+    if isinstance(suffixes, str):
+        suffixes = (suffixes,)
+    stamps = {}
+    try:
+        names = os.listdir(path)
+    except OSError:
+        return stamps
+    for name in names:
+        for suffix in suffixes:
+            if name.endswith(suffix):
+                stamps[name] = file_stamp(path + name)
+                break
+    return stamps
+
+def changed_names(old, new):
+    return [n for n in set(old) | set(new) if old.get(n) != new.get(n)]
+
+class HotReloader:
+    def __init__(self, menu, screen, config, interval=2.0):
+        self.menu = menu
+        self.screen = screen
+        self.config = config        # live dict, updated in place
+        self.interval = interval
+        self.sprites = []           # Sprite instances built from /sprites/*.json
+
+        self._menus = scan_dir(MENU_DIR, ".json")
+        self._config = file_stamp(CONFIG_PATH)
+        self._sprite_files = scan_dir(SPRITE_DIR, ".json")
+        self._code = scan_dir(CODE_DIR, (".py", ".mpy"))
+        self._next_check = time.monotonic() + interval
+
+    def watch_sprite(self, sprite):
+        if sprite.config_path and sprite not in self.sprites:
+            self.sprites.append(sprite)
+
+    ###################################
+    #     Called from the main loop   #
+    ###################################
+    def poll(self, now=None):
+        if now is None:
+            now = time.monotonic()
+        if now < self._next_check:
+            return None
+        self._next_check = now + self.interval
+        return self.check()
+
+    def check(self):
+        """Reload whatever changed. Returns a short status string."""
+        code = scan_dir(CODE_DIR, (".py", ".mpy"))
+        if changed_names(self._code, code):
+            log.info("RELOAD", "code changed, restarting")
+            log.flush()
+            import supervisor
+            supervisor.reload()
+
+        done = []
+
+        stamp = file_stamp(CONFIG_PATH)
+        if stamp != self._config:
+            self._config = stamp
+            self._reload_config()
+            done.append("config")
+
+        sprite_files = scan_dir(SPRITE_DIR, ".json")
+        changed = changed_names(self._sprite_files, sprite_files)
+        self._sprite_files = sprite_files
+        if changed:
+            self._reload_sprites(changed)
+            done.append(f"{len(changed)} sprite")
+
+        menus = scan_dir(MENU_DIR, ".json")
+        changed = changed_names(self._menus, menus)
+        self._menus = menus
+        if changed:
+            try:
+                self.menu.set_menus(menu_loader.reload_menu_files(changed, self.screen))
+                done.append(f"{len(changed)} menu")
+            except Exception as e:
+                log.error("RELOAD", "menus failed: %s", e)
+                return "Menu error"
+
+        if done:
+            log.info("RELOAD", ", ".join(done))
+            return "Reloaded " + ", ".join(done)
+        return "Up to date"
+
+    def _reload_config(self):
+        new = load_config()
+        old = dict(self.config)
+
+        if (new.get("display_type") != old.get("display_type")
+                or new.get("oled_partial") != old.get("oled_partial")):
+            # The display driver and its refresh mode are chosen at boot
+            log.flush()
+            import supervisor
+            supervisor.reload()
+
+        self.config.clear()
+        self.config.update(new)
+
+        log.configure(new)
+        if self.menu.debug_enabled:
+            log.set_debug(True)
+
+        if bool(new.get("invert_on_start")) != bool(old.get("invert_on_start")):
+            self.screen.invert()
+
+        dwell = new.get("prefetch_dwell_ms")
+        self.menu.prefetch_dwell = None if dwell is None else int(dwell) / 1000
+        self.menu.marquee_speed = int(new.get("marquee_speed", 24))
+
+        # Drops cached frames when compression is toggled
+        payloader.configure(new)
+
+        budget = int(new.get("sprite_cache_kb", 0)) * 1024
+        if budget != sprite_api.tiles.budget:
+            # Start over rather than evict down to a smaller budget
+            sprite_api.tiles.clear()
+            sprite_api.tiles.budget = budget
+
+        # Prebuilt menu pages may depend on anything above
+        self.menu.invalidate_pages()
+        self.menu.render()
+
+    def _reload_sprites(self, changed):
+        for spr in self.sprites:
+            name = spr.config_path.rsplit("/", 1)[-1]
+            if name not in changed:
+                continue
+            try:
+                spr.reload_config()
+            except Exception as e:
+                log.error("RELOAD", "sprite %s failed: %s", name, e)
@@ -0,0 +1,311 @@
+# input_macro.py (CircuitPython)
+# Record navigation input, replay it against the real Menu, soak-test it.
+#
+# A macro is a text file of key events with the delay before each one:
+#
+#   #PPMACRO 1
+#   120 d
+#   300 s
+#
+# keys are u/d/s/b, the same letters the serial console takes. code.py
+# records serial keys and buttons while recording is on ('r' over serial)
+# and replays the file at 1x ('p') or flat out ('f').
+#
+# soak() replays the macro from the main menu over and over with the menu
+# in dry-run mode (actions are shown, not executed; no pauses) and keeps:
+#   - key-to-render latency of every event (exact percentiles),
+#   - heap in use and display node count every sample_every iterations,
+# then checks the result against thresholds so a regression fails loudly.
+# It drives either the real Screen ('k' over serial) or SimScreen, a
+# headless stand-in for running on a desktop simulator.
+
+import gc
+import time
+from array import array
+
+import metrics
+from metrics import ticks_ms, ticks_diff
+import log
+from menu_model import MAIN_TITLE
+
+MAGIC = "#PPMACRO 1"
+KEYS = "udsb"
+MACRO_FILE = "/macro.txt"
+MAX_EVENTS = 1024
+MAX_LATENCY_SAMPLES = 2048
+
+# Fail the soak when any of these is exceeded (None skips the check)
+DEFAULT_THRESHOLDS = {
+    "p95_ms": 150,          # key-to-render, 95th percentile
+    "max_ms": 1000,         # slowest single event
+    "heap_growth": 4096,    # bytes in use, last sample minus first
+    "node_growth": 0,       # display nodes, last sample minus first
+}
+
+H_KEY = metrics.histogram("macro.key_ms")
+
+def dispatch(menu, key):
+    if key == "u":
+        menu.move_up()
+    elif key == "d":
+        menu.move_down()
+    elif key == "s":
+        menu.select()
+    elif key == "b":
+        menu.back()
+
+##########################
+#     Macro storage      #
+##########################
+class Macro:
+    """Delays (ms, capped at 65535) and keys as two compact arrays."""
+
+    def __init__(self):
+        self.delays = array("H")
+        self.keys = bytearray()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, delay_ms, key):
+        if len(self.keys) >= MAX_EVENTS or key not in KEYS:
+            return False
+        self.delays.append(min(65535, max(0, int(delay_ms))))
+        self.keys.append(ord(key))
+        return True
+
+    def events(self):
+        for i in range(len(self.keys)):
+            yield self.delays[i], chr(self.keys[i])
+
+    def save(self, path=MACRO_FILE):
+        with open(path, "w") as f:
+            f.write(MAGIC + "\n")
+            for delay, key in self.events():
+                f.write(f"{delay} {key}\n")
+
+    @classmethod
+    def load(cls, path=MACRO_FILE):
+        macro = cls()
+        with open(path, "r") as f:
+            if f.readline().strip() != MAGIC:
+                raise ValueError(f"{path}: not a macro file")
+            for line in f:
+                parts = line.split()
+                if len(parts) == 2 and not parts[0].startswith("#"):
+                    macro.add(int(parts[0]), parts[1])
+        return macro
+
+class Recorder:
+    def __init__(self):
+        self.macro = None
+        self._last = 0
+
+    @property
+    def active(self):
+        return self.macro is not None
+
+    def start(self):
+        self.macro = Macro()
+        self._last = ticks_ms()
+
+    def note(self, key, now=None):
+        """Called for every navigation key; cheap no-op when not recording."""
+        if self.macro is None:
+            return
+        if now is None:
+            now = ticks_ms()
+        self.macro.add(ticks_diff(now, self._last), key)
+        self._last = now
+
+    def stop(self, path=MACRO_FILE):
+        """Finish and write the macro (flash must be writable)."""
+        macro = self.macro
+        self.macro = None
+        if macro is None:
+            return None
+        try:
+            macro.save(path)
+        except OSError as e:
+            log.error("MACRO", "save %s failed: %s", path, e)
+        return macro
+
+###########################
+#     Replay and soak     #
+###########################
+class SoakStats:
+    def __init__(self, capacity=MAX_LATENCY_SAMPLES):
+        self.latency = array("H", [0] * capacity)
+        self.count = 0          # events seen (may exceed capacity)
+        self.max_ms = 0
+        self.samples = []       # (iteration, heap bytes or None, nodes)
+
+    def add_latency(self, ms):
+        ms = min(65535, max(0, ms))
+        self.latency[self.count % len(self.latency)] = ms
+        self.count += 1
+        if ms > self.max_ms:
+            self.max_ms = ms
+        metrics.observe(H_KEY, ms)
+
+    def percentile(self, p):
+        n = min(self.count, len(self.latency))
+        if not n:
+            return 0
+        ordered = sorted(self.latency[:n])
+        return ordered[min(n - 1, (n * p) // 100)]
+
+def heap_used():
+    gc.collect()
+    try:
+        return gc.mem_alloc()
+    except AttributeError:
+        # CPython (desktop simulator): only known while tracemalloc runs
+        try:
+            import tracemalloc
+            if tracemalloc.is_tracing():
+                return tracemalloc.get_traced_memory()[0]
+        except ImportError:
+            pass
+    return None
+
+def replay(menu, macro, speed=1.0, stats=None):
+    """Feed macro to menu; speed 0 = no delays. Returns stats."""
+    if stats is None:
+        stats = SoakStats()
+    for delay, key in macro.events():
+        if speed and delay:
+            time.sleep(delay / 1000 / speed)
+        t0 = ticks_ms()
+        dispatch(menu, key)
+        stats.add_latency(ticks_diff(ticks_ms(), t0))
+    return stats
+
+def _reset(menu):
+    menu.stack = []
+    menu.current_title = MAIN_TITLE
+    menu.index = 0
+    menu.render()
+
+def soak(menu, screen, macro, iterations=1000, sample_every=50, speed=0, progress=None):
+    """
+    Replay macro `iterations` times from the main menu in dry-run mode.
+    progress(i, stats) is called at every sample point.
+    """
+    stats = SoakStats()
+    old_dry = menu.dry_run
+    menu.dry_run = True
+    try:
+        for i in range(iterations):
+            _reset(menu)
+            replay(menu, macro, speed, stats)
+            if i % sample_every == 0 or i == iterations - 1:
+                stats.samples.append((i, heap_used(), screen.node_count()))
+                if progress:
+                    progress(i, stats)
+    finally:
+        menu.dry_run = old_dry
+        _reset(menu)
+    return stats
+
+def check(stats, thresholds=None):
+    """List of failure strings; empty when every threshold holds."""
+    limits = dict(DEFAULT_THRESHOLDS)
+    if thresholds:
+        limits.update(thresholds)
+    failures = []
+    p95 = stats.percentile(95)
+    if limits["p95_ms"] is not None and p95 > limits["p95_ms"]:
+        failures.append(f"p95 {p95} ms > {limits['p95_ms']}")
+    if limits["max_ms"] is not None and stats.max_ms > limits["max_ms"]:
+        failures.append(f"max {stats.max_ms} ms > {limits['max_ms']}")
+    if len(stats.samples) >= 2:
+        first, last = stats.samples[0], stats.samples[-1]
+        if limits["heap_growth"] is not None and first[1] is not None and last[1] is not None:
+            grew = last[1] - first[1]
+            if grew > limits["heap_growth"]:
+                failures.append(f"heap +{grew} B > {limits['heap_growth']}")
+        if limits["node_growth"] is not None:
+            grew = last[2] - first[2]
+            if grew > limits["node_growth"]:
+                failures.append(f"nodes +{grew} > {limits['node_growth']}")
+    return failures
+
+def report(stats, failures=None):
+    lines = [
+        f"[SOAK] events={stats.count} p50={stats.percentile(50)} "
+        f"p95={stats.percentile(95)} p99={stats.percentile(99)} max={stats.max_ms} ms"
+    ]
+    for i, heap, nodes in stats.samples:
+        lines.append(f"[SOAK] iter {i} heap={'-' if heap is None else heap} nodes={nodes}")
+    if failures is not None:
+        lines.append("[SOAK] FAIL " + "; ".join(failures) if failures else "[SOAK] PASS")
+    return "\n".join(lines)
+
+##################################
+#     Headless screen backend    #
+##################################
+class _MonoFont:
+    """6 px cells, like terminalio.FONT, for text measurement."""
+
+    class _Glyph:
+        shift_x = 6
+
+    def get_bounding_box(self):
+        return (6, 12)
+
+    def get_glyph(self, codepoint):
+        return self._Glyph
+
+class SimScreen:
+    """
+    Stand-in for screen.Screen with the surface Menu uses. Drawing adds a
+    node to the current layer and clear() drops them, mirroring how the
+    OLED layers grow, so node_count() catches the same leaks.
+    """
+
+    def __init__(self, page_size=4, cols=21):
+        self.dt = "sim"
+        self.page_size = page_size
+        self.cols = cols
+        self.font = _MonoFont()
+        self.text_width = cols * 6
+        self.inverted = False
+        self.buffer = ["", ""]
+        self.layers = {"menu": [], "pages": [], "overlay": []}
+        self.awake = True
+
+    def clear(self, layer="menu"):
+        self.buffer = ["", ""]
+        self.layers[layer] = []
+
+    def flush(self):
+        pass
+
+    def print_line(self, msg):
+        if msg.startswith("2:"):
+            self.buffer[1] = msg[2:].strip()
+        else:
+            self.buffer[0] = msg[2:].strip() if msg.startswith("1:") else msg.strip()
+
+    def draw_text(self, text, xpos=0, ypos=0, layer="menu"):
+        self.layers[layer].append(("text", text))
+
+    def draw_bitmap(self, bmpfile, xpos=0, ypos=0, layer="menu"):
+        self.layers[layer].append(("bitmap", bmpfile))
+
+    def show_overlay(self, line1="", line2="", hide_menu=True):
+        self.buffer = [line1, line2]
+
+    def dismiss_overlay(self):
+        self.buffer = ["", ""]
+        return False
+
+    def toast(self, text, seconds=2.0):
+        pass
+
+    def invert(self):
+        self.inverted = not self.inverted
+
+    def node_count(self):
+        return sum(len(nodes) for nodes in self.layers.values())
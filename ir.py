@@ -0,0 +1,158 @@
+# ir.py (CircuitPython)
+# IR transmit: packed pulse-train library + scheduled, non-blocking output.
+#
+# Codes are compiled on the host by ir_codes.py into /ir/codes.bin. Only the
+# small binary index is read at startup; pulse trains are read on demand
+# straight into array('H') buffers and kept in a little LRU of hot codes.
+#
+# IRLed never sleeps. blink() and send() queue steps that poll() runs from
+# the main loop, so a repeat burst or a boot blink never stalls menu input.
+# (A single frame is handed to PulseOut in one go; that is ~70 ms for NEC.)
+
+import struct
+import time
+from array import array
+
+LIBRARY_PATH = "/ir/codes.bin"
+MAGIC = b"IRL1"
+ENTRY_TAIL = "<BHIH"
+ENTRY_TAIL_SZ = struct.calcsize(ENTRY_TAIL)
+
+class IRLibrary:
+    def __init__(self, path=LIBRARY_PATH, cache_size=4):
+        self.path = path
+        self.cache_size = cache_size
+        self.index = {}      # name -> (carrier_khz, gap_ms, offset, n)
+        self._cache = []     # [(name, pulses)], most recent last
+        self._load_index()
+
+    def _load_index(self):
+        with open(self.path, "rb") as f:
+            head = f.read(8)
+            if len(head) < 8 or head[:4] != MAGIC:
+                raise ValueError(f"{self.path}: not an IR library")
+            count = struct.unpack_from("<H", head, 4)[0]
+            for _ in range(count):
+                n = f.read(1)[0]
+                name = f.read(n).decode("utf-8")
+                self.index[name] = struct.unpack(ENTRY_TAIL, f.read(ENTRY_TAIL_SZ))
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def names(self):
+        return list(self.index)
+
+    def get(self, name):
+        """Return (pulses, carrier_hz, gap_s) for a code; KeyError if unknown."""
+        khz, gap_ms, offset, n = self.index[name]
+
+        for i, (cname, pulses) in enumerate(self._cache):
+            if cname == name:
+                if i != len(self._cache) - 1:
+                    self._cache.append(self._cache.pop(i))
+                return pulses, khz * 1000, gap_ms / 1000
+
+        pulses = array("H", bytes(n * 2))
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            f.readinto(pulses)
+        self._cache.append((name, pulses))
+        while len(self._cache) > self.cache_size:
+            self._cache.pop(0)
+        return pulses, khz * 1000, gap_ms / 1000
+
+class IRLed:
+    def __init__(self, pin, frequency=38000, duty_cycle=2 ** 15):
+        self.pin = pin
+        self.frequency = frequency
+        self.duty_cycle = duty_cycle
+        self._pwm = None
+        self._pulseout = None
+        self._pulse_hz = None
+        self._steps = []     # [(due, kind, arg)]
+        self._free_at = 0.0  # when the last queued step has finished
+
+    ###################################
+    #     Output (lazy, exclusive)    #
+    ###################################
+    def _get_pwm(self):
+        if self._pwm is None:
+            import pwmio
+            self._release_pulseout()
+            self._pwm = pwmio.PWMOut(self.pin, frequency=self.frequency, duty_cycle=0)
+        return self._pwm
+
+    def _get_pulseout(self, carrier_hz):
+        if self._pulseout is not None and self._pulse_hz != carrier_hz:
+            self._release_pulseout()
+        if self._pulseout is None:
+            import pulseio
+            self._release_pwm()
+            self._pulseout = pulseio.PulseOut(self.pin, frequency=carrier_hz, duty_cycle=self.duty_cycle)
+            self._pulse_hz = carrier_hz
+        return self._pulseout
+
+    def _release_pwm(self):
+        if self._pwm is not None:
+            self._pwm.deinit()
+            self._pwm = None
+
+    def _release_pulseout(self):
+        if self._pulseout is not None:
+            self._pulseout.deinit()
+            self._pulseout = None
+            self._pulse_hz = None
+
+    ##############################
+    #     Scheduled actions      #
+    ##############################
+    def blink(self, times=1, on_time=0.2, off_time=0.2):
+        """Queue a visible/IR carrier blink; returns immediately."""
+        t = self._tail()
+        for _ in range(times):
+            self._steps.append((t, "on", None))
+            t += on_time
+            self._steps.append((t, "off", None))
+            t += off_time
+        self._free_at = t
+
+    def send(self, pulses, carrier_hz=38000, repeat=1, gap=0.04):
+        """Queue a pulse train (array('H') of us) repeat times."""
+        t = self._tail()
+        for _ in range(max(1, repeat)):
+            self._steps.append((t, "send", (pulses, carrier_hz)))
+            t += gap + sum(pulses) / 1000000
+        self._free_at = t
+
+    def _tail(self):
+        return max(time.monotonic(), self._free_at)
+
+    def busy(self):
+        return bool(self._steps)
+
+    def cancel(self):
+        self._steps = []
+        self._free_at = 0.0
+        if self._pwm is not None:
+            self._pwm.duty_cycle = 0
+
+    def poll(self, now=None):
+        if not self._steps:
+            return
+        if now is None:
+            now = time.monotonic()
+        while self._steps and self._steps[0][0] <= now:
+            _, kind, arg = self._steps.pop(0)
+            if kind == "on":
+                self._get_pwm().duty_cycle = self.duty_cycle
+            elif kind == "off":
+                self._get_pwm().duty_cycle = 0
+            elif kind == "send":
+                pulses, carrier_hz = arg
+                self._get_pulseout(carrier_hz).send(pulses)
+
+    def deinit(self):
+        self.cancel()
+        self._release_pwm()
+        self._release_pulseout()
@@ -0,0 +1,139 @@
+# ir_codes.py (host side, CPython)
+# Compiles a text library of IR remote codes into the packed binary file
+# that ir.IRLibrary reads on the device.
+#
+#   python ir_codes.py ir/codes.json ir/codes.bin
+#
+# Source schema:
+# {
+#   "codes": {
+#     "tv_power": {"protocol": "nec", "address": 4, "command": 8},
+#     "amp_mute": {"protocol": "rc5", "address": 16, "command": 13},
+#     "fan_on":   {"protocol": "raw", "pulses": [1300, 400, 1300, 400], "carrier_khz": 38}
+#   }
+# }
+# carrier_khz defaults to the protocol's carrier: 36 for RC5, 38 otherwise.
+#
+# Binary layout (little endian), see ir.py:
+#   "IRL1" | count u16 | reserved u16
+#   count x (name_len u8 | name | carrier_khz u8 | gap_ms u16 | offset u32 | n u16)
+#   pulse data: u16 microseconds, alternating mark/space, starting with mark
+
+import json
+import struct
+import sys
+from array import array
+
+MAGIC = b"IRL1"
+
+# NEC timings (us)
+NEC_HDR_MARK = 9000
+NEC_HDR_SPACE = 4500
+NEC_BIT_MARK = 562
+NEC_ONE_SPACE = 1687
+NEC_ZERO_SPACE = 562
+NEC_GAP_MS = 40
+NEC_CARRIER_KHZ = 38
+
+# RC5 half-bit (us)
+RC5_T = 889
+RC5_GAP_MS = 90
+RC5_CARRIER_KHZ = 36
+
+def encode_nec(address, command):
+    """32-bit NEC frame. Addresses above 0xFF use extended (16-bit) NEC."""
+    if address > 0xFF:
+        data = (address & 0xFFFF) | ((command & 0xFF) << 16) | ((~command & 0xFF) << 24)
+    else:
+        data = (address & 0xFF) | ((~address & 0xFF) << 8) | ((command & 0xFF) << 16) | ((~command & 0xFF) << 24)
+
+    pulses = [NEC_HDR_MARK, NEC_HDR_SPACE]
+    for i in range(32):
+        pulses.append(NEC_BIT_MARK)
+        pulses.append(NEC_ONE_SPACE if (data >> i) & 1 else NEC_ZERO_SPACE)
+    pulses.append(NEC_BIT_MARK)
+    return pulses
+
+def encode_rc5(address, command, toggle=0):
+    """14-bit RC5 frame (Manchester, MSB first). Commands 64-127 use field bit."""
+    bits = [1, 0 if command & 0x40 else 1, toggle & 1]
+    bits += [(address >> i) & 1 for i in range(4, -1, -1)]
+    bits += [(command >> i) & 1 for i in range(5, -1, -1)]
+
+    # 1 = space then mark, 0 = mark then space; as (level, duration) halves
+    halves = []
+    for b in bits:
+        halves += [(0, RC5_T), (1, RC5_T)] if b else [(1, RC5_T), (0, RC5_T)]
+
+    # Merge equal neighbours and drop the leading/trailing space
+    pulses = []
+    level = None
+    for lvl, dur in halves:
+        if lvl == level:
+            pulses[-1] += dur
+        else:
+            pulses.append(dur)
+            level = lvl
+    if halves[0][0] == 0:
+        pulses.pop(0)
+    if level == 0:
+        pulses.pop()
+    return pulses
+
+def encode_code(spec):
+    """(pulses, gap_ms, carrier_khz) for one source entry."""
+    proto = spec.get("protocol", "raw").lower()
+    if proto == "nec":
+        pulses = encode_nec(int(spec["address"]), int(spec["command"]))
+        gap_ms, khz = NEC_GAP_MS, NEC_CARRIER_KHZ
+    elif proto == "rc5":
+        pulses = encode_rc5(int(spec["address"]), int(spec["command"]), int(spec.get("toggle", 0)))
+        gap_ms, khz = RC5_GAP_MS, RC5_CARRIER_KHZ
+    elif proto == "raw":
+        pulses = [int(p) for p in spec["pulses"]]
+        if any(p <= 0 or p > 0xFFFF for p in pulses):
+            raise ValueError("raw pulses must be 1..65535 us")
+        gap_ms, khz = int(spec.get("gap_ms", NEC_GAP_MS)), NEC_CARRIER_KHZ
+    else:
+        raise ValueError(f"unknown protocol '{proto}'")
+    return pulses, gap_ms, int(spec.get("carrier_khz", khz))
+
+def compile_library(codes):
+    """codes: {name: spec}. Returns the packed library as bytes."""
+    entries = []
+    for name in sorted(codes):
+        spec = codes[name]
+        pulses, gap_ms, khz = encode_code(spec)
+        raw = name.encode("utf-8")
+        if len(raw) > 255:
+            raise ValueError(f"code name too long: {name}")
+        entries.append((raw, khz, gap_ms, array("H", pulses)))
+
+    index_sz = sum(1 + len(raw) + 1 + 2 + 4 + 2 for raw, _, _, _ in entries)
+    offset = len(MAGIC) + 4 + index_sz
+
+    head = bytearray(MAGIC + struct.pack("<HH", len(entries), 0))
+    body = bytearray()
+    for raw, khz, gap_ms, pulses in entries:
+        head += struct.pack("<B", len(raw)) + raw
+        head += struct.pack("<BHIH", khz, gap_ms, offset + len(body), len(pulses))
+        if sys.byteorder != "little":
+            pulses.byteswap()
+        body += pulses.tobytes()
+    return bytes(head + body)
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2:
+        print("usage: python ir_codes.py <codes.json> <codes.bin>")
+        return 2
+    with open(argv[0], "r") as f:
+        codes = json.load(f).get("codes", {})
+    data = compile_library(codes)
+    with open(argv[1], "wb") as f:
+        f.write(data)
+    print(f"{len(codes)} codes, {len(data)} bytes -> {argv[1]}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
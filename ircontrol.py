@@ -0,0 +1,119 @@
+# ircontrol.py (CircuitPython)
+# Menu actions for IR:
+#   ir:send:<name>[:tx=GP22][:repeat=N]
+#   ir:learn:<name>[:rx=GP21][:timeout=5]
+#
+# Sends are queued on an IRLed and driven by poll() from the main loop, so
+# the menu returns straight away. Learning waits for a remote press (that is
+# the point of the action); the captured code is kept in RAM and printed as a
+# "raw" entry to paste into /ir/codes.json.
+
+import time
+import log
+import board
+from array import array
+from ir import IRLed, IRLibrary
+
+DEFAULT_TX = "GP22"
+DEFAULT_RX = "GP21"
+
+_leds = {}        # pin name -> IRLed
+_library = None
+learned = {}      # name -> array('H') captured this session
+
+def library():
+    global _library
+    if _library is None:
+        try:
+            _library = IRLibrary()
+        except (OSError, ValueError) as e:
+            log.warn("IR", "no code library: %s", e)
+            return None
+    return _library
+
+def get_led(pin_name=DEFAULT_TX):
+    led = _leds.get(pin_name)
+    if led is None:
+        led = IRLed(getattr(board, pin_name))
+        _leds[pin_name] = led
+    return led
+
+def poll(now=None):
+    for led in _leds.values():
+        led.poll(now)
+
+def busy():
+    return any(led.busy() for led in _leds.values())
+
+def _parse(action):
+    """'ir:send:tv:tx=GP22:repeat=2' -> ('send', 'tv', {'tx': 'GP22', 'repeat': '2'})"""
+    parts = action.split(":")
+    verb = parts[1] if len(parts) > 1 else ""
+    name = parts[2] if len(parts) > 2 else ""
+    opts = {}
+    for p in parts[3:]:
+        if "=" in p:
+            k, v = p.split("=", 1)
+            opts[k] = v
+    return verb, name, opts
+
+def _show(screen, line1, line2=""):
+    if screen:
+        screen.print_line("1: " + line1)
+        screen.print_line("2: " + line2)
+        screen.flush()
+
+def send(name, tx=DEFAULT_TX, repeat=1):
+    if name in learned:
+        pulses, carrier_hz, gap = learned[name], 38000, 0.04
+    else:
+        lib = library()
+        if lib is None or name not in lib:
+            return False
+        pulses, carrier_hz, gap = lib.get(name)
+    get_led(tx).send(pulses, carrier_hz=carrier_hz, repeat=repeat, gap=gap)
+    return True
+
+def learn(name, rx=DEFAULT_RX, timeout=5.0, maxlen=200):
+    import pulseio
+    pin = getattr(board, rx)
+    pin_in = pulseio.PulseIn(pin, maxlen=maxlen, idle_state=True)
+    try:
+        end = time.monotonic() + timeout
+        while not len(pin_in) and time.monotonic() < end:
+            time.sleep(0.01)
+        if not len(pin_in):
+            return None
+        # Let the rest of the frame arrive
+        time.sleep(0.15)
+        pin_in.pause()
+        pulses = array("H", (pin_in[i] for i in range(len(pin_in))))
+    finally:
+        pin_in.deinit()
+
+    learned[name] = pulses
+    print(f'[IR] learned "{name}": {{"protocol": "raw", "pulses": {list(pulses)}}}')
+    return pulses
+
+def try_handle(action, screen=None):
+    """Handle ir:* actions. Returns False for anything else."""
+    if not action or not action.startswith("ir:"):
+        return False
+
+    verb, name, opts = _parse(action)
+    if verb == "send":
+        repeat = int(opts.get("repeat", 1))
+        if send(name, tx=opts.get("tx", DEFAULT_TX), repeat=repeat):
+            _show(screen, "IR send", name)
+        else:
+            _show(screen, "IR unknown", name)
+    elif verb == "learn":
+        _show(screen, "IR learn: press", name)
+        pulses = learn(name, rx=opts.get("rx", DEFAULT_RX), timeout=float(opts.get("timeout", 5)))
+        if pulses is None:
+            _show(screen, "IR learn", "timed out")
+        else:
+            _show(screen, f"IR learned {len(pulses)}", name)
+    else:
+        _show(screen, "IR bad action", verb)
+    return True
@@ -0,0 +1,200 @@
+# log.py (CircuitPython)
+# Leveled, buffered logging.
+#
+# print() on the USB console blocks while the host is connected but not
+# reading, which stalls the UI from whatever hot path printed. Here a call
+# below the current level returns after one integer compare; anything else
+# is stored, unformatted, in a fixed ring of slots (oldest overwritten when
+# full) and drain() from the main loop writes a few records per pass, only
+# while the console has room. An optional log file on flash gets the same
+# lines and is rotated to <path>.1 at a size limit.
+#
+#   log.info("PAYLOAD", "%s len=%d", name, n)    # formatted at drain time
+#   if log.enabled(log.DEBUG): ...               # guard costly arguments
+
+import os
+from array import array
+
+import metrics
+from metrics import ticks_ms
+
+DEBUG = 10
+INFO = 20
+WARN = 30
+ERROR = 40
+OFF = 100
+
+LEVELS = {"debug": DEBUG, "info": INFO, "warn": WARN, "error": ERROR, "off": OFF}
+_LETTER = {DEBUG: "D", INFO: "I", WARN: "W", ERROR: "E"}
+
+RING_SIZE = 32
+DRAIN_BUDGET = 4      # records written per drain() call
+# Skip a drain pass while more than this is still queued on the console
+CONSOLE_BACKLOG = 64
+
+C_DROPPED = metrics.counter("log.dropped")
+
+# Current threshold; read directly by the level functions below
+level = INFO
+_base_level = INFO
+
+_t = array("L", [0] * RING_SIZE)
+_lvl = bytearray(RING_SIZE)
+_tag = [None] * RING_SIZE
+_msg = [None] * RING_SIZE
+_args = [None] * RING_SIZE
+_head = 0        # next slot to write
+_count = 0       # records waiting
+_dropped = 0     # overwritten since the last drain
+
+_file = None     # path of the flash log, None = console only
+_file_max = 0
+_file_size = 0
+
+try:
+    import supervisor
+except ImportError:
+    supervisor = None
+
+try:
+    import usb_cdc
+except ImportError:
+    usb_cdc = None
+
+#########################
+#     Configuration     #
+#########################
+def configure(config):
+    """Threshold and file sink from config; debug_mode forces DEBUG."""
+    global _base_level
+    _base_level = LEVELS.get(str(config.get("log_level", "info")).lower(), INFO)
+    set_debug(config.get("debug_mode"))
+    set_file(config.get("log_file") or None, int(config.get("log_file_kb", 16)) * 1024)
+
+def set_debug(on):
+    global level
+    level = DEBUG if on else _base_level
+
+def set_file(path, max_bytes=16 * 1024):
+    global _file, _file_max, _file_size
+    _file = path
+    _file_max = max_bytes
+    _file_size = 0
+    if path:
+        try:
+            _file_size = os.stat(path)[6]
+        except OSError:
+            pass
+
+def enabled(lvl):
+    return lvl >= level
+
+##########################
+#     Hot-path calls     #
+##########################
+def _put(lvl, tag, msg, args):
+    global _head, _count, _dropped
+    i = _head
+    _t[i] = ticks_ms()
+    _lvl[i] = lvl
+    _tag[i] = tag
+    _msg[i] = msg
+    _args[i] = args
+    _head = (i + 1) % RING_SIZE
+    if _count == RING_SIZE:
+        _dropped += 1
+    else:
+        _count += 1
+
+def debug(tag, msg, *args):
+    if DEBUG >= level:
+        _put(DEBUG, tag, msg, args)
+
+def info(tag, msg, *args):
+    if INFO >= level:
+        _put(INFO, tag, msg, args)
+
+def warn(tag, msg, *args):
+    if WARN >= level:
+        _put(WARN, tag, msg, args)
+
+def error(tag, msg, *args):
+    if ERROR >= level:
+        _put(ERROR, tag, msg, args)
+
+def pending():
+    return _count
+
+######################
+#     Draining       #
+######################
+def _console_ready():
+    if supervisor is not None and not supervisor.runtime.serial_connected:
+        return False
+    console = usb_cdc.console if usb_cdc is not None else None
+    if console is not None and console.out_waiting > CONSOLE_BACKLOG:
+        return False
+    return True
+
+def _pop():
+    global _count
+    i = (_head - _count) % RING_SIZE
+    msg = _msg[i]
+    args = _args[i]
+    if args:
+        try:
+            msg = msg % args
+        except (TypeError, ValueError):
+            msg = f"{msg} {args}"
+    line = f"{_t[i]} {_LETTER.get(_lvl[i], '?')} [{_tag[i]}] {msg}"
+    _tag[i] = _msg[i] = _args[i] = None
+    _count -= 1
+    return line
+
+def _write_file(lines):
+    global _file, _file_size
+    data = "\n".join(lines) + "\n"
+    try:
+        if _file_size + len(data) > _file_max:
+            try:
+                os.remove(_file + ".1")
+            except OSError:
+                pass
+            os.rename(_file, _file + ".1")
+            _file_size = 0
+        with open(_file, "a") as f:
+            f.write(data)
+        _file_size += len(data)
+    except OSError as e:
+        # Read-only while the drive is mounted over USB: console only
+        print(f"[LOG] file {_file} disabled: {e}")
+        _file = None
+
+def drain(budget=DRAIN_BUDGET):
+    """Write up to budget records. Without a file sink, records stay
+    buffered while the console is busy or disconnected."""
+    global _dropped
+    to_console = _console_ready()
+    if not _count or not (to_console or _file):
+        return 0
+
+    lines = []
+    if _dropped:
+        lines.append(f"[LOG] {_dropped} records dropped")
+        metrics.inc(C_DROPPED, _dropped)
+        _dropped = 0
+    while _count and len(lines) < budget:
+        lines.append(_pop())
+
+    if to_console:
+        for line in lines:
+            print(line)
+    if _file:
+        _write_file(lines)
+    return len(lines)
+
+def flush():
+    """Write everything now (before a reload or reset)."""
+    while _count or _dropped:
+        if not drain(RING_SIZE):
+            break
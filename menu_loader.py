@@ -4,6 +4,13 @@
 import json
 import os
 from flipper_menu import Menu
+from menu_model import (
+    MenuModel, MenuRecord, records_from_json, clear_strings, rebuild_strings,
+    T_MENU, MAIN_TITLE,
+)
+import metrics
+
+G_MENU_BYTES = metrics.gauge("menu.model_bytes")
 
 MENU_DIR = "/menus/"
 MAIN_MENU_FILE = "main_menu.json"
@@ -37,56 +44,120 @@ def get_all_menu_files():
 ########################################
 #   Extract submenu titles from main   #
 ########################################
-def extract_defined_submenus(main_menu_data):
+def extract_defined_submenus(main_records):
     titles = set()
-    for menu in main_menu_data.get("menus", []):
-        for option in menu.get("options", []):
-            if option.get("type") == "menu":
-                titles.add(option.get("action"))
+    for rec in main_records:
+        for i in range(len(rec)):
+            if rec.types[i] == T_MENU:
+                titles.add(rec.actions[i])
     return titles
 
 ##############################################
-#   Load all menus and merge into one list   #
+#     Parsed file cache for hot-reload       #
 ##############################################
-def load_menus(screen):
-    menus = []
+# fname -> list of MenuRecord (None when the file failed to parse). The raw
+# JSON is dropped as soon as a file is converted.
+_parsed = {}
 
-    # Load main_menu.json
-    main_path = MENU_DIR + MAIN_MENU_FILE
+def parse_menu_file(fname, screen=None):
+    fpath = MENU_DIR + fname
+    try:
+        _parsed[fname] = records_from_json(load_json_file(fpath))
+    except Exception as e:
+        _parsed[fname] = None
+        if fname == MAIN_MENU_FILE:
+            raise
+        if screen and screen.dt == "debug":
+            screen.print_line(f"ERR: {fname}")
+            screen.print_line(str(e))
+            screen.flush()
+
+def forget_menu_file(fname):
+    _parsed.pop(fname, None)
+
+##############################################
+#   Merge the parsed files into one model    #
+##############################################
+def build_menu_model():
+    records = []
+    shortcuts = []
     defined_titles = set()
 
-    if file_exists(main_path):
-        main_data = load_json_file(main_path)
-        menus.extend(main_data.get("menus", []))
-        defined_titles = extract_defined_submenus(main_data)
+    main_records = _parsed.get(MAIN_MENU_FILE)
+    if main_records:
+        records.extend(main_records)
+        defined_titles = extract_defined_submenus(main_records)
+
+    for fname in sorted(_parsed):
+        recs = _parsed[fname]
+        if fname == MAIN_MENU_FILE or not recs:
+            continue
+        for rec in recs:
+            if rec.title not in defined_titles:
+                # Add shortcut to main menu
+                shortcuts.append(rec.title)
+            records.append(rec)
+
+    if shortcuts:
+        types = [T_MENU] * len(shortcuts)
+        if main_records:
+            # A copy: the cached main-menu record stays pristine
+            records[0] = records[0].with_options(shortcuts, types, shortcuts)
+        else:
+            records.insert(0, MenuRecord(MAIN_TITLE, tuple(shortcuts), bytes(types), tuple(shortcuts)))
+
+    return MenuModel(records)
+
+##############################################
+#   Re-parse only the files that changed     #
+##############################################
+def reload_menu_files(changed, screen=None):
+    for fname in changed:
+        if file_exists(MENU_DIR + fname):
+            parse_menu_file(fname, screen)
+        else:
+            forget_menu_file(fname)
+    rebuild_strings(rec for recs in _parsed.values() if recs for rec in recs)
+    return build_menu_model()
+
+def reload_all_menu_files(screen=None):
+    """Re-parse every menu file, e.g. for a manual reload without hot reload."""
+    names = set(_parsed)
+    names.update(get_all_menu_files())
+    names.add(MAIN_MENU_FILE)
+    return reload_menu_files(names, screen)
+
+##############################################
+#   Load all menus and merge into one list   #
+##############################################
+def _mem_free():
+    try:
+        import gc
+        gc.collect()
+        return gc.mem_free()
+    except (ImportError, AttributeError):
+        return 0
+
+def load_menus(screen, config=None):
+    _parsed.clear()
+    clear_strings()
+    free0 = _mem_free()
+
+    # Load main_menu.json
+    if file_exists(MENU_DIR + MAIN_MENU_FILE):
+        parse_menu_file(MAIN_MENU_FILE, screen)
 
     # Load all other .json menus
     for fname in get_all_menu_files():
-        fpath = MENU_DIR + fname
-        try:
-            data = load_json_file(fpath)
-            for menu in data.get("menus", []):
-                title = menu.get("title")
-                if title and title not in defined_titles:
-                    # Add shortcut to main menu
-                    shortcut = {
-                        "name": title,
-                        "type": "menu",
-                        "action": title
-                    }
-                    if menus:
-                        menus[0].setdefault("options", []).append(shortcut)
-                    else:
-                        menus.append({
-                            "title": "Main Menu",
-                            "options": [shortcut]
-                        })
-                menus.append(menu)
-        except Exception as e:
-            if screen and screen.dt == "debug":
-                screen.print_line(f"ERR: {fname}")
-                screen.print_line(str(e))
-                screen.flush()
-
-    return Menu(menus=menus, screen=screen)
+        parse_menu_file(fname, screen)
+
+    prefetch_dwell = None
+    if config and config.get("prefetch_dwell_ms") is not None:
+        prefetch_dwell = int(config["prefetch_dwell_ms"]) / 1000
 
+    model = build_menu_model()
+    # Heap the loaded menus hold on to ('m' over serial prints it)
+    metrics.set_gauge(G_MENU_BYTES, free0 - _mem_free())
+    marquee_speed = int(config.get("marquee_speed", 24)) if config else 24
+    return Menu(menus=model, screen=screen, prefetch_dwell=prefetch_dwell,
+                marquee_speed=marquee_speed)
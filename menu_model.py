@@ -0,0 +1,129 @@
+# menu_model.py (CircuitPython)
+# Compact in-RAM form of the menu JSON.
+#
+# Parsed JSON is a dict per option (plus its keys and values), which costs
+# several times the text it came from. Here each menu is one slotted record
+# of parallel sequences: option names and actions as tuples of shared
+# (interned) strings, option types as one byte each, and submenu links
+# resolved to menu indices once per load. menu_loader.py builds it;
+# flipper_menu.Menu runs on it.
+
+from array import array
+
+T_MENU = 0
+T_RUN = 1
+T_MESSAGE = 2
+T_COMMAND = 3
+T_ACTION = 4
+T_CUSTOM = 5
+
+TYPE_CODES = {
+    "menu": T_MENU,
+    "run": T_RUN,
+    "message": T_MESSAGE,
+    "command": T_COMMAND,
+    "action": T_ACTION,
+    "custom": T_CUSTOM,
+}
+
+MAIN_TITLE = "Main Menu"
+
+# One copy of every title/name/action string, shared by all records
+_strings = {}
+
+def intern(s):
+    if s is None:
+        return ""
+    s = str(s)
+    return _strings.setdefault(s, s)
+
+def clear_strings():
+    _strings.clear()
+
+def rebuild_strings(records):
+    """
+    Keep only the strings these records use. A reload re-parses some files
+    against the old table; this drops what only the replaced records held.
+    """
+    _strings.clear()
+    for rec in records:
+        intern(rec.title)
+        for s in rec.names:
+            intern(s)
+        for s in rec.actions:
+            intern(s)
+
+class MenuRecord:
+    __slots__ = ("title", "names", "types", "actions", "links")
+
+    def __init__(self, title, names, types, actions):
+        self.title = title
+        self.names = names        # tuple of str
+        self.types = types        # bytes, one T_* code per option
+        self.actions = actions    # tuple of str ("" when missing)
+        self.links = None         # array("h") of menu indices, -1 = none
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def from_json(cls, menu):
+        """One {"title", "options": [...]} dict; None without a title."""
+        title = menu.get("title")
+        if not title:
+            return None
+        options = menu.get("options", [])
+        return cls(
+            intern(title),
+            tuple(intern(o.get("name")) for o in options),
+            bytes(TYPE_CODES.get(o.get("type", "action"), T_CUSTOM) for o in options),
+            tuple(intern(o.get("action")) for o in options),
+        )
+
+    def with_options(self, names, types, actions):
+        """Copy with extra options appended (main-menu shortcuts)."""
+        return MenuRecord(
+            self.title,
+            self.names + tuple(names),
+            self.types + bytes(types),
+            self.actions + tuple(actions),
+        )
+
+def records_from_json(data):
+    records = []
+    for menu in data.get("menus", []):
+        rec = MenuRecord.from_json(menu)
+        if rec is not None:
+            records.append(rec)
+    return records
+
+class MenuModel:
+    """All loaded menus, addressed by index; titles map to indices."""
+
+    def __init__(self, records):
+        self.records = []
+        self.index = {}
+        for rec in records:
+            if rec.title in self.index:
+                # Later files override a title, as the old dict merge did
+                self.records[self.index[rec.title]] = rec
+            else:
+                self.index[rec.title] = len(self.records)
+                self.records.append(rec)
+
+        for rec in self.records:
+            links = array("h", [-1]) * len(rec)
+            for i in range(len(rec)):
+                if rec.types[i] == T_MENU:
+                    links[i] = self.index.get(rec.actions[i], -1)
+            rec.links = links
+
+    def __contains__(self, title):
+        return title in self.index
+
+    def __len__(self):
+        return len(self.records)
+
+    def get(self, title):
+        i = self.index.get(title)
+        return None if i is None else self.records[i]
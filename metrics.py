@@ -0,0 +1,144 @@
+# metrics.py (CircuitPython)
+# Runtime counters, gauges and fixed-bucket histograms.
+#
+# Every metric is registered once at import time and gets an integer slot in
+# preallocated arrays, so inc()/set_gauge()/observe() on a hot path only do
+# array stores. Timing uses supervisor.ticks_ms() (a small int, no heap) with
+# wrap-safe differences.
+#
+# Over serial: 'm' prints a snapshot, 'z' zeroes everything (see code.py).
+
+import time
+from array import array
+
+try:
+    from supervisor import ticks_ms
+except ImportError:
+    def ticks_ms():
+        return int(time.monotonic() * 1000) & (_TICKS_PERIOD - 1)
+
+_TICKS_PERIOD = 1 << 29
+_TICKS_HALF = _TICKS_PERIOD // 2
+
+def ticks_diff(end, start):
+    return ((end - start + _TICKS_HALF) & (_TICKS_PERIOD - 1)) - _TICKS_HALF
+
+MAX_COUNTERS = 32
+MAX_GAUGES = 16
+MAX_HISTOGRAMS = 12
+
+# Histogram bucket upper bounds in ms; the last bucket is overflow
+BUCKETS_MS = array("H", (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000))
+N_BUCKETS = len(BUCKETS_MS) + 1
+
+_counter_names = []
+_counters = array("L", [0] * MAX_COUNTERS)
+
+_gauge_names = []
+_gauges = array("l", [0] * MAX_GAUGES)
+
+_hist_names = []
+_hist_buckets = array("L", [0] * (MAX_HISTOGRAMS * N_BUCKETS))
+_hist_count = array("L", [0] * MAX_HISTOGRAMS)
+_hist_sum = array("L", [0] * MAX_HISTOGRAMS)
+_hist_max = array("L", [0] * MAX_HISTOGRAMS)
+
+##############################
+#     Registration (boot)    #
+##############################
+def _register(names, name, cap):
+    if name in names:
+        return names.index(name)
+    if len(names) >= cap:
+        raise ValueError(f"metrics: too many metrics registering '{name}'")
+    names.append(name)
+    return len(names) - 1
+
+def counter(name):
+    return _register(_counter_names, name, MAX_COUNTERS)
+
+def gauge(name):
+    return _register(_gauge_names, name, MAX_GAUGES)
+
+def histogram(name):
+    return _register(_hist_names, name, MAX_HISTOGRAMS)
+
+##########################
+#     Hot-path calls     #
+##########################
+def inc(idx, n=1):
+    _counters[idx] += n
+
+def set_gauge(idx, value):
+    _gauges[idx] = value
+
+def observe(idx, ms):
+    if ms < 0:
+        ms = 0
+    base = idx * N_BUCKETS
+    b = 0
+    while b < N_BUCKETS - 1 and ms > BUCKETS_MS[b]:
+        b += 1
+    _hist_buckets[base + b] += 1
+    _hist_count[idx] += 1
+    _hist_sum[idx] += ms
+    if ms > _hist_max[idx]:
+        _hist_max[idx] = ms
+
+def start():
+    return ticks_ms()
+
+def stop(idx, t0):
+    """observe() the ms elapsed since t0 = start(); returns it."""
+    ms = ticks_diff(ticks_ms(), t0)
+    observe(idx, ms)
+    return ms
+
+#########################
+#     Serial output     #
+#########################
+def _percentile(idx, q):
+    n = _hist_count[idx]
+    if not n:
+        return 0
+    want = (n * q + 99) // 100
+    base = idx * N_BUCKETS
+    seen = 0
+    for b in range(N_BUCKETS):
+        seen += _hist_buckets[base + b]
+        if seen >= want:
+            return BUCKETS_MS[b] if b < N_BUCKETS - 1 else _hist_max[idx]
+    return _hist_max[idx]
+
+def snapshot():
+    """Compact text snapshot, one metric per line."""
+    lines = ["[METRICS]"]
+    for i, name in enumerate(_counter_names):
+        lines.append(f"c {name}={_counters[i]}")
+    for i, name in enumerate(_gauge_names):
+        lines.append(f"g {name}={_gauges[i]}")
+    for i, name in enumerate(_hist_names):
+        n = _hist_count[i]
+        avg = _hist_sum[i] // n if n else 0
+        buckets = " ".join(str(_hist_buckets[i * N_BUCKETS + b]) for b in range(N_BUCKETS))
+        lines.append(
+            f"h {name} n={n} avg={avg} p50<={_percentile(i, 50)} "
+            f"p95<={_percentile(i, 95)} max={_hist_max[i]} [{buckets}]"
+        )
+    return "\n".join(lines)
+
+def dump():
+    try:
+        import gc
+        gc.collect()
+        set_gauge(G_HEAP_FREE, gc.mem_free())
+    except (ImportError, AttributeError):
+        pass
+    print(snapshot())
+
+def reset():
+    for arr in (_counters, _gauges, _hist_buckets, _hist_count, _hist_sum, _hist_max):
+        for i in range(len(arr)):
+            arr[i] = 0
+
+G_HEAP_FREE = gauge("heap_free")
@@ -0,0 +1,123 @@
+# mirror.py (CircuitPython)
+# Streams the 1-bit display frame to a host over USB serial.
+#
+# The frame is composed from display.root_group by page_shadow.PageComposer
+# (the 1-bit SH1106 can't be read back with fill_row()), cut into
+# SH1106-style 8-row pages and compared with a shadow of what the host
+# already has. Only changed pages go out, RLE-compressed, as text lines:
+#
+#   #MIR <frame> <page> <base64(kind byte + data)>
+#
+# kind 0 = raw 128 bytes, 1 = RLE (count, value) pairs. Every keyframe_s all
+# pages are resent so a viewer that connects late catches up.
+#
+# CPU is bounded: a new frame only starts every 1/fps seconds, composing
+# once, and poll() sends at most pages_per_poll pages per main-loop pass.
+# See mirror_viewer.py.
+
+import binascii
+import sys
+import time
+
+from page_shadow import PAGE_ROWS, PageComposer
+
+def rle_encode(data):
+    out = bytearray()
+    i = 0
+    n = len(data)
+    while i < n:
+        v = data[i]
+        run = 1
+        while i + run < n and run < 255 and data[i + run] == v:
+            run += 1
+        out.append(run)
+        out.append(v)
+        i += run
+    return out
+
+def rle_decode(data):
+    out = bytearray()
+    for i in range(0, len(data) - 1, 2):
+        out.extend(bytes((data[i + 1],)) * data[i])
+    return out
+
+def default_stream():
+    # A second USB CDC channel keeps mirror lines off the REPL if enabled
+    try:
+        import usb_cdc
+        if usb_cdc.data is not None and usb_cdc.data.connected:
+            return usb_cdc.data
+    except (ImportError, AttributeError):
+        pass
+    return None
+
+class FrameMirror:
+    def __init__(self, display, fps=2, stream=None, pages_per_poll=1, keyframe_s=5.0):
+        self.display = display
+        self.width = display.width
+        self.height = display.height
+        self.pages = self.height // PAGE_ROWS
+        self.fps = fps
+        self.stream = stream if stream is not None else default_stream()
+        self.pages_per_poll = pages_per_poll
+        self.keyframe_s = keyframe_s
+
+        self._composer = PageComposer(self.width, self.height)
+        self._page = bytearray(self.width)
+        self._shadow = [bytearray(self.width) for _ in range(self.pages)]
+
+        self.frame = 0
+        self.bytes_sent = 0
+        self.pages_sent = 0
+        self._next_page = 0
+        self._next_frame_t = 0.0
+        self._next_key_t = 0.0
+        self._key = True
+
+    ###########################
+    #     Page output         #
+    ###########################
+    def _send_page(self, page):
+        rle = rle_encode(self._page)
+        if len(rle) < len(self._page):
+            body = b"\x01" + rle
+        else:
+            body = b"\x00" + bytes(self._page)
+        head = "#MIR %d %d " % (self.frame, page)
+        line = head.encode() + binascii.b2a_base64(body).strip() + b"\n"
+        if self.stream is not None:
+            self.stream.write(line)
+        else:
+            sys.stdout.write(line.decode())
+        self.bytes_sent += len(line)
+        self.pages_sent += 1
+
+    ###############################
+    #     Called from main loop   #
+    ###############################
+    def poll(self, now=None):
+        if self.fps <= 0:
+            return
+        if now is None:
+            now = time.monotonic()
+        if self._next_page == 0:
+            if now < self._next_frame_t:
+                return
+            self._key = now >= self._next_key_t
+            if self._key:
+                self._next_key_t = now + self.keyframe_s
+            self._composer.compose(self.display.root_group)
+
+        for _ in range(self.pages_per_poll):
+            page = self._next_page
+            self._composer.page(page, self._page)
+            if self._key or self._page != self._shadow[page]:
+                self._send_page(page)
+                self._shadow[page][:] = self._page
+
+            self._next_page += 1
+            if self._next_page >= self.pages:
+                self._next_page = 0
+                self.frame += 1
+                self._next_frame_t = now + 1.0 / self.fps
+                break
@@ -0,0 +1,134 @@
+# mirror_viewer.py (host side, CPython)
+# Shows / records the screen mirror streamed by mirror.py.
+#
+#   python mirror_viewer.py --port /dev/ttyACM0            # live view (pyserial)
+#   python mirror_viewer.py --port COM5 --record run.mir   # view and record
+#   python mirror_viewer.py --file run.mir --pbm last.pbm  # replay a recording
+#
+# Non-mirror lines (normal prints) are passed through to stdout, so this can
+# stand in for the serial console. The frame is drawn in the terminal with
+# half-block characters (two pixel rows per text line).
+
+import argparse
+import binascii
+import sys
+
+from mirror import rle_decode, PAGE_ROWS
+
+WIDTH = 128
+HEIGHT = 64
+PAGES = HEIGHT // PAGE_ROWS
+
+class Frame:
+    def __init__(self, width=WIDTH, height=HEIGHT):
+        self.width = width
+        self.height = height
+        self.pages = [bytearray(width) for _ in range(height // PAGE_ROWS)]
+        self.frame = -1
+        self.completed = None   # pages of the last finished frame
+
+    def apply(self, line):
+        """
+        Apply one '#MIR frame page b64' line. Returns True if the previous
+        frame was complete before this line (its frame number differs).
+        """
+        _, frame, page, b64 = line.split(" ", 3)
+        body = binascii.a2b_base64(b64)
+        data = rle_decode(body[1:]) if body[0] == 1 else body[1:]
+        ended = self.frame != -1 and int(frame) != self.frame
+        if ended:
+            self.completed = [bytes(p) for p in self.pages]
+        page = int(page)
+        if 0 <= page < len(self.pages) and len(data) == self.width:
+            self.pages[page][:] = data
+        self.frame = int(frame)
+        return ended
+
+    def pixel(self, x, y, pages=None):
+        pages = pages or self.pages
+        return (pages[y // PAGE_ROWS][x] >> (y % PAGE_ROWS)) & 1
+
+    def render_text(self, pages=None):
+        rows = []
+        for y in range(0, self.height, 2):
+            line = []
+            for x in range(self.width):
+                top, bottom = self.pixel(x, y, pages), self.pixel(x, y + 1, pages)
+                line.append(" ▀▄█"[top | (bottom << 1)])
+            rows.append("".join(line))
+        return "\n".join(rows)
+
+    def to_pbm(self):
+        out = [f"P1\n{self.width} {self.height}"]
+        for y in range(self.height):
+            out.append(" ".join(str(self.pixel(x, y)) for x in range(self.width)))
+        return "\n".join(out) + "\n"
+
+def iter_lines(args):
+    if args.file:
+        with open(args.file, "r", errors="replace") as f:
+            for line in f:
+                yield line.rstrip("\r\n")
+        return
+    try:
+        import serial
+    except ImportError:
+        sys.exit("pyserial is required for --port (pip install pyserial)")
+    with serial.Serial(args.port, args.baud, timeout=1) as port:
+        while True:
+            raw = port.readline()
+            if raw:
+                yield raw.decode("utf-8", "replace").rstrip("\r\n")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="View or record the Pico Pebble screen mirror")
+    src = parser.add_mutually_exclusive_group(required=True)
+    src.add_argument("--port", help="serial port of the device")
+    src.add_argument("--file", help="replay a recording")
+    parser.add_argument("--baud", type=int, default=115200)
+    parser.add_argument("--record", help="append mirror lines to this file")
+    parser.add_argument("--pbm", help="write the last frame as a PBM image")
+    parser.add_argument("--quiet", action="store_true", help="do not draw frames")
+    args = parser.parse_args(argv)
+
+    frame = Frame()
+    record = open(args.record, "a") if args.record else None
+    frames = 0
+    try:
+        for line in iter_lines(args):
+            if not line.startswith("#MIR "):
+                if not args.file:
+                    print(line)
+                continue
+            if record:
+                record.write(line + "\n")
+            try:
+                ended = frame.apply(line)
+            except (ValueError, binascii.Error):
+                continue
+            if ended:
+                frames += 1
+                if not args.quiet:
+                    # Home the cursor and redraw in place
+                    sys.stdout.write("\x1b[H\x1b[2J" + frame.render_text(frame.completed) + "\n")
+                    sys.stdout.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if record:
+            record.close()
+
+    if frame.frame >= 0:
+        # The last frame never sees a following frame number
+        frames += 1
+        if not args.quiet:
+            print(frame.render_text())
+
+    if args.pbm:
+        with open(args.pbm, "w") as f:
+            f.write(frame.to_pbm())
+    print(f"{frames} frames")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
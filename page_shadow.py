@@ -0,0 +1,263 @@
+# page_shadow.py (CircuitPython)
+# 1-bit page image of the display, composed from the layers the code built.
+#
+# The SH1106 core driver is 1-bit and display.fill_row() can't read it
+# back, so mirror.py and the partial refresh in sh1106_display.py build the
+# frame themselves: compose() walks display.root_group the way displayio
+# draws it (children in order, later ones on top, hidden skipped, x/y and
+# scale inherited) and keeps one int per column whose bit y is pixel
+# (x, y). page() cuts that into the controller's 8-row page bytes.
+#
+# Pixels come from data the code owns:
+#   - in-RAM Bitmaps (labels' font glyphs, _solid(), draw_*) through their
+#     Palette: transparent entries let lower layers through, others are lit
+#     when their luma is >= 128, as the core's 1-bit grayscale conversion
+#   - OnDiskBitmaps from the BMP file itself. displayio doesn't expose the
+#     path, so whoever opens one calls register(odb, path). Files are read
+#     uncompressed or BI_BITFIELDS at 1/4/8/16/24/32 bits per pixel and
+#     drawn opaque, as a ColorConverter draws them.
+#
+# Each tile's column masks are decoded once and cached (TILE_CACHE
+# entries), so a frame costs a few shifts per drawn column. A cached
+# in-RAM Bitmap is assumed unchanged while shown; call forget() after
+# drawing into one that is already on screen.
+
+import struct
+
+PAGE_ROWS = 8
+TILE_CACHE = 48
+LIT_LUMA = 128
+
+_paths = {}     # id(OnDiskBitmap) -> BMP path
+
+def register(odb, path):
+    """Remember which file an OnDiskBitmap was opened from."""
+    _paths[id(odb)] = path
+    return odb
+
+def luma(color):
+    """0-255 brightness of an RGB888 colour, as displayio computes it."""
+    r = (color >> 16) & 0xFF
+    g = (color >> 8) & 0xFF
+    b = color & 0xFF
+    return (r * 19 + g * 182 + b * 54) // 255
+
+#############################
+#     BMP file pixels       #
+#############################
+def _mask_shift(mask):
+    shift = 0
+    while mask and not mask & 1:
+        mask >>= 1
+        shift += 1
+    return shift, mask
+
+class BmpFile:
+    """Pixel rows of an uncompressed (or BI_BITFIELDS) BMP as RGB888."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            head = f.read(70)
+            if len(head) < 54 or head[:2] != b"BM":
+                raise ValueError("not a BMP: %s" % path)
+            self.offset = struct.unpack_from("<I", head, 10)[0]
+            hsize = struct.unpack_from("<I", head, 14)[0]
+            width, height, _, bpp, comp = struct.unpack_from("<iiHHI", head, 18)
+            colors = struct.unpack_from("<I", head, 46)[0]
+            if comp not in (0, 3):
+                raise ValueError("compressed BMP: %s" % path)
+            self.palette = None
+            if bpp <= 8:
+                f.seek(14 + hsize)
+                raw = f.read(4 * (colors or (1 << bpp)))
+                self.palette = [raw[i + 2] << 16 | raw[i + 1] << 8 | raw[i]
+                                for i in range(0, len(raw) - 3, 4)]
+        if comp == 3:
+            masks = struct.unpack_from("<III", head, 54)
+        elif bpp == 16:
+            masks = (0x7C00, 0x03E0, 0x001F)
+        else:
+            masks = (0xFF0000, 0x00FF00, 0x0000FF)
+        self.masks = [_mask_shift(m) for m in masks]
+        self.path = path
+        self.width = width
+        self.bottom_up = height > 0
+        self.height = abs(height)
+        self.bpp = bpp
+        self.stride = ((width * bpp + 31) // 32) * 4
+
+    def _rgb(self, v):
+        out = 0
+        for shift, mask in self.masks:
+            c = (v >> shift) & mask
+            out = (out << 8) | (c * 255 // mask if mask else 0)
+        return out
+
+    def rows(self, x, y, w, h):
+        """Yield h lists of w RGB888 pixels starting at (x, y)."""
+        bpp = self.bpp
+        bit0 = x * bpp
+        buf = bytearray(((bit0 & 7) + w * bpp + 7) // 8)
+        nbytes = bpp // 8
+        with open(self.path, "rb") as f:
+            for row in range(y, y + h):
+                if self.bottom_up:
+                    row = self.height - 1 - row
+                f.seek(self.offset + row * self.stride + (bit0 >> 3))
+                f.readinto(buf)
+                line = []
+                if bpp <= 8:
+                    m = (1 << bpp) - 1
+                    b = bit0 & 7
+                    for _ in range(w):
+                        i = (buf[b >> 3] >> (8 - bpp - (b & 7))) & m
+                        line.append(self.palette[i] if i < len(self.palette) else 0)
+                        b += bpp
+                else:
+                    for i in range(0, w * nbytes, nbytes):
+                        v = 0
+                        for k in range(nbytes - 1, -1, -1):
+                            v = (v << 8) | buf[i + k]
+                        line.append(self._rgb(v))
+                yield line
+
+##########################
+#     Composer           #
+##########################
+class PageComposer:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.pages = height // PAGE_ROWS
+        self.cols = [0] * width
+        self._tiles = {}
+        self._files = {}
+
+    def forget(self):
+        """Drop cached tiles (after drawing into a Bitmap already shown)."""
+        self._tiles.clear()
+        self._files.clear()
+
+    def compose(self, root):
+        """Redraw cols from a displayio Group tree (None: blank)."""
+        cols = self.cols
+        for x in range(self.width):
+            cols[x] = 0
+        if root is not None:
+            self._node(root, 0, 0, 1)
+        return cols
+
+    def page(self, page, buf):
+        """Pack page (8 rows) of the last compose() into buf, one byte per column."""
+        shift = page * PAGE_ROWS
+        cols = self.cols
+        for x in range(self.width):
+            buf[x] = (cols[x] >> shift) & 0xFF
+        return buf
+
+    def _node(self, node, ox, oy, scale):
+        if getattr(node, "hidden", False):
+            return
+        x = ox + getattr(node, "x", 0) * scale
+        y = oy + getattr(node, "y", 0) * scale
+        if hasattr(node, "tile_width"):
+            self._tilegrid(node, x, y, scale)
+            return
+        scale *= getattr(node, "scale", 1)
+        for child in node:
+            self._node(child, x, y, scale)
+
+    def _tilegrid(self, tg, x0, y0, scale):
+        bitmap = tg.bitmap
+        tw = tg.tile_width or bitmap.width
+        th = tg.tile_height or bitmap.height
+        across = getattr(tg, "width", 1)
+        down = getattr(tg, "height", 1)
+        flip = getattr(tg, "flip_x", False)
+        shader = getattr(tg, "pixel_shader", None)
+        cols = self.cols
+        for ty in range(down):
+            for tx in range(across):
+                lit, opaque = self._tile(bitmap, shader, tg[tx + ty * across], tw, th)
+                top = y0 + ty * th * scale
+                left = x0 + tx * tw * scale
+                for c in range(tw):
+                    on = lit[tw - 1 - c if flip else c]
+                    cover = opaque[tw - 1 - c if flip else c]
+                    if not cover:
+                        continue
+                    if scale != 1:
+                        on = _stretch(on, scale)
+                        cover = _stretch(cover, scale)
+                    if top >= 0:
+                        on <<= top
+                        cover <<= top
+                    else:
+                        on >>= -top
+                        cover >>= -top
+                    for dx in range(scale):
+                        x = left + c * scale + dx
+                        if 0 <= x < self.width:
+                            cols[x] = (cols[x] & ~cover) | on
+
+    def _tile(self, bitmap, shader, index, tw, th):
+        key = (id(bitmap), id(shader), index, tw, th)
+        hit = self._tiles.get(key)
+        if hit is not None and hit[0] is bitmap and hit[1] is shader:
+            return hit[2], hit[3]
+        per_row = max(1, bitmap.width // tw)
+        sx = (index % per_row) * tw
+        sy = (index // per_row) * th
+        path = _paths.get(id(bitmap))
+        if path is not None:
+            lit, opaque = self._file_tile(path, sx, sy, tw, th)
+        else:
+            lit, opaque = self._ram_tile(bitmap, shader, sx, sy, tw, th)
+        if len(self._tiles) >= TILE_CACHE:
+            self._tiles.clear()
+        self._tiles[key] = (bitmap, shader, lit, opaque)
+        return lit, opaque
+
+    def _file_tile(self, path, sx, sy, tw, th):
+        bmp = self._files.get(path)
+        if bmp is None:
+            bmp = self._files[path] = BmpFile(path)
+        lit = [0] * tw
+        for y, line in enumerate(bmp.rows(sx, sy, tw, th)):
+            bit = 1 << y
+            for x in range(tw):
+                if luma(line[x]) >= LIT_LUMA:
+                    lit[x] |= bit
+        return lit, [(1 << th) - 1] * tw
+
+    def _ram_tile(self, bitmap, shader, sx, sy, tw, th):
+        lit = [0] * tw
+        opaque = [0] * tw
+        transparent = getattr(shader, "is_transparent", None)
+        shades = {}
+        for x in range(tw):
+            for y in range(th):
+                v = bitmap[sx + x, sy + y]
+                shade = shades.get(v)
+                if shade is None:
+                    if transparent is not None and transparent(v):
+                        shade = 0
+                    else:
+                        color = shader[v] if transparent is not None else v
+                        shade = 2 if luma(color) >= LIT_LUMA else 1
+                    shades[v] = shade
+                if shade:
+                    opaque[x] |= 1 << y
+                    if shade == 2:
+                        lit[x] |= 1 << y
+        return lit, opaque
+
+def _stretch(mask, scale):
+    out = 0
+    y = 0
+    while mask:
+        if mask & 1:
+            out |= ((1 << scale) - 1) << (y * scale)
+        mask >>= 1
+        y += 1
+    return out
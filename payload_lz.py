@@ -0,0 +1,110 @@
+# payload_lz.py (CircuitPython and CPython)
+# Small-window LZ for payload text on the SPI link.
+#
+# Sized for the Pro Micro receiver: matches reach back at most 256 bytes,
+# so its decoder keeps a 256-byte ring (indexed with a wrapping uint8_t)
+# and streams output straight into the line executor. The encoding never
+# produces EOT (0x04) or ENQ (0x05), which the receiver's SPI ISR treats
+# as framing, so a compressed frame needs no further escaping.
+#
+#   0x00-0x7F   literal byte (except 0x04, 0x05 and ESC)
+#   ESC hi lo   literal of any other byte: ESC = 0x06, hi/lo = 0x40 | nibble
+#   0x80-0xFF   match, two bytes, both with the top bit set:
+#               b1 = 0x80 | (length - 3) << 2 | (distance - 1) >> 6
+#               b2 = 0x80 | (distance - 1) & 0x3F
+#               length 3..34, distance 1..256 (may overlap the output)
+#
+# The frame's REM META line carries LZ=<compressed length>; LEN and SUM16
+# still describe the decompressed payload (see payloader.build_frame).
+
+ESC = 0x06
+WINDOW = 256
+MIN_MATCH = 3
+MAX_MATCH = 34
+CHAIN = 16          # candidate positions tried per match search
+
+_RESERVED = (0x04, 0x05, ESC)
+
+def _literal(out, b):
+    if b < 0x80 and b not in _RESERVED:
+        out.append(b)
+    else:
+        out.append(ESC)
+        out.append(0x40 | (b >> 4))
+        out.append(0x40 | (b & 0x0F))
+
+def compress(data):
+    """bytes -> compressed bytes (greedy, hash chains on 3-byte prefixes)."""
+    data = bytes(data)
+    n = len(data)
+    out = bytearray()
+    heads = {}      # 3-byte prefix -> recent positions, newest last
+    i = 0
+    while i < n:
+        best_len = 0
+        best_dist = 0
+        if i + MIN_MATCH <= n:
+            key = (data[i] << 16) | (data[i + 1] << 8) | data[i + 2]
+            chain = heads.get(key)
+            if chain:
+                limit = min(MAX_MATCH, n - i)
+                for j in range(len(chain) - 1, -1, -1):
+                    p = chain[j]
+                    if i - p > WINDOW:
+                        break
+                    k = MIN_MATCH
+                    while k < limit and data[p + k] == data[i + k]:
+                        k += 1
+                    if k > best_len:
+                        best_len = k
+                        best_dist = i - p
+                        if k == limit:
+                            break
+        if best_len >= MIN_MATCH:
+            d = best_dist - 1
+            out.append(0x80 | ((best_len - MIN_MATCH) << 2) | (d >> 6))
+            out.append(0x80 | (d & 0x3F))
+            step = best_len
+        else:
+            _literal(out, data[i])
+            step = 1
+        # Index every position we pass so later matches can find it
+        for p in range(i, min(i + step, n - MIN_MATCH + 1)):
+            key = (data[p] << 16) | (data[p + 1] << 8) | data[p + 2]
+            chain = heads.get(key)
+            if chain is None:
+                heads[key] = [p]
+            else:
+                chain.append(p)
+                if len(chain) > CHAIN:
+                    chain.pop(0)
+        i += step
+    return bytes(out)
+
+def decompress(data):
+    """Inverse of compress(); ValueError on a malformed stream."""
+    out = bytearray()
+    n = len(data)
+    i = 0
+    while i < n:
+        b = data[i]
+        if b == ESC:
+            if i + 2 >= n:
+                raise ValueError("truncated escape")
+            out.append(((data[i + 1] & 0x0F) << 4) | (data[i + 2] & 0x0F))
+            i += 3
+        elif b < 0x80:
+            out.append(b)
+            i += 1
+        else:
+            if i + 1 >= n:
+                raise ValueError("truncated match")
+            length = ((b >> 2) & 0x1F) + MIN_MATCH
+            dist = (((b & 0x03) << 6) | (data[i + 1] & 0x3F)) + 1
+            if dist > len(out):
+                raise ValueError(f"match distance {dist} before start at byte {i}")
+            start = len(out) - dist
+            for k in range(length):
+                out.append(out[start + k])
+            i += 2
+    return bytes(out)
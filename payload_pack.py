@@ -0,0 +1,99 @@
+# payload_pack.py (host side, CPython)
+# Converts DuckyScript .dd payloads into pre-normalized .ddb containers that
+# payloader.py can readinto() a preallocated buffer and send without copies.
+#
+#   python payload_pack.py payloads/            # pack every .dd in a folder
+#   python payload_pack.py payloads/payload_a.dd
+#   python payload_pack.py --lz payloads/       # LZ-compressed frames
+#
+# Container layout (little endian), see payloader.py:
+#   "PPDB" | version u8 | flags u8 | frame_len u16 | payload_len u16
+#          | sum16 u16 | crc32 u32 | frame
+# frame is exactly what goes on the wire before EOT: the REM META line
+# followed by the payload with newlines normalized to LF. FLAG_LZ marks a
+# frame packed for payload_compress: its payload part is payload_lz-coded
+# (META line ending in LZ=<length>) unless coding would not shrink it.
+
+import binascii
+import os
+import struct
+import sys
+
+import payload_lz
+
+MAGIC = b"PPDB"
+VERSION = 1
+HEADER = "<4sBBHHHI"
+HEADER_SZ = struct.calcsize(HEADER)
+FLAGS_NONE = 0
+FLAG_LZ = 0x01
+
+# Menu "run:" target suffix, as payloader.TARGET_SEP ("name@left", "name@all")
+TARGET_SEP = "@"
+
+def split_target(spec):
+    """'name@device' -> (name, device), as payloader.split_target."""
+    name, sep, target = spec.rpartition(TARGET_SEP)
+    if not sep:
+        return spec, None
+    return name, target
+
+def sum16(b) -> int:
+    return sum(b) & 0xFFFF
+
+def build_frame(text, lz=False):
+    """(frame, paylen, paysum); lz codes the payload when that is smaller."""
+    payload = text.replace("\r\n", "\n").replace("\r", "\n").encode("utf-8")
+    meta = f"REM META LEN={len(payload)} SUM16={sum16(payload)}"
+    body = payload
+    if lz:
+        packed = payload_lz.compress(payload)
+        if len(packed) < len(payload):
+            meta += f" LZ={len(packed)}"
+            body = packed
+    return (meta + "\n").encode("utf-8") + body, len(payload), sum16(payload)
+
+def pack_payload(text, lz=False):
+    frame, paylen, paysum = build_frame(text, lz)
+    if len(frame) > 0xFFFF:
+        raise ValueError("payload too large for a container")
+    flags = FLAG_LZ if lz else FLAGS_NONE
+    crc = binascii.crc32(frame) & 0xFFFFFFFF
+    head = struct.pack(HEADER, MAGIC, VERSION, flags, len(frame), paylen, paysum, crc)
+    return head + frame
+
+def container_path(path):
+    return path.rsplit(".", 1)[0] + ".ddb"
+
+def pack_file(path, lz=False):
+    with open(path, "r") as f:
+        data = pack_payload(f.read(), lz)
+    out = container_path(path)
+    with open(out, "wb") as f:
+        f.write(data)
+    # Payload bytes as stored vs. as sent after the META line
+    paylen = struct.unpack_from(HEADER, data, 0)[4]
+    body = len(data) - (data.index(b"\n", HEADER_SZ) + 1)
+    return out, len(data), paylen, body
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    lz = "--lz" in argv
+    argv = [a for a in argv if a != "--lz"]
+    if not argv:
+        print("usage: python payload_pack.py [--lz] <payload.dd | dir> ...")
+        return 2
+    paths = []
+    for arg in argv:
+        if os.path.isdir(arg):
+            paths += [os.path.join(arg, n) for n in sorted(os.listdir(arg)) if n.endswith(".dd")]
+        else:
+            paths.append(arg)
+    for path in paths:
+        out, size, paylen, body = pack_file(path, lz)
+        pct = body * 100 // paylen if paylen else 100
+        print(f"{path} -> {out} ({size} bytes, payload {paylen} -> {body} on the wire, {pct}%)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
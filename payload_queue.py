@@ -0,0 +1,247 @@
+# payload_queue.py (CircuitPython)
+# Queue of payload jobs streamed to the Pro Micro without blocking the menu.
+#
+# The receiver reports BUSY / SLOT_FULL / last result through the status
+# byte it shifts out on MISO. While it types one payload its receive slot is
+# free, so the next job is transferred right away and execution overlaps the
+# transfer. Call poll() from the main loop; it never waits on the receiver.
+#
+# Status comes from one receiver, so each receiver board gets its own queue:
+# `jobs` feeds the default one, queue_for(device) the others. submit()
+# routes "name@device" entries (and "name@all" to every board) through
+# payloader.split_target; poll_all() / all_idle() cover every queue.
+
+import time
+import payloader
+import metrics
+import log
+from spi_comm import (
+    status_valid, status_result, status_done_count,
+    STATUS_BUSY, STATUS_SLOT_FULL,
+    RESULT_OK, RESULT_FAIL, RESULT_SKIPPED,
+)
+
+QUEUED = "queued"
+SENT = "sent"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+SKIPPED = "skipped"
+ERROR = "error"
+
+C_DONE = metrics.counter("queue.done")
+C_FAILED = metrics.counter("queue.failed")
+C_SKIPPED = metrics.counter("queue.skipped")
+
+_RESULT_COUNTER = {
+    RESULT_OK: C_DONE,
+    RESULT_FAIL: C_FAILED,
+    RESULT_SKIPPED: C_SKIPPED,
+}
+
+_RESULT_STATUS = {
+    RESULT_OK: DONE,
+    RESULT_FAIL: FAILED,
+    RESULT_SKIPPED: SKIPPED,
+}
+
+class PayloadJob:
+    def __init__(self, name):
+        self.name = name
+        self.status = QUEUED
+        self.error = None
+
+    def finished(self):
+        return self.status in (DONE, FAILED, SKIPPED, ERROR)
+
+class PayloadQueue:
+    def __init__(self, spi=None, poll_interval=0.1, on_progress=None):
+        self.spi = spi if spi is not None else payloader.spi
+        self.poll_interval = poll_interval
+        self.on_progress = on_progress
+
+        self.jobs = []          # every job of the current batch, in order
+        self._pending = []      # queued, not yet transferred
+        self._inflight = []     # transferred, waiting for the receiver
+        self._done_seen = None  # last DONE counter read from the receiver
+        self._next_poll = 0.0
+
+        self.receiver_ok = None  # None until the first status poll
+
+    ###########################
+    #     Queue payloads      #
+    ###########################
+    def submit(self, names):
+        if isinstance(names, str):
+            names = [names]
+        if self.idle():
+            self.jobs = []
+        added = []
+        for name in names:
+            job = PayloadJob(name)
+            self.jobs.append(job)
+            self._pending.append(job)
+            added.append(job)
+        # Containers share one frame buffer: only the next transfer is staged
+        if added and self._pending[0] is added[0]:
+            payloader.prefetch_payload(added[0].name)
+        self._progress()
+        return added
+
+    def cancel(self):
+        for job in self._pending:
+            job.status = ERROR
+            job.error = "cancelled"
+        self._pending = []
+        self._progress()
+
+    def idle(self):
+        return not self._pending and not self._inflight
+
+    ###################################
+    #     Non-blocking state step     #
+    ###################################
+    def poll(self, now=None):
+        """Advance the queue. Returns True when any job changed state."""
+        if self.idle():
+            return False
+        if now is None:
+            now = time.monotonic()
+        if now < self._next_poll:
+            return False
+        self._next_poll = now + self.poll_interval
+
+        st = self.spi.read_status()
+        changed = False
+
+        if not status_valid(st):
+            # Old receiver firmware or nothing attached: fall back to the
+            # fire-and-forget behaviour, one job per poll.
+            self.receiver_ok = False
+            for job in self._inflight:
+                job.status = SENT
+            self._inflight = []
+            if self._pending:
+                self._transfer(self._pending.pop(0))
+                changed = True
+            if changed:
+                self._progress()
+            return changed
+
+        self.receiver_ok = True
+        done = status_done_count(st)
+        if self._done_seen is None:
+            self._done_seen = done
+
+        finished = (done - self._done_seen) & 0x03
+        self._done_seen = done
+        if finished:
+            code = status_result(st)
+            result = _RESULT_STATUS.get(code, DONE)
+            for _ in range(min(finished, len(self._inflight))):
+                self._inflight.pop(0).status = result
+                metrics.inc(_RESULT_COUNTER.get(code, C_DONE))
+            changed = True
+
+        if self._inflight and (st & STATUS_BUSY):
+            head = self._inflight[0]
+            if head.status != RUNNING:
+                head.status = RUNNING
+                changed = True
+
+        # The receive slot is free while the previous job executes
+        if self._pending and not (st & STATUS_SLOT_FULL) and len(self._inflight) < 2:
+            self._transfer(self._pending.pop(0))
+            changed = True
+
+        if changed:
+            self._progress()
+        return changed
+
+    def _transfer(self, job):
+        try:
+            frame, _, _ = payloader.stage_frame(job.name)
+        except Exception as e:
+            job.status = ERROR
+            job.error = str(e)
+            log.error("QUEUE", "%s: %s", job.name, e)
+            return
+        if not self.spi.try_send_bytes(frame, append_eot=True):
+            job.status = FAILED
+            job.error = self.spi.last_error
+            metrics.inc(C_FAILED)
+            log.error("QUEUE", "%s: %s", job.name, job.error)
+            return
+        job.status = SENT
+        self._inflight.append(job)
+        log.info("QUEUE", "sent %s (%d bytes)", job.name, len(frame))
+        if self._pending:
+            payloader.prefetch_payload(self._pending[0].name)
+
+    ###########################
+    #     Progress output     #
+    ###########################
+    def summary(self):
+        total = len(self.jobs)
+        if not total:
+            return "Queue empty"
+        finished = sum(1 for j in self.jobs if j.finished())
+        for job in self.jobs:
+            if job.status == RUNNING:
+                return f"{finished}/{total} run {job.name}"
+        if self.idle():
+            failed = sum(1 for j in self.jobs if j.status in (FAILED, ERROR))
+            return f"{total} done, {failed} failed" if failed else f"{total} done"
+        return f"{finished}/{total} queued"
+
+    def _progress(self):
+        if self.on_progress:
+            self.on_progress(self)
+
+###############################################
+#     Shared queue bound to the payload bus   #
+###############################################
+jobs = PayloadQueue()
+_queues = {}    # receiver name -> PayloadQueue, besides `jobs`
+
+def queue_for(device=None):
+    """Queue of the named receiver; None (or the default one) is `jobs`."""
+    if device is None or device == jobs.spi.name:
+        return jobs
+    q = _queues.get(device)
+    if q is None:
+        dev = payloader.bus.device(device)
+        if dev is None:
+            raise KeyError(device)
+        q = _queues[device] = PayloadQueue(dev, jobs.poll_interval, jobs.on_progress)
+    return q
+
+def submit(entries):
+    """
+    Queue "name" / "name@device" / "name@all" entries on their receivers'
+    queues. Returns the queues used; unknown devices raise KeyError.
+    """
+    batches = {}
+    for entry in entries:
+        name, device = payloader.split_target(entry)
+        if device == payloader.BROADCAST:
+            targets = list(payloader.bus.devices)
+        else:
+            targets = [device]
+        for target in targets:
+            q = queue_for(target)
+            batches.setdefault(id(q), (q, []))[1].append(name)
+    used = []
+    for q, names in batches.values():
+        q.submit(names)
+        used.append(q)
+    return used
+
+def poll_all(now=None):
+    changed = jobs.poll(now)
+    for q in _queues.values():
+        changed = q.poll(now) or changed
+    return changed
+
+def all_idle():
+    return jobs.idle() and all(q.idle() for q in _queues.values())
@@ -1,10 +1,110 @@
 # payloader.py (CircuitPython)
+import os
+import struct
+import binascii
 import time
 import board
-from spi_comm import SPIComm
+from spi_comm import SPIBus
+import metrics
+import log
+import payload_lz
 
 PAYLOAD_DIR = "/payloads/"
-spi = SPIComm(cs_pin=board.GP17, baudrate=500000)
+
+# One SPI peripheral for every receiver board; `spi` is the default one
+# (GP17). configure_devices() adds the rest from config["spi_devices"].
+bus = SPIBus()
+spi = bus.add("main", board.GP17, baudrate=500000)
+
+# Target suffix on a payload name: "name@left", or "name@all" to broadcast
+TARGET_SEP = "@"
+BROADCAST = "all"
+
+# Receiver's SPI buffer (SPI_Pro_Micro.ino BUF_SZ); a longer frame wraps
+RECEIVER_BUF = 256
+# LZ-compress payloads (LZ= in the META line); set by configure()
+compress = False
+
+############################################
+#     Ready-to-send frame cache (LRU)      #
+############################################
+# Each entry is (key, frame, paylen, paysum) where key is (name, mtime, size)
+# so an edited payload on the drive is never sent stale. Most recent is last.
+FRAME_CACHE_SLOTS = 2
+_frame_cache = []
+
+# Milliseconds from select to the first byte on the bus, for the last send
+last_send_latency_ms = None
+
+C_SENT = metrics.counter("payload.sent")
+C_ERRORS = metrics.counter("payload.errors")
+C_CACHE_HIT = metrics.counter("payload.cache_hit")
+C_CRC_FAIL = metrics.counter("payload.crc_fail")
+G_LZ_PCT = metrics.gauge("payload.lz_pct")
+H_LATENCY = metrics.histogram("payload.select_to_wire_ms")
+
+##################################################
+#     Pre-packed .ddb containers (zero-copy)     #
+##################################################
+# Built on the host by payload_pack.py:
+#   "PPDB" | version u8 | flags u8 | frame_len u16 | payload_len u16
+#          | sum16 u16 | crc32 u32 | frame
+# The frame is read straight into one preallocated buffer and written to the
+# bus through a memoryview slice, so a send allocates nothing. The CRC is
+# checked once per load (a buffer hit skips it); a corrupt or half-written
+# container is refused and the .dd is sent instead.
+CONTAINER_MAGIC = b"PPDB"
+CONTAINER_VERSION = 1
+CONTAINER_HEADER = "<4sBBHHHI"
+CONTAINER_HEADER_SZ = struct.calcsize(CONTAINER_HEADER)
+CONTAINER_FLAG_LZ = 0x01    # packed for payload_compress
+FRAME_BUF_SIZE = 2048
+
+_frame_buf = bytearray(FRAME_BUF_SIZE)
+_frame_view = memoryview(_frame_buf)
+_header_buf = bytearray(CONTAINER_HEADER_SZ)
+_buf_key = None      # (name, mtime, size) of the container in _frame_buf
+_buf_meta = None     # (frame_len, paylen, paysum)
+
+##########################
+#     Receiver boards    #
+##########################
+def configure(config):
+    """Receivers and compression from config."""
+    global compress
+    configure_devices(config)
+    if bool(config.get("payload_compress")) != compress:
+        compress = bool(config.get("payload_compress"))
+        clear_frame_cache()
+
+def configure_devices(config):
+    """
+    Register receivers from config["spi_devices"], a list of
+    {"name", "cs" (board pin name), "baudrate", "phase", "polarity"}.
+    An entry named like an existing device only changes its settings.
+    """
+    for entry in config.get("spi_devices") or ():
+        name = entry.get("name")
+        if not name or name == BROADCAST:
+            log.warn("SPI", "skipping device entry %s", entry)
+            continue
+        dev = bus.device(name)
+        try:
+            if dev is None:
+                dev = bus.add(name, getattr(board, entry["cs"]))
+            dev.baudrate = int(entry.get("baudrate", dev.baudrate))
+            dev.phase = int(entry.get("phase", dev.phase))
+            dev.polarity = int(entry.get("polarity", dev.polarity))
+        except (KeyError, AttributeError, ValueError) as e:
+            log.error("SPI", "device %s: %s", name, e)
+    log.info("SPI", "receivers: %s", ", ".join(bus.devices))
+
+def split_target(spec):
+    """'name@device' -> (name, device); device is None without a suffix."""
+    name, sep, target = spec.rpartition(TARGET_SEP)
+    if not sep:
+        return spec, None
+    return name, target
 
 def load_payload(name: str) -> str:
     path = PAYLOAD_DIR + name
@@ -16,34 +116,189 @@ def load_payload(name: str) -> str:
 def sum16(b: bytes) -> int:
     return sum(b) & 0xFFFF
 
-def send_payload(name: str, screen=None) -> bool:
+def _frame_key(name):
+    st = os.stat(PAYLOAD_DIR + name)
+    return (name, st[8], st[6])
+
+def build_frame(name):
+    """
+    Return (frame, paylen, paysum) where frame is META header + payload.
+    With compression on, the payload goes out LZ-coded (when that is
+    smaller) and the META line gains LZ=<wire length>; LEN and SUM16 stay
+    those of the plain payload, which the receiver checks after decoding.
+    """
+    payload_bytes = load_payload(name).encode("utf-8")
+    paylen = len(payload_bytes)
+    paysum = sum16(payload_bytes)
+    meta = f"REM META LEN={paylen} SUM16={paysum}"
+    body = payload_bytes
+    if compress and paylen:
+        packed = payload_lz.compress(payload_bytes)
+        pct = len(packed) * 100 // paylen
+        metrics.set_gauge(G_LZ_PCT, pct)
+        log.info("PAYLOAD", "%s lz %d -> %d bytes (%d%%)", name, paylen, len(packed), pct)
+        if len(packed) < paylen:
+            meta += f" LZ={len(packed)}"
+            body = packed
+    frame = (meta + "\n").encode("utf-8") + body
+    if len(frame) > RECEIVER_BUF:
+        log.warn("PAYLOAD", "%s frame %d > receiver buffer %d", name, len(frame), RECEIVER_BUF)
+    return frame, paylen, paysum
+
+def get_frame(name):
+    """Cached build_frame(); rebuilds when the file's mtime or size changes."""
+    key = _frame_key(name)
+    for i, entry in enumerate(_frame_cache):
+        if entry[0] == key:
+            if i != len(_frame_cache) - 1:
+                _frame_cache.append(_frame_cache.pop(i))
+            metrics.inc(C_CACHE_HIT)
+            return entry[1], entry[2], entry[3]
+
+    frame, paylen, paysum = build_frame(name)
+    # Drop any stale entry for the same file before inserting
+    for i in range(len(_frame_cache) - 1, -1, -1):
+        if _frame_cache[i][0][0] == name:
+            _frame_cache.pop(i)
+    _frame_cache.append((key, frame, paylen, paysum))
+    while len(_frame_cache) > FRAME_CACHE_SLOTS:
+        _frame_cache.pop(0)
+    return frame, paylen, paysum
+
+def container_name(name):
+    return name.rsplit(".", 1)[0] + ".ddb"
+
+def _container_key(name):
+    """Key of the usable container for name, or None (missing / stale)."""
+    cname = container_name(name)
     try:
-        text = load_payload(name)
+        cst = os.stat(PAYLOAD_DIR + cname)
+    except OSError:
+        return None
+    if cname != name:
+        try:
+            # An edited .dd must not be shadowed by an old container
+            if os.stat(PAYLOAD_DIR + name)[8] > cst[8]:
+                return None
+        except OSError:
+            pass
+    return (cname, cst[8], cst[6])
+
+def load_container(name, key=None):
+    """
+    readinto() the container frame into the shared buffer. None when the
+    container was packed for the other payload_compress setting.
+    """
+    global _buf_key, _buf_meta
+
+    key = key or _container_key(name)
+    if key is None:
+        raise OSError(f"no container for {name}")
+    if key == _buf_key:
+        metrics.inc(C_CACHE_HIT)
+        frame_len, paylen, paysum = _buf_meta
+        return _frame_view[:frame_len], paylen, paysum
+
+    _buf_key = None
+    with open(PAYLOAD_DIR + key[0], "rb") as f:
+        if f.readinto(_header_buf) != CONTAINER_HEADER_SZ:
+            raise ValueError("container truncated")
+        magic, version, flags, frame_len, paylen, paysum, crc = struct.unpack_from(
+            CONTAINER_HEADER, _header_buf, 0
+        )
+        if magic != CONTAINER_MAGIC or version != CONTAINER_VERSION:
+            raise ValueError("not a payload container")
+        if bool(flags & CONTAINER_FLAG_LZ) != compress:
+            return None
+        if frame_len > FRAME_BUF_SIZE:
+            raise ValueError(f"frame {frame_len} > buffer {FRAME_BUF_SIZE}")
+        view = _frame_view[:frame_len]
+        if f.readinto(view) != frame_len:
+            raise ValueError("container truncated")
+    if binascii.crc32(view) & 0xFFFFFFFF != crc:
+        metrics.inc(C_CRC_FAIL)
+        raise ValueError("container CRC mismatch")
+
+    _buf_key = key
+    _buf_meta = (frame_len, paylen, paysum)
+    return view, paylen, paysum
+
+def stage_frame(name):
+    """Ready-to-send frame: container buffer if available, else get_frame()."""
+    key = _container_key(name)
+    if key is not None:
+        try:
+            staged = load_container(name, key)
+        except ValueError as e:
+            if key[0] == name:
+                raise       # no source payload to fall back to
+            log.warn("PAYLOAD", "%s: %s, sending %s", key[0], e, name)
+            staged = None
+        if staged is not None:
+            return staged
+    return get_frame(name)
+
+def prefetch_payload(name: str) -> bool:
+    """Prepare the frame for name ahead of select. Never raises."""
+    try:
+        stage_frame(name)
+        return True
     except Exception as e:
-        msg = f"ERR {e}"
-        print(msg)
-        if screen:
-            screen.print_line("1: Payload error")
-            screen.print_line("2: See serial")
-            screen.flush()
+        log.warn("PAYLOAD", "prefetch %s failed: %s", name, e)
         return False
 
-    payload_bytes = text.encode("utf-8")
-    paylen = len(payload_bytes)
-    paysum = sum16(payload_bytes)
+def clear_frame_cache():
+    global _buf_key
+    _frame_cache.clear()
+    _buf_key = None
 
-    meta = f"REM META LEN={paylen} SUM16={paysum}\n".encode("utf-8")
-    full = meta + payload_bytes
+def send_payload(name: str, screen=None, t_select=None, device=None) -> bool:
+    """
+    Send to the default receiver, the named device, or every device when
+    device is BROADCAST. Per-device outcome is on bus.devices[...].state.
+    """
+    global last_send_latency_ms
 
-    if screen:
-        screen.clear()
-        screen.print_line("1: Sending")
-        screen.print_line(f"2: {name}")
-        screen.flush()
+    if t_select is None:
+        t_select = time.monotonic()
 
-    print(f"[PAYLOAD] {name} len={paylen} sum16={paysum}")
-    print(f"[SPI] Sending {len(full)+1} bytes (META+payload+EOT)")
+    try:
+        full, paylen, paysum = stage_frame(name)
+    except Exception as e:
+        log.error("PAYLOAD", "%s: %s", name, e)
+        metrics.inc(C_ERRORS)
+        if screen:
+            screen.show_overlay("Payload error", "See serial")
+        return False
+
+    if device == BROADCAST:
+        targets = list(bus.devices)
+    else:
+        dev = spi if device is None else bus.device(device)
+        if dev is None:
+            log.error("PAYLOAD", "no receiver named %s", device)
+            metrics.inc(C_ERRORS)
+            if screen:
+                screen.show_overlay("No receiver", str(device))
+            return False
+        targets = [dev.name]
+
+    if screen:
+        screen.show_overlay("Sending", name if len(targets) == 1 else f"{name} x{len(targets)}")
 
-    spi.send_bytes(full, append_eot=True)
+    last_send_latency_ms = int((time.monotonic() - t_select) * 1000)
+    metrics.observe(H_LATENCY, last_send_latency_ms)
+    results = bus.broadcast(full, append_eot=True, names=targets)
+    ok = all(results.values())
+    metrics.inc(C_SENT, sum(1 for r in results.values() if r))
+    if not ok:
+        metrics.inc(C_ERRORS)
+        for n, r in results.items():
+            if not r:
+                log.error("PAYLOAD", "%s -> %s: %s", name, n, bus.devices[n].last_error)
+    log.info("PAYLOAD", "%s len=%d sum16=%d wire=%d -> %s select->wire %d ms",
+             name, paylen, paysum, len(full) + 1, ",".join(targets), last_send_latency_ms)
+    if screen and len(targets) > 1:
+        screen.toast(bus.summary(), seconds=3.0)
     time.sleep(0.05)
-    return True
+    return ok
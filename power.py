@@ -0,0 +1,93 @@
+# power.py (CircuitPython)
+# Idle manager: dim, then sleep the display after inactivity, and let the
+# main loop back off to a slow poll while nothing is happening.
+#
+#   ACTIVE --dim_after--> DIM --sleep_after--> SLEEP
+#      ^---------- any button / UART byte ---------'
+#
+# code.py calls activity() on input and sleeps poll_interval() at the end
+# of every pass. While sleeping, the first input only wakes the display;
+# the wake-to-first-frame time is recorded in the power.wake_ms histogram
+# and checked against wake_target_ms.
+
+import time
+import metrics
+import log
+
+ACTIVE = 0
+DIM = 1
+SLEEP = 2
+
+STATE_NAMES = ("active", "dim", "sleep")
+
+H_WAKE = metrics.histogram("power.wake_ms")
+C_WAKE_SLOW = metrics.counter("power.wake_slow")
+
+class IdleManager:
+    def __init__(self, screen, dim_after=30.0, sleep_after=120.0, dim_level=0.1,
+                 fast_poll=0.05, slow_poll=0.25, wake_target_ms=100):
+        self.screen = screen
+        self.dim_after = dim_after          # seconds, 0 = never
+        self.sleep_after = sleep_after      # seconds, 0 = never
+        self.dim_level = dim_level
+        self.fast_poll = fast_poll
+        self.slow_poll = slow_poll
+        self.wake_target_ms = wake_target_ms
+
+        self.state = ACTIVE
+        self.last_wake_ms = None
+        self._last_input = time.monotonic()
+        self._busy = False
+
+    @classmethod
+    def from_config(cls, screen, config):
+        return cls(
+            screen,
+            dim_after=config.get("dim_after_s", 0),
+            sleep_after=config.get("sleep_after_s", 0),
+            slow_poll=config.get("idle_poll_ms", 250) / 1000,
+            wake_target_ms=config.get("wake_target_ms", 100),
+        )
+
+    def activity(self, now=None):
+        """
+        Note user input. Returns True if the input woke a sleeping display
+        (the caller should not act on it).
+        """
+        self._last_input = time.monotonic() if now is None else now
+        if self.state == ACTIVE:
+            return False
+
+        woke = self.state == SLEEP
+        t0 = metrics.start()
+        self.screen.wake()
+        self.state = ACTIVE
+        if woke:
+            self.last_wake_ms = metrics.stop(H_WAKE, t0)
+            if self.last_wake_ms > self.wake_target_ms:
+                metrics.inc(C_WAKE_SLOW)
+                log.warn("POWER", "wake took %d ms (target %d)", self.last_wake_ms, self.wake_target_ms)
+        return woke
+
+    def poll(self, now=None, busy=False):
+        """
+        Step the idle state. busy (queue/IR work in flight) keeps the fast
+        poll rate but does not count as input.
+        """
+        self._busy = busy
+        if now is None:
+            now = time.monotonic()
+        idle = now - self._last_input
+
+        if self.state == ACTIVE and self.dim_after and idle >= self.dim_after:
+            self.screen.dim(self.dim_level)
+            self.state = DIM
+        if self.state != SLEEP and self.sleep_after and idle >= self.sleep_after:
+            self.screen.sleep()
+            self.state = SLEEP
+        return self.state
+
+    def poll_interval(self):
+        if self.state == ACTIVE or self._busy:
+            return self.fast_poll
+        return self.slow_poll
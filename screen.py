@@ -6,18 +6,170 @@ import terminalio
 import math
 from adafruit_display_text import label
 from fourwire import FourWire
-from adafruit_displayio_sh1106 import SH1106
+from sh1106_display import SH1106Display
+import page_shadow
+from char_lcd import CharLCD
+import metrics
+import log
+import textlayout
 
 WIDTH = 128
 HEIGHT = 64
 BORDER = 5
 
+C_UPDATE = metrics.counter("screen.update")
+C_REFRESH = metrics.counter("screen.refresh")
+H_REFRESH = metrics.histogram("screen.refresh_ms")
+G_LCD_BYTES = metrics.gauge("lcd.bytes")
+
+# Persistent sub-groups of the root group, bottom to top. Drawing targets a
+# layer; showing/hiding one is a single `hidden` flag, never group surgery.
+# "pages" holds prebuilt menu pages (see MenuPage), "menu" ad-hoc drawing.
+LAYERS = ("background", "pages", "menu", "sprites", "overlay", "toast")
+TOAST_H = 12
+ROW_H = 16
+
+# Menu row text: left edge and room inside the button bitmap. A scrolling
+# (marquee) row is clipped to the strip between two CAP_W wide end caps.
+TEXT_X = 6
+TEXT_W = WIDTH - 2 * TEXT_X - 2
+CAP_W = 8
+MARQUEE_W = WIDTH - 2 * CAP_W
+
+def _solid(width, height, color=0x000000):
+    bmp = displayio.Bitmap(width, height, 1)
+    pal = displayio.Palette(1)
+    pal[0] = color
+    return displayio.TileGrid(bmp, pixel_shader=pal)
+
+class MenuPage:
+    """
+    One prebuilt OLED menu page: per row a normal and a selected button
+    TileGrid plus the label. Moving the cursor only flips `hidden` flags.
+
+    Names too wide for a row show with an ellipsis. When such a row is
+    selected its full-text label (built on first selection) is shown
+    instead and scroll() slides it between two end caps cut from the
+    selected button, so the text is clipped without touching the border.
+    """
+
+    def __init__(self, names, normal_odb, selected_odb, page_size, font=terminalio.FONT, speed=24):
+        self.group = displayio.Group()
+        self.names = names
+        self.font = font
+        self.speed = speed      # marquee px/s, 0 = ellipsis only
+        self.normal = []
+        self.selected = []
+        self.labels = []
+        self.row = -1
+        for row in range(page_size):
+            y = row * ROW_H
+            for odb, tiles in ((normal_odb, self.normal), (selected_odb, self.selected)):
+                tg = displayio.TileGrid(odb, pixel_shader=odb.pixel_shader, x=0, y=y)
+                self.group.append(tg)
+                tiles.append(tg)
+            if row < len(names):
+                lbl = label.Label(
+                    font, text=textlayout.fit(names[row], TEXT_W, font),
+                    color=0xFFFFFF, x=TEXT_X, y=y + 7
+                )
+                self.group.append(lbl)
+                self.labels.append(lbl)
+
+        # Marquee labels sit under the caps; both above the rows
+        self._scrolling = displayio.Group()
+        self.group.append(self._scrolling)
+        self._full = {}          # row -> full-text label
+        self._caps = []
+        for tile, x in ((0, 0), (WIDTH // CAP_W - 1, WIDTH - CAP_W)):
+            cap = displayio.TileGrid(
+                selected_odb, pixel_shader=selected_odb.pixel_shader,
+                tile_width=CAP_W, tile_height=ROW_H, default_tile=tile, x=x, y=0
+            )
+            cap.hidden = True
+            self.group.append(cap)
+            self._caps.append(cap)
+        self.marquee = None
+        self.select(0)
+
+    def select(self, row):
+        if row == self.row:
+            return
+        for i in range(len(self.normal)):
+            self.normal[i].hidden = i == row
+            self.selected[i].hidden = i != row
+        self._stop_marquee()
+        self.row = row
+        if self.speed and row < len(self.names):
+            overflow = textlayout.measure(self.names[row], self.font) - MARQUEE_W
+            if overflow > 0:
+                self._start_marquee(row, overflow)
+
+    def _start_marquee(self, row, overflow):
+        full = self._full.get(row)
+        if full is None:
+            full = label.Label(
+                self.font, text=self.names[row], color=0xFFFFFF,
+                x=CAP_W, y=row * ROW_H + 7
+            )
+            self._scrolling.append(full)
+            self._full[row] = full
+        full.x = CAP_W
+        full.hidden = False
+        self.labels[row].hidden = True
+        for cap in self._caps:
+            cap.y = row * ROW_H
+            cap.hidden = False
+        self.marquee = textlayout.Marquee(overflow, self.speed)
+
+    def _stop_marquee(self):
+        if self.marquee is None:
+            return
+        self._full[self.row].hidden = True
+        self.labels[self.row].hidden = False
+        for cap in self._caps:
+            cap.hidden = True
+        self.marquee = None
+
+    def scroll(self, now=None):
+        """Advance the selected row's marquee; True if it moved."""
+        if self.marquee is None:
+            return False
+        x = CAP_W - self.marquee.offset(now)
+        full = self._full[self.row]
+        if full.x == x:
+            return False
+        full.x = x
+        return True
+
 class Screen:
-    def __init__(self, uart, display_type, i2c=None, address=0x27):
-        print(f"[DEBUG] screen initialized")
+    def __init__(self, uart, display_type, i2c=None, address=0x27, lcd_size=(16, 2),
+                 partial=False, fps=10):
+        log.debug("SCREEN", "init %s", display_type)
         self.uart = uart
         self.dt = display_type
         self.buffer = ["", ""]
+        self.inverted = False
+        self.display = None
+        self.lcd = None
+        self.mirror = None
+        self.layers = {}
+        self._toast_until = None
+        self._toast_saved = None    # LCD row the toast covers, and its toast text
+        self._odbs = {}     # bitmap path -> OnDiskBitmap shared by menu pages
+
+        # Partial OLED mode: poll() refreshes (diff + changed runs) at fps
+        self._refresh_s = 1.0 / fps if fps else 0
+        self._next_refresh = 0.0
+
+        # Text cells available per line and menu rows per page. Layout
+        # measures in pixels with `font` on the OLED, in cells on the LCD
+        # (font None); `text_width` is a full line in those units.
+        fw, _ = terminalio.FONT.get_bounding_box()
+        self.cols = WIDTH // fw
+        self.page_size = 4
+        self.font = terminalio.FONT
+        self.text_width = WIDTH
 
         if self.dt == "oled":
             displayio.release_displays()
@@ -26,16 +178,198 @@ class Screen:
             cs = board.GP14
             reset = board.GP12
             display_bus = FourWire(spi, command=dc, chip_select=cs, reset=reset)
-            self.display = SH1106(display_bus, width=WIDTH, height=HEIGHT, col_offset=2)
+            self.display = SH1106Display(
+                display_bus, width=WIDTH, height=HEIGHT, col_offset=2, partial=partial
+            )
             self.splash = displayio.Group()
             self.display.root_group = self.splash
+            for name in LAYERS:
+                self.layers[name] = displayio.Group()
+                self.splash.append(self.layers[name])
 
+            # Overlay: an opaque backdrop (shown only by show_overlay) under
+            # the two print_line labels
+            overlay = self.layers["overlay"]
+            self._overlay_bg = _solid(WIDTH, HEIGHT)
+            self._overlay_bg.hidden = True
+            overlay.append(self._overlay_bg)
             self.line_labels = [
                 label.Label(terminalio.FONT, text="", x=0, y=10),
                 label.Label(terminalio.FONT, text="", x=0, y=25)
             ]
             for lbl in self.line_labels:
-                self.splash.append(lbl)
+                overlay.append(lbl)
+
+            # Toast: one preallocated strip along the bottom edge
+            toast = self.layers["toast"]
+            toast_bg = _solid(WIDTH, TOAST_H)
+            toast_bg.y = HEIGHT - TOAST_H
+            toast.append(toast_bg)
+            self._toast_label = label.Label(terminalio.FONT, text="", x=2, y=HEIGHT - TOAST_H // 2)
+            toast.append(self._toast_label)
+            toast.hidden = True
+
+        elif self.dt == "lcd":
+            if i2c is None:
+                i2c = busio.I2C(board.GP7, board.GP6)
+            cols, rows = lcd_size
+            self.lcd = CharLCD(i2c, address=address, cols=cols, rows=rows)
+            self.cols = cols
+            self.page_size = rows
+            self.font = None
+            self.text_width = cols
+
+    def enable_mirror(self, fps=2, pages_per_poll=1):
+        """Stream changed display pages to the host (OLED only)."""
+        if self.dt != "oled":
+            return False
+        from mirror import FrameMirror
+        self.mirror = FrameMirror(self.display, fps=fps, pages_per_poll=pages_per_poll)
+        return True
+
+    #######################
+    #     Power state     #
+    #######################
+    @property
+    def awake(self):
+        if self.dt == "oled":
+            return self.display.is_awake
+        if self.dt == "lcd":
+            return self.lcd.backlight
+        return True
+
+    def dim(self, level):
+        """Panel brightness 0.0-1.0 (OLED contrast); no-op on the LCD."""
+        if self.dt == "oled":
+            self.display.set_contrast(level)
+
+    def sleep(self):
+        if self.dt == "oled":
+            self.display.sleep()
+        elif self.dt == "lcd":
+            self.lcd.backlight = False
+
+    def wake(self):
+        """Panel on at full brightness with the current frame pushed out."""
+        if self.dt == "oled":
+            self.display.wake()
+            self.display.set_contrast(1.0)
+            self.display.refresh()
+        elif self.dt == "lcd":
+            self.lcd.backlight = True
+
+    ###############################
+    #     Layers and overlays     #
+    ###############################
+    def layer(self, name):
+        return self.layers[name]
+
+    def set_layer_visible(self, name, visible):
+        if name in self.layers:
+            self.layers[name].hidden = not visible
+
+    def show_overlay(self, line1="", line2="", hide_menu=True):
+        """Full-screen status over the menu; the menu layer stays intact."""
+        self.buffer = [line1, line2]
+        if self.dt == "oled":
+            self._overlay_bg.hidden = False
+            self.set_layer_visible("menu", not hide_menu)
+        self.update_display()
+
+    def dismiss_overlay(self):
+        """Returns True if the menu underneath is intact (no redraw needed)."""
+        self.buffer = ["", ""]
+        if self.dt == "oled":
+            self._overlay_bg.hidden = True
+            self.set_layer_visible("menu", True)
+        self.update_display()
+        return self.dt == "oled"
+
+    ###########################
+    #     Prebuilt pages      #
+    ###########################
+    def menu_page(self, names, normal_bmp, selected_bmp, speed=24):
+        """Build (not show) a MenuPage for up to page_size names; OLED only."""
+        odbs = []
+        for path in (normal_bmp, selected_bmp):
+            if path not in self._odbs:
+                self._odbs[path] = page_shadow.register(displayio.OnDiskBitmap(path), path)
+            odbs.append(self._odbs[path])
+        page = MenuPage(names, odbs[0], odbs[1], self.page_size, self.font, speed)
+        page.group.hidden = True
+        self.layers["pages"].append(page.group)
+        return page
+
+    def show_page(self, page):
+        pages = self.layers["pages"]
+        for i in range(len(pages)):
+            pages[i].hidden = pages[i] is not page.group
+        self.layers["pages"].hidden = False
+
+    def drop_page(self, page):
+        try:
+            self.layers["pages"].remove(page.group)
+        except ValueError:
+            pass
+
+    def node_count(self):
+        """Groups and drawables under the root (soak tests watch growth)."""
+        if self.dt != "oled":
+            return 0
+        count = 0
+        todo = [self.splash]
+        while todo:
+            group = todo.pop()
+            for item in group:
+                count += 1
+                if isinstance(item, displayio.Group):
+                    todo.append(item)
+        return count
+
+    def toast(self, text, seconds=2.0):
+        """Short message on the bottom strip, hidden again by poll()."""
+        if self.dt == "oled":
+            self._toast_label.text = textlayout.fit(text, WIDTH - 4, self.font)
+            self.layers["toast"].hidden = False
+        elif self.dt == "lcd":
+            row = self.lcd.rows - 1
+            under = self.lcd.line(row)
+            if self._toast_saved and under == self._toast_saved[1]:
+                under = self._toast_saved[0]     # toast over toast
+            self.lcd.write_line(row, textlayout.fit(text, self.cols, None))
+            self._toast_saved = (under, self.lcd.line(row))
+            self.lcd.show()
+        self._toast_until = time.monotonic() + seconds
+
+    def poll(self, now=None):
+        """Main-loop housekeeping: toast timeout, partial-mode refresh and
+        screen mirroring."""
+        if self._toast_until is not None:
+            if now is None:
+                now = time.monotonic()
+            if now >= self._toast_until:
+                self._toast_until = None
+                if self.dt == "oled":
+                    self.layers["toast"].hidden = True
+                elif self.dt == "lcd":
+                    self._restore_toast_row()
+        if self.dt == "oled" and self.display.partial and self._refresh_s:
+            if now is None:
+                now = time.monotonic()
+            if now >= self._next_refresh and self.display.is_awake:
+                self._next_refresh = now + self._refresh_s
+                self.display.refresh()
+        if self.mirror:
+            self.mirror.poll(now)
+
+    def _restore_toast_row(self):
+        under, shown = self._toast_saved
+        self._toast_saved = None
+        row = self.lcd.rows - 1
+        # Left alone if something else has redrawn the row since
+        if self.lcd.line(row) == shown:
+            self.lcd.write_line(row, under)
+            self.lcd.show()
 
     def print_line(self, msg):
         if msg.startswith("1:"):
@@ -50,19 +384,42 @@ class Screen:
         self.update_display()
 
     def update_display(self):
+        metrics.inc(C_UPDATE)
         if self.dt == "oled":
-            self.line_labels[0].text = self.buffer[0]
-            self.line_labels[1].text = self.buffer[1]
+            self.line_labels[0].text = textlayout.fit(self.buffer[0], WIDTH, self.font)
+            self.line_labels[1].text = textlayout.fit(self.buffer[1], WIDTH, self.font)
+        elif self.dt == "lcd":
+            # print_line rows overlay whatever draw_text put there
+            for row, text in enumerate(self.buffer):
+                if text:
+                    self.lcd.write_line(row, textlayout.fit(text, self.cols, None))
+            self.lcd.show()
+            metrics.set_gauge(G_LCD_BYTES, self.lcd.bytes_sent)
 
-    def clear(self):
+    def clear(self, layer="menu"):
         self.buffer = ["", ""]
+        if self.dt == "lcd":
+            # Only the shadow diff goes out, on the next flush()
+            self.lcd.clear()
+            return
+        if self.dt == "oled":
+            # Drop what was drawn on the layer so the group never grows
+            group = self.layers[layer]
+            while len(group):
+                group.pop()
+            if layer == "menu":
+                # Blank menu area: prebuilt pages stay cached, just hidden
+                self.layers["pages"].hidden = True
         self.update_display()
 
     def invert(self):
+        self.inverted = not self.inverted
         if self.dt == "oled":
-            self.display.invert = not self.display.invert
+            self.display.set_invert(self.inverted)
     
-    def draw(self, xpos, ypos):
+    def draw(self, xpos, ypos, layer="menu"):
+        if self.dt != "oled":
+            return
 
         pixel_bitmap = displayio.Bitmap(1, 1, 2) #width and height here are the true size of the object
         pixel_palette = displayio.Palette(1)
@@ -71,7 +428,7 @@ class Screen:
         pixel_sprite = displayio.TileGrid(
             pixel_bitmap, pixel_shader=pixel_palette, x=xpos, y=ypos # x and y here are the origin starting from the top left
         )
-        self.splash.append(pixel_sprite)
+        self.layers[layer].append(pixel_sprite)
 
         # text = "Hello World!"
         # text_area = label.Label(
@@ -79,7 +436,9 @@ class Screen:
         # )
         # self.splash.append(text_area)
 
-    def draw_elipse(self, d, xpos=0, ypos=0, filled=False):
+    def draw_elipse(self, d, xpos=0, ypos=0, filled=False, layer="menu"):
+        if self.dt != "oled":
+            return
         cir_bitmap = displayio.Bitmap(d+1, d+1, 2)
         cir_palette = displayio.Palette(2)
         cir_palette[1] = 0xFFFFFF
@@ -118,9 +477,11 @@ class Screen:
         cir_sprite = displayio.TileGrid(
             cir_bitmap, pixel_shader=cir_palette, x=(int(xpos)-r), y=int((ypos)-r)
         )
-        self.splash.append(cir_sprite)
+        self.layers[layer].append(cir_sprite)
 
-    def draw_rect(self, width, height, xpos=0, ypos=0, filled=False):
+    def draw_rect(self, width, height, xpos=0, ypos=0, filled=False, layer="menu"):
+        if self.dt != "oled":
+            return
         rect_bitmap = displayio.Bitmap(width, height, 2)
         rect_palette = displayio.Palette(2)
         rect_palette[0] = 0x000000
@@ -130,7 +491,6 @@ class Screen:
                 if filled == False:
                     #print("true: ")
                     if x == 0 or x == width - 1 or y == 0 or y == height - 1:
-                        print("y = ", y)
                         rect_bitmap[x, y] = 1
                     else:
                         #print("x and y = ", x, y)
@@ -140,24 +500,34 @@ class Screen:
         rect_sprite = displayio.TileGrid(
             rect_bitmap, pixel_shader=rect_palette, x=int(xpos), y=int(ypos)
         )
-        self.splash.append(rect_sprite)
+        self.layers[layer].append(rect_sprite)
 
-    def draw_text(self, text, xpos=0, ypos=0):
+    def draw_text(self, text, xpos=0, ypos=0, layer="menu"):
+        if self.dt == "lcd":
+            # Map pixel coordinates onto the character grid (16 px per row)
+            fw, _ = terminalio.FONT.get_bounding_box()
+            self.lcd.write(int(ypos) // 16, int(xpos) // fw, text)
+            return
         text_area = label.Label(
             terminalio.FONT, text=text, color=0xFFFFFF, x=xpos, y=ypos
         )
-        self.splash.append(text_area)
+        self.layers[layer].append(text_area)
     
-    def draw_bitmap(self, bmpfile, xpos=0, ypos=0):
+    def draw_bitmap(self, bmpfile, xpos=0, ypos=0, layer="menu"):
+        if self.dt != "oled":
+            return
         self.display.brightness=0
         #splash = displayio.Group()
         #self.display.root_group = splash
 
-        odb = displayio.OnDiskBitmap(bmpfile)
+        odb = page_shadow.register(displayio.OnDiskBitmap(bmpfile), bmpfile)
         face = displayio.TileGrid(odb, pixel_shader=odb.pixel_shader, x=xpos, y=ypos)
-        self.splash.append(face)
+        self.layers[layer].append(face)
 
+        t0 = metrics.start()
         self.display.refresh(target_frames_per_second=60)
+        metrics.stop(H_REFRESH, t0)
+        metrics.inc(C_REFRESH)
 
         for i in range(100):
             self.display.brightness = 0.01 * i
@@ -0,0 +1,163 @@
+# sh1106_display.py (CircuitPython)
+# SH1106 driver wrapper with bus accounting and an optional partial mode.
+#
+# Every command or data write this wrapper issues goes through _send(),
+# which counts transactions (one bus.send) and bytes (command + data).
+# The core's own refresh pushes frame data from C where it can't be seen,
+# so in the default mode each refresh() the core carries out is counted as
+# a full frame: per page, page + column address commands and the 128 data
+# bytes (FRAME_TX transactions, FRAME_BYTES bytes). Auto-refreshes the
+# core does on its own are not counted.
+#
+# partial=True takes frame transfers over: core auto-refresh is off and
+# refresh() composes the frame from root_group (page_shadow.PageComposer;
+# the 1-bit core can't be read back with fill_row()), packs it into the
+# controller's 8 pages of 128 column bytes and diffs each page against a
+# shadow of the panel RAM. Only changed column runs are sent, each as
+# page + column address commands followed by the data bytes. Runs closer
+# than MERGE_GAP bytes are merged, since a new address costs three command
+# transactions. This trades CPU (composing) for bus traffic; Screen.poll()
+# drives it at a fixed rate.
+#
+# Contrast and invert are single commands and never resend frame data.
+
+from adafruit_displayio_sh1106 import SH1106
+import metrics
+from page_shadow import PAGE_ROWS, PageComposer
+
+MERGE_GAP = 4
+
+CMD_CONTRAST = 0x81
+CMD_NORMAL = 0xA6
+CMD_INVERT = 0xA7
+CMD_PAGE = 0xB0
+CMD_COL_LOW = 0x00
+CMD_COL_HIGH = 0x10
+
+C_REFRESH = metrics.counter("oled.refresh")
+C_TX = metrics.counter("oled.tx")
+C_BYTES = metrics.counter("oled.bytes")
+G_LAST_BYTES = metrics.gauge("oled.refresh_bytes")
+
+class SH1106Display(SH1106):
+    color_depth = 1     # what SH1106.__init__ passes to BusDisplay
+
+    def __init__(self, bus, col_offset=0, partial=False, **kwargs):
+        if partial:
+            kwargs["auto_refresh"] = False
+        super().__init__(bus, col_offset=col_offset, **kwargs)
+        self._bus = bus
+        self._col_offset = col_offset
+        self.partial = partial
+        self.inverted = False
+
+        # Totals since boot, and the last refresh alone
+        self.transactions = 0
+        self.bytes_sent = 0
+        self.refreshes = 0
+        self.last_transactions = 0
+        self.last_bytes = 0
+
+        self._pages = self.height // PAGE_ROWS
+        self.frame_tx = self._pages * 3
+        self.frame_bytes = self._pages * (3 + self.width)
+        if partial:
+            self._composer = PageComposer(self.width, self.height)
+            self._page = bytearray(self.width)
+            self._shadow = [bytearray(self.width) for _ in range(self._pages)]
+            # Panel RAM is undefined at power-up: first refresh sends it all
+            self._shadow_valid = False
+
+    ############################
+    #     Counted transfers    #
+    ############################
+    def _send(self, command, data=b""):
+        self._bus.send(command, data)
+        self._count(1, 1 + len(data))
+
+    def _count(self, transactions, nbytes):
+        self.transactions += transactions
+        self.bytes_sent += nbytes
+        metrics.inc(C_TX, transactions)
+        metrics.inc(C_BYTES, nbytes)
+
+    def set_contrast(self, level):
+        """0.0-1.0, one two-byte command."""
+        value = max(0, min(255, int(level * 255)))
+        self._send(CMD_CONTRAST)
+        self._send(value)
+
+    def set_invert(self, on):
+        self.inverted = bool(on)
+        self._send(CMD_INVERT if on else CMD_NORMAL)
+
+    def sleep(self):
+        if self._is_awake:
+            self._send(0xAE)
+            self._is_awake = False
+
+    def wake(self):
+        if not self._is_awake:
+            self._send(0xAF)
+            self._is_awake = True
+
+    ##########################
+    #     Refresh            #
+    ##########################
+    def refresh(self, **kwargs):
+        self.refreshes += 1
+        metrics.inc(C_REFRESH)
+        if not self.partial:
+            done = super().refresh(**kwargs)
+            if done:
+                self._count(self.frame_tx, self.frame_bytes)
+                self.last_transactions = self.frame_tx
+                self.last_bytes = self.frame_bytes
+                metrics.set_gauge(G_LAST_BYTES, self.last_bytes)
+            return done
+
+        tx0 = self.transactions
+        bytes0 = self.bytes_sent
+        self._composer.compose(self.root_group)
+        for page in range(self._pages):
+            self._composer.page(page, self._page)
+            if self._shadow_valid:
+                self._send_changes(page)
+            else:
+                self._write(page, 0, self._page)
+            self._shadow[page][:] = self._page
+        self._shadow_valid = True
+
+        self.last_transactions = self.transactions - tx0
+        self.last_bytes = self.bytes_sent - bytes0
+        metrics.set_gauge(G_LAST_BYTES, self.last_bytes)
+        return True
+
+    def invalidate(self):
+        """Resend the whole frame on the next refresh (panel RAM lost)."""
+        if self.partial:
+            self._shadow_valid = False
+
+    def _send_changes(self, page):
+        new = self._page
+        old = self._shadow[page]
+        width = self.width
+        x = 0
+        while x < width:
+            if new[x] == old[x]:
+                x += 1
+                continue
+            start = last = x
+            x += 1
+            while x < width and x - last <= MERGE_GAP:
+                if new[x] != old[x]:
+                    last = x
+                x += 1
+            self._write(page, start, new[start:last + 1])
+            x = last + 1
+
+    def _write(self, page, col, data):
+        col += self._col_offset
+        self._send(CMD_PAGE | page)
+        self._send(CMD_COL_HIGH | (col >> 4))
+        self._send(CMD_COL_LOW | (col & 0x0F), data)
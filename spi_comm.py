@@ -3,46 +3,178 @@ import board
 import busio
 import digitalio
 import time
+import metrics
 
 EOT = b"\x04"
+ENQ = b"\x05"
 
-class SPIComm:
-    def __init__(self, cs_pin=board.GP17, baudrate=500000, phase=0, polarity=0, cs_settle_s=0.002):
+# Receiver status byte (see SPI_Pro_Micro.ino)
+STATUS_VALID_MASK = 0xC0
+STATUS_VALID = 0x40
+STATUS_BUSY = 0x01
+STATUS_SLOT_FULL = 0x02
+RESULT_NONE = 0
+RESULT_OK = 1
+RESULT_FAIL = 2
+RESULT_SKIPPED = 3
+
+C_SENDS = metrics.counter("spi.sends")
+C_BYTES = metrics.counter("spi.bytes")
+H_SEND = metrics.histogram("spi.send_ms")
+
+def status_valid(st):
+    return (st & STATUS_VALID_MASK) == STATUS_VALID
+
+def status_result(st):
+    return (st >> 2) & 0x03
+
+def status_done_count(st):
+    return (st >> 4) & 0x03
+
+##############################
+#     Shared bus, devices    #
+##############################
+class SPIBus:
+    """
+    One SPI peripheral shared by several named receivers, each with its own
+    chip select and bus settings. A transaction locks the bus, reconfigures
+    it only if the settings differ from the last device's, and only then
+    asserts that device's CS, so a polarity change never happens mid-select.
+    Pass `spi` to run on another bus object (a fake one on the host).
+    """
+
+    def __init__(self, clock=board.GP18, MOSI=board.GP19, MISO=board.GP16, spi=None):
+        self.spi = spi if spi is not None else busio.SPI(clock=clock, MOSI=MOSI, MISO=MISO)
+        self.devices = {}       # name -> SPIDevice, in add order
+        self.reconfigures = 0
+        self._settings = None   # (baudrate, phase, polarity) last configured
+
+    def add(self, name, cs_pin, baudrate=500000, phase=0, polarity=0, cs_settle_s=0.002):
+        dev = SPIDevice(self, name, cs_pin, baudrate, phase, polarity, cs_settle_s)
+        self.devices[name] = dev
+        return dev
+
+    def device(self, name=None):
+        """Named device, or the first one added when name is None."""
+        if name is None:
+            for dev in self.devices.values():
+                return dev
+            return None
+        return self.devices.get(name)
+
+    def _begin(self, dev):
+        while not self.spi.try_lock():
+            pass
+        settings = (dev.baudrate, dev.phase, dev.polarity)
+        if settings != self._settings:
+            try:
+                self.spi.configure(baudrate=dev.baudrate, phase=dev.phase, polarity=dev.polarity)
+            except Exception:
+                self.spi.unlock()
+                raise
+            self._settings = settings
+            self.reconfigures += 1
+        dev.cs.value = False
+        time.sleep(dev.cs_settle_s)
+
+    def _end(self, dev):
+        time.sleep(dev.cs_settle_s)
+        dev.cs.value = True
+        self.spi.unlock()
+
+    def broadcast(self, payload, append_eot=True, names=None):
+        """
+        Send payload to every device (or those in names), one after the
+        other. Returns {name: True/False}; a failing device doesn't stop
+        the rest, its error is kept in device.last_error.
+        """
+        results = {}
+        for name, dev in self.devices.items():
+            if names is not None and name not in names:
+                continue
+            results[name] = dev.try_send_bytes(payload, append_eot=append_eot)
+        return results
+
+    def poll_status(self):
+        """Read every device's status byte; {name: raw byte}."""
+        return {name: dev.read_status() for name, dev in self.devices.items()}
+
+    def summary(self):
+        return " ".join(f"{name}:{dev.state}" for name, dev in self.devices.items())
+
+class SPIDevice:
+    def __init__(self, bus, name, cs_pin, baudrate=500000, phase=0, polarity=0, cs_settle_s=0.002):
+        self.bus = bus
+        self.name = name
         self.cs = digitalio.DigitalInOut(cs_pin)
         self.cs.direction = digitalio.Direction.OUTPUT
         self.cs.value = True
 
-        self.spi = busio.SPI(clock=board.GP18, MOSI=board.GP19, MISO=board.GP16)
         self.baudrate = baudrate
         self.phase = phase
         self.polarity = polarity
         self.cs_settle_s = cs_settle_s
+        self._status_buf = bytearray(2)
 
-    def send_bytes(self, payload: bytes, append_eot: bool = True) -> None:
-        if append_eot and not payload.endswith(EOT):
-            payload += EOT
+        # Per-device status for broadcasts and the UI
+        self.state = "idle"     # idle / sent / error
+        self.sends = 0
+        self.errors = 0
+        self.last_error = None
+        self.last_status = None
 
-        # Select
-        self.cs.value = False
-        time.sleep(self.cs_settle_s)
+    @property
+    def spi(self):
+        return self.bus.spi
 
-        while not self.spi.try_lock():
-            pass
+    def send_bytes(self, payload, append_eot: bool = True) -> None:
+        # payload may be bytes, bytearray or a memoryview slice; EOT goes out
+        # as a second write in the same CS window instead of a concatenated copy
+        send_eot = append_eot and not (len(payload) and payload[-1] == EOT[0])
+        t0 = metrics.start()
+
+        self.bus._begin(self)
         try:
-            self.spi.configure(
-                baudrate=self.baudrate,
-                phase=self.phase,
-                polarity=self.polarity
-            )
-            self.spi.write(payload)
+            self.bus.spi.write(payload)
+            if send_eot:
+                self.bus.spi.write(EOT)
         finally:
-            self.spi.unlock()
-            time.sleep(self.cs_settle_s)
-            self.cs.value = True
+            self.bus._end(self)
+
+        self.sends += 1
+        self.state = "sent"
+        metrics.stop(H_SEND, t0)
+        metrics.inc(C_SENDS)
+        metrics.inc(C_BYTES, len(payload) + (1 if send_eot else 0))
 
         # Small gap between transactions helps the slave
         time.sleep(0.002)
 
+    def try_send_bytes(self, payload, append_eot: bool = True) -> bool:
+        try:
+            self.send_bytes(payload, append_eot=append_eot)
+            return True
+        except Exception as e:
+            self.errors += 1
+            self.state = "error"
+            self.last_error = str(e)
+            return False
+
+    def read_status(self) -> int:
+        """
+        Poll the receiver's status byte. Two ENQ bytes are clocked out; the
+        second reply is the status preloaded after the first one was seen.
+        Returns the raw byte (check with status_valid()).
+        """
+        self.bus._begin(self)
+        try:
+            self.bus.spi.write_readinto(ENQ + ENQ, self._status_buf)
+        finally:
+            self.bus._end(self)
+
+        self.last_status = self._status_buf[1]
+        return self.last_status
+
     def send(self, data, append_eot: bool = True) -> None:
         if isinstance(data, str):
             payload = data.encode("utf-8")
@@ -52,3 +184,10 @@ class SPIComm:
             raise TypeError("SPIComm.send(): data must be str/bytes/bytearray")
 
         self.send_bytes(payload, append_eot=append_eot)
+
+class SPIComm(SPIDevice):
+    """Single receiver on a bus of its own (the original one-board setup)."""
+
+    def __init__(self, cs_pin=board.GP17, baudrate=500000, phase=0, polarity=0, cs_settle_s=0.002):
+        super().__init__(SPIBus(), "main", cs_pin, baudrate, phase, polarity, cs_settle_s)
+        self.bus.devices["main"] = self
@@ -1,13 +1,176 @@
 # sprite_api.py
 import time
 import json
+import struct
 import displayio
+import metrics
+import page_shadow
+from metrics import ticks_ms, ticks_diff
+
+try:
+    from bitmaptools import arrayblit
+except ImportError:
+    arrayblit = None
+
+C_FRAMES = metrics.counter("sprite.frames")
+C_DROPPED = metrics.counter("sprite.dropped")
+C_REFRESH = metrics.counter("sprite.refresh")
+H_REFRESH = metrics.histogram("sprite.refresh_ms")
+C_TILE_HIT = metrics.counter("sprite.tile_hit")
+C_TILE_MISS = metrics.counter("sprite.tile_miss")
+G_TILE_BYTES = metrics.gauge("sprite.tile_bytes")
+
+# Animation time is integer ms from ticks_ms(); clip rates are kept in
+# milli-fps so "elapsed ms * rate" counts frames in FRAME_UNIT steps with
+# no float work and no drift.
+FRAME_UNIT = 1000000
 
 def _safe_refresh(display, fps=30):
+    t0 = metrics.start()
     try:
         display.refresh(minimum_frames_per_second=0, target_frames_per_second=fps)
     except TypeError:
         display.refresh()
+    metrics.stop(H_REFRESH, t0)
+    metrics.inc(C_REFRESH)
+
+#########################################
+#     Indexed BMP sheet tile decoding    #
+#########################################
+class SheetReader:
+    """
+    Reads single frames out of an uncompressed 1/4/8-bit BMP sheet into
+    frame-sized Bitmaps. True-colour sheets are not decoded (open() returns
+    None) and stay on OnDiskBitmap; build_bundle.py converts sheets with
+    few colours to indexed BMPs.
+    """
+
+    def __init__(self, path, offset, width, height, bpp, colors):
+        self.path = path
+        self.offset = offset
+        self.width = width
+        self.bottom_up = height > 0
+        self.height = abs(height)
+        self.bpp = bpp
+        self.colors = colors
+        self.stride = ((width * bpp + 31) // 32) * 4
+
+    @classmethod
+    def open(cls, path):
+        try:
+            with open(path, "rb") as f:
+                head = f.read(54)
+        except OSError:
+            return None
+        if len(head) < 54 or head[:2] != b"BM":
+            return None
+        offset = struct.unpack_from("<I", head, 10)[0]
+        width, height, _, bpp, comp = struct.unpack_from("<iiHHI", head, 18)
+        colors = struct.unpack_from("<I", head, 46)[0]
+        if bpp not in (1, 4, 8) or comp != 0:
+            return None
+        return cls(path, offset, width, height, bpp, colors or (1 << bpp))
+
+    def decode(self, index, frame_w, frame_h, cols):
+        tx = (index % cols) * frame_w
+        ty = (index // cols) * frame_h
+        bpp = self.bpp
+        mask = (1 << bpp) - 1
+        bit0 = tx * bpp
+        buf = bytearray(((bit0 & 7) + frame_w * bpp + 7) // 8)
+        line = bytearray(frame_w)
+        bmp = displayio.Bitmap(frame_w, frame_h, self.colors)
+
+        with open(self.path, "rb") as f:
+            for y in range(frame_h):
+                row = ty + y
+                if self.bottom_up:
+                    row = self.height - 1 - row
+                f.seek(self.offset + row * self.stride + (bit0 >> 3))
+                f.readinto(buf)
+                if bpp == 8:
+                    line[:] = buf
+                else:
+                    b = bit0 & 7
+                    for x in range(frame_w):
+                        line[x] = (buf[b >> 3] >> (8 - bpp - (b & 7))) & mask
+                        b += bpp
+                if arrayblit:
+                    arrayblit(bmp, line, 0, y, frame_w, y + 1)
+                else:
+                    for x in range(frame_w):
+                        bmp[x, y] = line[x]
+        return bmp
+
+def bitmap_bytes(width, height, colors):
+    """RAM a displayio.Bitmap of this size takes (rows are 32-bit aligned)."""
+    bits = 1
+    while (1 << bits) < colors:
+        bits *= 2
+    return ((width * bits + 31) // 32) * 4 * height
+
+#####################################
+#     Shared LRU frame tile cache   #
+#####################################
+class TileCache:
+    """
+    Decoded frames shared by every Sprite, bounded by a byte budget with
+    least-recently-used eviction. code.py sets the budget from
+    config["sprite_cache_kb"]; 0 turns caching off.
+    """
+
+    def __init__(self, budget=32 * 1024):
+        self.budget = budget
+        self.used = 0
+        self._tiles = {}    # key -> (bitmap, nbytes)
+        self._order = []    # keys, least recently used first
+
+    def get(self, key):
+        entry = self._tiles.get(key)
+        if entry is None:
+            return None
+        if self._order[-1] != key:
+            self._order.remove(key)
+            self._order.append(key)
+        return entry[0]
+
+    def has(self, key):
+        return key in self._tiles
+
+    def put(self, key, bmp, nbytes, evict=True):
+        """Keep bmp if it fits (evicting if allowed); returns True if kept."""
+        if key in self._tiles or nbytes > self.budget:
+            return key in self._tiles
+        if not evict and self.used + nbytes > self.budget:
+            return False
+        while self.used + nbytes > self.budget and self._order:
+            old = self._order.pop(0)
+            self.used -= self._tiles.pop(old)[1]
+        self._tiles[key] = (bmp, nbytes)
+        self._order.append(key)
+        self.used += nbytes
+        metrics.set_gauge(G_TILE_BYTES, self.used)
+        return True
+
+    def forget(self, sheet_path):
+        for key in [k for k in self._order if k[0] == sheet_path]:
+            self._order.remove(key)
+            self.used -= self._tiles.pop(key)[1]
+        metrics.set_gauge(G_TILE_BYTES, self.used)
+
+    def clear(self):
+        self._tiles.clear()
+        self._order.clear()
+        self.used = 0
+        metrics.set_gauge(G_TILE_BYTES, 0)
+
+tiles = TileCache()
+
+def _muldiv(delta, t, duration):
+    # Symmetric rounding so left and right moves track the same path
+    if delta < 0:
+        return -((-delta * t) // duration)
+    return (delta * t) // duration
 
 class Sprite:
     """
@@ -16,6 +179,10 @@ class Sprite:
     - One sprite sheet (OnDiskBitmap)
     - One TileGrid (width=1,height=1)
     - Clips defined as start/count/fps/loop
+    - Frame index follows wall-clock time: frames are skipped, not
+      slowed down, when a refresh or GC pause runs long
+    - Clips whose frames fit the shared TileCache play from RAM (indexed
+      BMP sheets only); the rest read the sheet from disk
     - Blocking convenience methods:
         tgmove(clip, dx, dy)
         tgwait(clip, seconds)
@@ -33,6 +200,8 @@ class Sprite:
         group=None,
         insert_at=None,
         manual_refresh=True,
+        layer="sprites",
+        cache=True,
     ):
         self.screen = screen
         self.display = screen.display
@@ -46,23 +215,18 @@ class Sprite:
         self.clips = {}
         self.clip = None
         self.frame = 0
-        self._last_frame_t = time.monotonic()
+        self._last_t = ticks_ms()
+        self._phase = 0   # FRAME_UNIT fractions of a frame since the last one
 
-        self.odb = displayio.OnDiskBitmap(sheet_path)
-        self.tg = displayio.TileGrid(
-            self.odb,
-            pixel_shader=self.odb.pixel_shader,
-            width=1,
-            height=1,
-            tile_width=self.frame_w,
-            tile_height=self.frame_h,
-            x=int(x),
-            y=int(y),
-        )
+        self.cache = cache
+        self._open_sheet(sheet_path, int(x), int(y))
+        self.tg = self._disk_tg
 
         if group is None:
-            # default: attach to your existing splash group
-            group = screen.splash
+            # default: the screen's named layer (sprites sit above the menu)
+            group = screen.layer(layer)
+        self.group = group
+        self.config_path = None
 
         if insert_at is None:
             group.append(self.tg)
@@ -72,6 +236,79 @@ class Sprite:
         self.x = int(x)
         self.y = int(y)
 
+    def _open_sheet(self, sheet_path, x, y):
+        self.odb = page_shadow.register(displayio.OnDiskBitmap(sheet_path), sheet_path)
+        self._disk_tg = displayio.TileGrid(
+            self.odb,
+            pixel_shader=self.odb.pixel_shader,
+            width=1,
+            height=1,
+            tile_width=self.frame_w,
+            tile_height=self.frame_h,
+            x=x,
+            y=y,
+        )
+        # RAM frames share the sheet's palette; built on the first cached frame
+        self._ram_tg = None
+        self.sheet = SheetReader.open(sheet_path) if self.cache else None
+        self._warm_pending = []
+
+    def _show(self, tg):
+        """Swap the displayed TileGrid in its group slot, keeping position and facing."""
+        if tg is self.tg:
+            return
+        tg.x = self.tg.x
+        tg.y = self.tg.y
+        tg.flip_x = self.tg.flip_x
+        try:
+            i = self.group.index(self.tg)
+            self.group[i] = tg
+        except ValueError:
+            self.group.append(tg)
+        self.tg = tg
+
+    # ---------- frame tiles ----------
+    def _tile_key(self, index):
+        return (self.sheet_path, self.frame_w, self.frame_h, index)
+
+    def _tile_bytes(self):
+        return bitmap_bytes(self.frame_w, self.frame_h, self.sheet.colors)
+
+    def _clip_fits(self, c):
+        return self.sheet is not None and c["count"] * self._tile_bytes() <= tiles.budget
+
+    def _tile(self, index, evict=True):
+        key = self._tile_key(index)
+        bmp = tiles.get(key)
+        if bmp is not None:
+            metrics.inc(C_TILE_HIT)
+            return bmp
+        metrics.inc(C_TILE_MISS)
+        bmp = self.sheet.decode(index, self.frame_w, self.frame_h, self.cols)
+        tiles.put(key, bmp, self._tile_bytes(), evict=evict)
+        return bmp
+
+    def warm(self, clip, block=False):
+        """
+        Decode a clip's frames ahead of time. By default one frame is done
+        per tgmove/tgwait pass (and only into free budget, so the playing
+        clip is never evicted); block=True decodes them all now.
+        """
+        c = self.clips.get(clip)
+        if c is None or not self._clip_fits(c):
+            return
+        for index in range(c["start"], c["start"] + c["count"]):
+            if tiles.has(self._tile_key(index)):
+                continue
+            if block:
+                self._tile(index)
+            elif index not in self._warm_pending:
+                self._warm_pending.append(index)
+
+    def _warm_step(self):
+        if self._warm_pending:
+            self._tile(self._warm_pending.pop(0), evict=False)
+
     # ---------- clip setup ----------
     def add_clip(self, name, *, start=None, row=None, count=1, fps=8, loop=True):
         if start is None:
@@ -82,6 +319,7 @@ class Sprite:
             "start": int(start),
             "count": int(count),
             "fps": float(fps),
+            "rate": int(float(fps) * 1000),
             "loop": bool(loop),
         }
         if self.clip is None:
@@ -92,26 +330,52 @@ class Sprite:
             raise KeyError(f"Unknown clip '{name}'. Defined: {list(self.clips.keys())}")
         self.clip = name
         self.frame = 0
-        self._last_frame_t = time.monotonic()
+        self._last_t = ticks_ms()
+        self._phase = 0
         self._apply_frame()
 
     def _apply_frame(self):
         c = self.clips[self.clip]
-        self.tg[0] = c["start"] + self.frame
+        index = c["start"] + self.frame
+        if self._clip_fits(c):
+            bmp = self._tile(index)
+            try:
+                if self._ram_tg is None:
+                    self._ram_tg = displayio.TileGrid(bmp, pixel_shader=self.odb.pixel_shader)
+                else:
+                    self._ram_tg.bitmap = bmp
+                self._show(self._ram_tg)
+                return
+            except (AttributeError, ValueError):
+                # Firmware without a settable TileGrid.bitmap: disk only
+                self.sheet = None
+        self._show(self._disk_tg)
+        self._disk_tg[0] = index
 
     def _step_anim(self, now):
+        """Advance to the frame wall-clock time says we should be on (now in ticks ms)."""
         if self.clip is None:
             return
         c = self.clips[self.clip]
-        if c["fps"] <= 0:
+        dt = ticks_diff(now, self._last_t)
+        self._last_t = now
+        if c["rate"] <= 0 or dt <= 0:
+            return
+        self._phase += dt * c["rate"]
+        if self._phase < FRAME_UNIT:
             return
-        frame_dt = 1.0 / c["fps"]
-        if now - self._last_frame_t >= frame_dt:
-            self._last_frame_t += frame_dt
-            self.frame += 1
-            if self.frame >= c["count"]:
-                self.frame = 0 if c["loop"] else (c["count"] - 1)
-            self._apply_frame()
+        steps = self._phase // FRAME_UNIT
+        self._phase -= steps * FRAME_UNIT
+
+        count = c["count"]
+        if c["loop"]:
+            self.frame = (self.frame + steps) % count
+        else:
+            self.frame = min(self.frame + steps, count - 1)
+        self._apply_frame()
+        metrics.inc(C_FRAMES)
+        if steps > 1:
+            metrics.inc(C_DROPPED, steps - 1)
 
     # ---------- movement / facing ----------
     def set_pos(self, x, y, auto_face_dx=None):
@@ -128,47 +392,58 @@ class Sprite:
         self.tg.y = y
 
     # ---------- “simple API” blocking helpers ----------
-    def tgwait(self, clip, seconds, fps=30):
-        """Play a clip for N seconds (blocking)."""
+    def tgwait(self, clip, seconds, fps=30, then=None):
+        """Play a clip for N seconds (blocking). then: clip to warm meanwhile."""
         self.set_clip(clip)
-        end_t = time.monotonic() + float(seconds)
+        if then:
+            self.warm(then)
+        t0 = ticks_ms()
+        duration = int(float(seconds) * 1000)
 
         old_auto = getattr(self.display, "auto_refresh", None)
         if self.manual_refresh:
             self.display.auto_refresh = False
 
         try:
-            while time.monotonic() < end_t:
-                now = time.monotonic()
+            while True:
+                now = ticks_ms()
+                if ticks_diff(now, t0) >= duration:
+                    break
                 self._step_anim(now)
                 if self.manual_refresh:
                     _safe_refresh(self.display, fps=fps)
+                self._warm_step()
                 time.sleep(0.01)
         finally:
             if self.manual_refresh and old_auto is not None:
                 self.display.auto_refresh = old_auto
 
-    def tgmove(self, clip, dx, dy, speed=60, fps=30, auto_face=True):
+    def tgmove(self, clip, dx, dy, speed=60, fps=30, auto_face=True, then=None):
         """
         Move by dx/dy while animating clip (blocking).
         speed is pixels/second (applies to total distance).
+        then: clip to warm into the tile cache while this one plays.
+        Position is start + delta * elapsed_ms // duration_ms: integer math
+        per frame, and always where the clock says, however long a pass took.
         """
         self.set_clip(clip)
+        if then:
+            self.warm(then)
 
-        dx = float(dx)
-        dy = float(dy)
-        dist = (dx * dx + dy * dy) ** 0.5
-        if dist == 0:
+        dx = int(round(dx))
+        dy = int(round(dy))
+        if dx == 0 and dy == 0:
             return
 
-        duration = dist / float(speed) if speed > 0 else 0.0
+        # One sqrt per move, not per frame
+        duration = int((dx * dx + dy * dy) ** 0.5 * 1000 / speed) if speed > 0 else 0
         if duration <= 0:
             self.set_pos(self.x + dx, self.y + dy, auto_face_dx=dx if auto_face else None)
             return
 
-        start_x, start_y = float(self.x), float(self.y)
+        start_x, start_y = self.x, self.y
         end_x, end_y = start_x + dx, start_y + dy
-        start_t = time.monotonic()
+        start_t = ticks_ms()
 
         if auto_face:
             # Mirror based on horizontal intent
@@ -183,21 +458,22 @@ class Sprite:
 
         try:
             while True:
-                now = time.monotonic()
-                t = (now - start_t) / duration
-                if t >= 1.0:
+                now = ticks_ms()
+                t = ticks_diff(now, start_t)
+                if t >= duration:
                     self.set_pos(end_x, end_y)
                     break
 
-                # linear interpolation
-                cur_x = start_x + (end_x - start_x) * t
-                cur_y = start_y + (end_y - start_y) * t
+                # linear interpolation, rounded toward the start point
+                cur_x = start_x + _muldiv(dx, t, duration)
+                cur_y = start_y + _muldiv(dy, t, duration)
                 self.set_pos(cur_x, cur_y)
 
                 self._step_anim(now)
 
                 if self.manual_refresh:
                     _safe_refresh(self.display, fps=fps)
+                self._warm_step()
                 time.sleep(0.01)
         finally:
             if self.manual_refresh and old_auto is not None:
@@ -205,7 +481,7 @@ class Sprite:
 
     # ---------- config loader for “people uploading sprites” ----------
     @classmethod
-    def from_config(cls, screen, config_path, x=0, y=0, group=None, insert_at=None):
+    def from_config(cls, screen, config_path, x=0, y=0, group=None, insert_at=None, layer="sprites"):
         """
         Config schema:
         {
@@ -233,9 +509,15 @@ class Sprite:
             y=y,
             group=group,
             insert_at=insert_at,
+            layer=layer,
         )
+        spr.config_path = config_path
+        spr._load_clips(cfg)
+        return spr
+
+    def _load_clips(self, cfg):
         for name, c in cfg.get("clips", {}).items():
-            spr.add_clip(
+            self.add_clip(
                 name,
                 start=c.get("start"),
                 row=c.get("row"),
@@ -243,4 +525,33 @@ class Sprite:
                 fps=c.get("fps", 8),
                 loop=c.get("loop", True),
             )
-        return spr
+
+    def reload_config(self, config_path=None):
+        """
+        Re-read the sprite config in place (hot-reload). Clips are replaced
+        and the TileGrid is rebuilt in its group slot.
+        """
+        config_path = config_path or self.config_path
+        with open(config_path, "r") as f:
+            cfg = json.load(f)
+        self.config_path = config_path
+
+        sheet = cfg["sheet"]
+        frame_w = int(cfg["frame_w"])
+        frame_h = int(cfg["frame_h"])
+        # The sheet file may have been replaced under the same name, so its
+        # cached tiles and header are always dropped
+        tiles.forget(self.sheet_path)
+        self.sheet_path = sheet
+        self.frame_w = frame_w
+        self.frame_h = frame_h
+        self.cols = int(cfg["cols"])
+        self._open_sheet(sheet, self.x, self.y)
+        self._show(self._disk_tg)
+
+        prev = self.clip
+        self.clips = {}
+        self.clip = None
+        self._load_clips(cfg)
+        if prev in self.clips:
+            self.set_clip(prev)
@@ -0,0 +1,211 @@
+# state_store.py (CircuitPython)
+# Persists UI state (menu stack, cursor, debug, invert) across resets.
+#
+# Backed by microcontroller.nvm on the board, or a small file when nvm is
+# missing (desktop simulator). The record is a compact versioned binary blob,
+# so restoring it at boot is a few struct unpacks instead of a JSON parse.
+# Changes are coalesced: a burst of cursor moves produces one write once the
+# UI has been quiet for save_delay seconds, and identical records are never
+# rewritten.
+#
+# Record layout (little endian):
+#   "PP" | version u8 | flags u8 | body_len u16 | body | sum16 u16
+# body:
+#   index u16 | depth u8 | title
+#   then per stack entry: index u16 | title
+# where title is len u8 + utf-8 bytes.
+
+import struct
+import time
+import log
+
+MAGIC = b"PP"
+VERSION = 1
+HEADER = "<2sBBH"
+HEADER_SZ = struct.calcsize(HEADER)
+
+FLAG_DEBUG = 0x01
+FLAG_INVERT = 0x02
+
+MAX_DEPTH = 8
+MAX_TITLE = 32
+MAX_RECORD = 512
+STATE_FILE = "/state.bin"
+
+def sum16(b) -> int:
+    return sum(b) & 0xFFFF
+
+########################
+#     Backends         #
+########################
+class NvmBackend:
+    def __init__(self, nvm):
+        self.nvm = nvm
+
+    def read(self, n):
+        n = min(n, len(self.nvm))
+        return bytes(self.nvm[0:n])
+
+    def write(self, data):
+        self.nvm[0:len(data)] = data
+
+class FileBackend:
+    def __init__(self, path=STATE_FILE):
+        self.path = path
+
+    def read(self, n):
+        try:
+            with open(self.path, "rb") as f:
+                return f.read(n)
+        except OSError:
+            return b""
+
+    def write(self, data):
+        with open(self.path, "wb") as f:
+            f.write(data)
+
+def default_backend():
+    try:
+        import microcontroller
+        if microcontroller.nvm is not None:
+            return NvmBackend(microcontroller.nvm)
+    except (ImportError, AttributeError):
+        pass
+    return FileBackend()
+
+############################
+#     Encode / decode      #
+############################
+def _pack_title(title):
+    raw = title.encode("utf-8")[:MAX_TITLE]
+    return bytes((len(raw),)) + raw
+
+def encode_state(current_title, index, stack, debug=False, inverted=False):
+    flags = (FLAG_DEBUG if debug else 0) | (FLAG_INVERT if inverted else 0)
+    stack = stack[-MAX_DEPTH:]
+
+    body = bytearray(struct.pack("<HB", index & 0xFFFF, len(stack)))
+    body += _pack_title(current_title)
+    for title, idx in stack:
+        body += struct.pack("<H", idx & 0xFFFF)
+        body += _pack_title(title)
+
+    head = struct.pack(HEADER, MAGIC, VERSION, flags, len(body))
+    return head + body + struct.pack("<H", sum16(body))
+
+def decode_state(data):
+    """Return the state dict, or None if the record is missing or corrupt."""
+    if len(data) < HEADER_SZ:
+        return None
+    magic, version, flags, body_len = struct.unpack_from(HEADER, data, 0)
+    if magic != MAGIC or version != VERSION or body_len > MAX_RECORD:
+        return None
+    end = HEADER_SZ + body_len
+    if len(data) < end + 2:
+        return None
+    body = data[HEADER_SZ:end]
+    if struct.unpack_from("<H", data, end)[0] != sum16(body):
+        return None
+
+    index, depth = struct.unpack_from("<HB", body, 0)
+    pos = 3
+    n = body[pos]
+    title = body[pos + 1:pos + 1 + n].decode("utf-8")
+    pos += 1 + n
+
+    stack = []
+    for _ in range(depth):
+        idx = struct.unpack_from("<H", body, pos)[0]
+        n = body[pos + 2]
+        stack.append((body[pos + 3:pos + 3 + n].decode("utf-8"), idx))
+        pos += 3 + n
+
+    return {
+        "current_title": title,
+        "index": index,
+        "stack": stack,
+        "debug": bool(flags & FLAG_DEBUG),
+        "inverted": bool(flags & FLAG_INVERT),
+    }
+
+class StateStore:
+    def __init__(self, backend=None, save_delay=2.0):
+        self.backend = backend if backend is not None else default_backend()
+        self.save_delay = save_delay
+        self.writes = 0
+
+        self._last = None         # last record read or written
+        self._pending = None      # record waiting for the quiet period
+        self._changed_t = 0.0
+
+    ############################
+    #     Boot-time restore    #
+    ############################
+    def load(self):
+        try:
+            data = self.backend.read(HEADER_SZ + MAX_RECORD + 2)
+            state = decode_state(data)
+        except Exception as e:
+            log.warn("STATE", "load failed: %s", e)
+            return None
+        if state is not None:
+            self._last = encode_state(
+                state["current_title"], state["index"], state["stack"],
+                state["debug"], state["inverted"],
+            )
+        return state
+
+    def restore(self, menu, screen):
+        state = self.load()
+        if state is None:
+            return False
+
+        if state["inverted"] != screen.inverted:
+            screen.invert()
+        menu.debug_enabled = state["debug"]
+
+        if state["current_title"] in menu.menus:
+            menu.stack = [(t, i) for (t, i) in state["stack"] if t in menu.menus]
+            menu.current_title = state["current_title"]
+            menu.index = state["index"]
+        menu.render()
+        return True
+
+    #############################
+    #     Coalesced writes      #
+    #############################
+    def note(self, menu, screen, now=None):
+        """Record the current UI state; written after save_delay of quiet."""
+        record = encode_state(
+            menu.current_title, menu.index, menu.stack,
+            menu.debug_enabled, screen.inverted,
+        )
+        if record == self._last:
+            self._pending = None
+            return
+        self._pending = record
+        self._changed_t = time.monotonic() if now is None else now
+
+    def poll(self, now=None):
+        if self._pending is None:
+            return False
+        if now is None:
+            now = time.monotonic()
+        if now - self._changed_t < self.save_delay:
+            return False
+        return self.flush()
+
+    def flush(self):
+        if self._pending is None:
+            return False
+        record = self._pending
+        self._pending = None
+        try:
+            self.backend.write(record)
+        except Exception as e:
+            # Read-only filesystem (USB mounted) or nvm error: keep going
+            log.warn("STATE", "save failed: %s", e)
+            return False
+        self._last = record
+        self.writes += 1
+        return True
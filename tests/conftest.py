@@ -0,0 +1,200 @@
+# Host-side test setup: the repo root and lib/ on sys.path, plus small
+# stand-ins for the CircuitPython hardware modules the code under test
+# imports. They only record what was asked of them; each test module
+# builds the fakes it needs on top (fake SPI bus, fake display, ...).
+
+import os
+import struct
+import sys
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The board's entry point code.py shadows the stdlib module of that name,
+# which pdb (and so pytest) imports: load the stdlib one first.
+_saved = sys.path[:]
+sys.path[:] = [p for p in sys.path if p not in ("", ".", ROOT) and os.path.abspath(p) != ROOT]
+import code  # noqa: E402,F401
+sys.path[:] = _saved
+
+# Board order: / is searched before /lib
+for path in (os.path.join(ROOT, "lib"), ROOT):
+    while path in sys.path:
+        sys.path.remove(path)
+    sys.path.insert(0, path)
+
+def _module(name, **attrs):
+    if name in sys.modules:
+        return sys.modules[name]
+    try:
+        __import__(name)
+        return sys.modules[name]
+    except ImportError:
+        pass
+    mod = types.ModuleType(name)
+    mod.__dict__.update(attrs)
+    sys.modules[name] = mod
+    return mod
+
+class FakeDigitalInOut:
+    def __init__(self, pin):
+        self.pin = pin
+        self.direction = None
+        self.value = True
+
+class _Direction:
+    INPUT = "input"
+    OUTPUT = "output"
+
+class FakeBusioSPI:
+    def __init__(self, clock=None, MOSI=None, MISO=None):
+        self.clock = clock
+
+class FakeI2C:
+    """busio.I2C: records each writeto() while locked."""
+
+    def __init__(self, scl=None, sda=None):
+        self.locked = False
+        self.writes = []
+
+    def try_lock(self):
+        if self.locked:
+            return False
+        self.locked = True
+        return True
+
+    def unlock(self):
+        self.locked = False
+
+    def writeto(self, address, buffer):
+        assert self.locked, "writeto outside a lock"
+        self.writes.append((address, bytes(buffer)))
+
+class FakeFont:
+    def get_bounding_box(self):
+        return (6, 14)
+
+class FakeLabel(list):
+    def __init__(self, font, text="", color=0xFFFFFF, x=0, y=0, **kwargs):
+        super().__init__()
+        self.font = font
+        self.text = text
+        self.x = x
+        self.y = y
+        self.hidden = False
+
+class FakeBusDisplay:
+    """
+    busdisplay.BusDisplay as far as the drivers use it. fill_row() raises
+    ValueError unless color_depth is 16, like the core does.
+    """
+
+    def __init__(self, bus, init_sequence, width=128, height=64, color_depth=16,
+                 auto_refresh=True, **kwargs):
+        self.bus = bus
+        self.width = width
+        self.height = height
+        self.auto_refresh = auto_refresh
+        self.root_group = None
+        self.refresh_calls = 0
+        self._depth = color_depth
+
+    def refresh(self, **kwargs):
+        self.refresh_calls += 1
+        return True
+
+    def fill_row(self, y, buffer):
+        if self._depth != 16:
+            raise ValueError("Display must have a 16 bit colorspace.")
+        return buffer
+
+class FakeFourWire:
+    """Records every (command, data) transaction."""
+
+    def __init__(self, *args, **kwargs):
+        self.sent = []
+
+    def send(self, command, data=b""):
+        self.sent.append((command, bytes(data)))
+
+class FakeBitmap:
+    def __init__(self, width, height, colors):
+        self.width = width
+        self.height = height
+        self._px = {}
+
+    def __setitem__(self, xy, v):
+        self._px[xy] = v
+
+    def __getitem__(self, xy):
+        return self._px.get(xy, 0)
+
+class FakePalette:
+    def __init__(self, colors):
+        self._colors = [0] * colors
+        self._transparent = set()
+
+    def __setitem__(self, i, color):
+        self._colors[i] = color
+
+    def __getitem__(self, i):
+        return self._colors[i]
+
+    def make_transparent(self, i):
+        self._transparent.add(i)
+
+    def is_transparent(self, i):
+        return i in self._transparent
+
+class FakeOnDiskBitmap:
+    def __init__(self, path):
+        self.path = path
+        self.pixel_shader = None
+        self.width = self.height = 0
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                head = f.read(26)
+            self.width, height = struct.unpack_from("<ii", head, 18)
+            self.height = abs(height)
+
+class FakeTileGrid:
+    def __init__(self, bitmap, pixel_shader=None, width=1, height=1,
+                 tile_width=None, tile_height=None, x=0, y=0):
+        self.bitmap = bitmap
+        self.pixel_shader = pixel_shader
+        self.width = width
+        self.height = height
+        self.tile_width = tile_width or bitmap.width
+        self.tile_height = tile_height or bitmap.height
+        self.x = x
+        self.y = y
+        self.flip_x = False
+        self.hidden = False
+        self._tiles = [0] * (width * height)
+
+    def __setitem__(self, i, v):
+        self._tiles[i] = v
+
+    def __getitem__(self, i):
+        return self._tiles[i]
+
+class FakeGroup(list):
+    def __init__(self, scale=1, x=0, y=0):
+        super().__init__()
+        self.scale = scale
+        self.x = x
+        self.y = y
+        self.hidden = False
+
+_module("board", **{k: k for k in ("GP6", "GP7", "GP10", "GP11", "GP12", "GP13", "GP14",
+                                   "GP16", "GP17", "GP18", "GP19")})
+_module("digitalio", DigitalInOut=FakeDigitalInOut, Direction=_Direction)
+_module("busio", SPI=FakeBusioSPI, I2C=FakeI2C)
+_module("terminalio", FONT=FakeFont())
+_module("adafruit_display_text.label", Label=FakeLabel)
+sys.modules["adafruit_display_text"].label = sys.modules["adafruit_display_text.label"]
+_module("displayio", Bitmap=FakeBitmap, Palette=FakePalette, OnDiskBitmap=FakeOnDiskBitmap,
+        TileGrid=FakeTileGrid, Group=FakeGroup)
+_module("busdisplay", BusDisplay=FakeBusDisplay)
+_module("fourwire", FourWire=FakeFourWire)
+_module("i2cdisplaybus", I2CDisplayBus=object)
@@ -0,0 +1,113 @@
+import time
+
+import pytest
+
+from conftest import FakeI2C
+import char_lcd
+from char_lcd import CharLCD, BACKLIGHT, CMD_SET_DDRAM, RS
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(char_lcd.time, "sleep", lambda s: None)
+
+@pytest.fixture
+def lcd():
+    lcd = CharLCD(FakeI2C(), cols=16, rows=2)
+    lcd.i2c.writes.clear()
+    return lcd
+
+def decode(data):
+    """Bytes of one write -> [(is_data, value)], checking the EN strobes."""
+    out = []
+    for i in range(0, len(data), 4):
+        hi_on, hi_off, lo_on, lo_off = data[i:i + 4]
+        assert hi_on & char_lcd.EN and not hi_off & char_lcd.EN
+        assert hi_on & ~char_lcd.EN == hi_off and lo_on & ~char_lcd.EN == lo_off
+        out.append((bool(hi_on & RS), (hi_on & 0xF0) | (lo_on >> 4)))
+    return out
+
+def sent(lcd):
+    """Decoded writes since the last call: [(address, [chars])] per write."""
+    writes = []
+    for _, data in lcd.i2c.writes:
+        runs = []
+        for is_data, v in decode(data):
+            if is_data:
+                runs[-1][1].append(chr(v))
+            else:
+                runs.append((v - CMD_SET_DDRAM, []))
+        writes.append([(addr, "".join(chars)) for addr, chars in runs])
+    lcd.i2c.writes.clear()
+    return writes
+
+def test_unchanged_show_writes_nothing(lcd):
+    lcd.show()
+    assert lcd.i2c.writes == []
+    lcd.write(0, 0, " ")            # same as the shadow
+    lcd.show()
+    assert lcd.i2c.writes == []
+
+def test_only_changed_characters_go_out(lcd):
+    lcd.write_line(0, "Menu")
+    lcd.show()
+    assert sent(lcd) == [[(0x00, "Menu")]]
+    lcd.write_line(0, "Mend")
+    lcd.show()
+    assert sent(lcd) == [[(0x03, "d")]]
+
+def test_one_unchanged_char_is_bridged_two_are_not(lcd):
+    lcd.write(0, 2, "a")
+    lcd.write(0, 4, "b")
+    lcd.show()
+    assert sent(lcd) == [[(0x02, "a b")]]
+    lcd.write(0, 2, "x")
+    lcd.write(0, 5, "y")
+    lcd.show()
+    assert sent(lcd) == [[(0x02, "x"), (0x05, "y")]]
+
+def test_one_batched_write_per_show(lcd):
+    lcd.write_line(0, "> Run payload")
+    lcd.write_line(1, "  Settings")
+    lcd.show()
+    writes = sent(lcd)
+    assert writes == [[(0x00, "> Run payload"), (0x42, "Settings")]]
+    assert lcd.transactions == 1 + 4        # the 4 init writes and this one
+
+def test_write_clips_and_replaces_non_ascii(lcd):
+    lcd.write(1, 14, "état")
+    lcd.write(5, 0, "off the panel")
+    lcd.show()
+    assert sent(lcd) == [[(0x4E, "?t")]]
+
+def test_backlight_bit_follows_every_write(lcd):
+    lcd.backlight = False
+    assert not lcd.backlight
+    assert lcd.i2c.writes == [(0x27, bytes((0,)))]
+    lcd.i2c.writes.clear()
+    lcd.write(0, 0, "A")
+    lcd.show()
+    data = lcd.i2c.writes[0][1]
+    assert all(not b & BACKLIGHT for b in data)
+    lcd.backlight = True
+    assert lcd.i2c.writes[-1] == (0x27, bytes((BACKLIGHT,)))
+
+def test_screen_toast_restores_the_row_it_covered():
+    from screen import Screen
+    scr = Screen(None, "lcd", i2c=FakeI2C(), lcd_size=(16, 2))
+    scr.lcd.write_line(1, "  Settings")
+    scr.lcd.show()
+    scr.toast("Saved", seconds=1.0)
+    scr.toast("Saved again", seconds=1.0)
+    assert scr.lcd.line(1).rstrip() == "Saved again"
+    scr.poll(time.monotonic() + 5)
+    assert scr.lcd.line(1).rstrip() == "  Settings"
+    assert scr.lcd._shadow[1] == scr.lcd._target[1]
+
+def test_screen_toast_leaves_a_redrawn_row_alone():
+    from screen import Screen
+    scr = Screen(None, "lcd", i2c=FakeI2C(), lcd_size=(16, 2))
+    scr.lcd.write_line(1, "  Settings")
+    scr.toast("Saved", seconds=1.0)
+    scr.lcd.write_line(1, "> Settings")     # menu moved meanwhile
+    scr.poll(time.monotonic() + 5)
+    assert scr.lcd.line(1).rstrip() == "> Settings"
@@ -0,0 +1,81 @@
+import json
+import tracemalloc
+
+import pytest
+
+import input_macro
+import menu_loader
+from input_macro import Macro, Recorder, SimScreen, check, replay, soak
+from menu_model import MAIN_TITLE
+
+MENUS = {"menus": [
+    {"title": MAIN_TITLE, "options": [
+        {"name": "Tools", "type": "menu", "action": "Tools"},
+        {"name": "Hello", "type": "message", "action": "hi"},
+        {"name": "Invert", "type": "command", "action": "invert"},
+    ]},
+    {"title": "Tools", "options": [
+        {"name": "Run demo", "type": "run", "action": "run:demo.dd"},
+        {"name": "Say hi", "type": "message", "action": "hi"},
+    ] + [{"name": f"Entry {i} with a long name", "type": "message", "action": str(i)}
+         for i in range(8)]},
+]}
+
+@pytest.fixture
+def menu(tmp_path, monkeypatch):
+    monkeypatch.setattr(menu_loader, "MENU_DIR", str(tmp_path) + "/")
+    (tmp_path / "main_menu.json").write_text(json.dumps(MENUS))
+    m = menu_loader.load_menus(SimScreen())
+    m.dry_run = True
+    return m
+
+def macro(keys, delay=10):
+    m = Macro()
+    for key in keys:
+        assert m.add(delay, key)
+    return m
+
+def test_macro_file_round_trip(tmp_path):
+    path = str(tmp_path / "macro.txt")
+    rec = Recorder()
+    rec.start()
+    rec._last = 1000
+    for now, key in ((1120, "d"), (1420, "s"), (1600, "b")):
+        rec.note(key, now=now)
+    saved = rec.stop(path)
+    assert not rec.active
+    loaded = Macro.load(path)
+    assert list(loaded.events()) == list(saved.events()) == [(120, "d"), (300, "s"), (180, "b")]
+
+def test_replay_drives_the_menu(menu):
+    stats = replay(menu, macro("s"), speed=0)
+    assert menu.current_title == "Tools"
+    replay(menu, macro("ddb"), speed=0)
+    assert menu.current_title == MAIN_TITLE
+    assert stats.count == 1
+
+def test_soak_on_simscreen_holds_the_thresholds(menu):
+    keys = "sdddddsbdsdsuuub"       # into Tools, scroll, run, back, message, command
+    tracemalloc.start()
+    try:
+        stats = soak(menu, menu.screen, macro(keys), iterations=300, sample_every=50)
+    finally:
+        tracemalloc.stop()
+    assert stats.count == 300 * len(keys)
+    assert [s[0] for s in stats.samples] == [0, 50, 100, 150, 200, 250, 299]
+    assert all(s[1] is not None for s in stats.samples)
+    assert len({s[2] for s in stats.samples}) == 1      # node count steady
+    assert check(stats) == [], input_macro.report(stats)
+    assert menu.dry_run                                 # the fixture's setting is restored
+    assert menu.current_title == MAIN_TITLE and menu.index == 0
+
+def test_soak_reports_a_node_leak(menu):
+    class LeakyScreen(SimScreen):
+        def clear(self, layer="menu"):
+            self.buffer = ["", ""]      # forgets to drop the nodes
+
+    menu.screen = LeakyScreen()
+    stats = soak(menu, menu.screen, macro("sb"), iterations=20, sample_every=5)
+    failures = check(stats)
+    assert any(f.startswith("nodes +") for f in failures)
+    assert "[SOAK] FAIL" in input_macro.report(stats, failures)
@@ -0,0 +1,96 @@
+import json
+import os
+
+import pytest
+
+from conftest import ROOT
+import ir_codes
+from ir import IRLibrary
+from ir_codes import RC5_T, compile_library, encode_code, encode_nec, encode_rc5
+
+def decode_nec(pulses):
+    """(address byte, inverted address byte, command) from an NEC frame."""
+    assert pulses[:2] == [ir_codes.NEC_HDR_MARK, ir_codes.NEC_HDR_SPACE]
+    assert len(pulses) == 2 + 64 + 1
+    data = 0
+    for i in range(32):
+        assert pulses[2 + 2 * i] == ir_codes.NEC_BIT_MARK
+        if pulses[3 + 2 * i] == ir_codes.NEC_ONE_SPACE:
+            data |= 1 << i
+    assert (data >> 24) == (~data >> 16) & 0xFF     # command check byte
+    return data & 0xFF, (data >> 8) & 0xFF, (data >> 16) & 0xFF
+
+def decode_rc5(pulses):
+    """(field bit, toggle, address, command) from RC5 mark/space durations."""
+    # Back to half-bit levels; the leading space of the first start bit was dropped
+    halves = [0]
+    level = 1
+    for p in pulses:
+        assert p in (RC5_T, 2 * RC5_T)
+        halves += [level] * (p // RC5_T)
+        level ^= 1
+    if len(halves) % 2:
+        halves.append(0)    # trailing space of a final 1
+    bits = []
+    for i in range(0, len(halves), 2):
+        assert halves[i] != halves[i + 1], "not Manchester"
+        bits.append(halves[i + 1])
+    assert len(bits) == 14 and bits[0] == 1
+    address = int("".join(map(str, bits[3:8])), 2)
+    command = int("".join(map(str, bits[8:])), 2) | (0 if bits[1] else 0x40)
+    return bits[1], bits[2], address, command
+
+@pytest.mark.parametrize("address", [0, 4, 0x7F, 0xFF])
+@pytest.mark.parametrize("command", [0, 8, 0x80, 0xFF])
+def test_nec_round_trip(address, command):
+    assert decode_nec(encode_nec(address, command)) == (address, ~address & 0xFF, command)
+
+def test_extended_nec_keeps_16_bit_address():
+    lo, hi, command = decode_nec(encode_nec(0x1234, 9))
+    assert (hi << 8 | lo, command) == (0x1234, 9)
+
+@pytest.mark.parametrize("address", [0, 5, 16, 31])
+@pytest.mark.parametrize("command", [0, 12, 13, 63, 64, 127])
+@pytest.mark.parametrize("toggle", [0, 1])
+def test_rc5_round_trip(address, command, toggle):
+    pulses = encode_rc5(address, command, toggle)
+    field, t, a, c = decode_rc5(pulses)
+    assert (t, a, c) == (toggle, address, command)
+    assert field == (0 if command & 0x40 else 1)
+    assert len(pulses) % 2 == 1                     # starts and ends with a mark
+
+def test_carrier_defaults_per_protocol():
+    assert encode_code({"protocol": "rc5", "address": 16, "command": 13})[2] == 36
+    assert encode_code({"protocol": "nec", "address": 4, "command": 8})[2] == 38
+    assert encode_code({"protocol": "raw", "pulses": [100, 100, 100]})[2] == 38
+    assert encode_code({"protocol": "rc5", "address": 1, "command": 1, "carrier_khz": 38})[2] == 38
+
+def test_raw_pulses_are_checked():
+    with pytest.raises(ValueError):
+        encode_code({"protocol": "raw", "pulses": [100, 0, 100]})
+    with pytest.raises(ValueError):
+        encode_code({"protocol": "sony"})
+
+def test_library_round_trip(tmp_path):
+    codes = {
+        "tv_power": {"protocol": "nec", "address": 4, "command": 8},
+        "amp_mute": {"protocol": "rc5", "address": 16, "command": 13},
+        "fan_on": {"protocol": "raw", "pulses": [1300, 400, 1300], "gap_ms": 25, "carrier_khz": 40},
+    }
+    path = tmp_path / "codes.bin"
+    path.write_bytes(compile_library(codes))
+    lib = IRLibrary(str(path), cache_size=2)
+    assert sorted(lib.names()) == sorted(codes)
+    for name, spec in codes.items():
+        pulses, gap_ms, khz = encode_code(spec)
+        got, carrier_hz, gap_s = lib.get(name)
+        assert list(got) == pulses
+        assert carrier_hz == khz * 1000
+        assert gap_s == gap_ms / 1000
+    assert lib.get("amp_mute")[1] == 36000
+
+def test_checked_in_library_matches_its_source():
+    with open(os.path.join(ROOT, "ir", "codes.json")) as f:
+        codes = json.load(f)["codes"]
+    with open(os.path.join(ROOT, "ir", "codes.bin"), "rb") as f:
+        assert f.read() == compile_library(codes)
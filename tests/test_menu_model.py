@@ -0,0 +1,77 @@
+import gc
+import json
+import tracemalloc
+
+import menu_loader
+import menu_model
+from menu_model import records_from_json
+from test_menu_reload import MAIN, RecordingScreen
+
+# Many files sharing option names and actions, as real menu sets do
+OPTIONS = [
+    {"name": "Open terminal window", "type": "run", "action": "open_terminal_window.dd"},
+    {"name": "Lock workstation now", "type": "run", "action": "lock_workstation_now.dd"},
+    {"name": "Show system information", "type": "message", "action": "system information"},
+    {"name": "Back to the main menu", "type": "menu", "action": "Main Menu"},
+]
+
+def menu_set(files=40, menus=3):
+    return [
+        json.dumps({"menus": [{"title": f"Tools {f}.{m}", "options": OPTIONS * 3}
+                              for m in range(menus)]})
+        for f in range(files)
+    ]
+
+def retained(build):
+    """Bytes still allocated by what build() returns, with its JSON dropped."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        kept = build()
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    assert kept
+    return size
+
+def test_interning_shrinks_a_large_menu_set(monkeypatch):
+    texts = menu_set()
+
+    def build():
+        return [rec for t in texts for rec in records_from_json(json.loads(t))]
+
+    menu_model.clear_strings()
+    interned = retained(build)
+    menu_model.clear_strings()
+    monkeypatch.setattr(menu_model, "intern", lambda s: "" if s is None else str(s))
+    plain = retained(build)
+    assert interned < plain * 0.6, (interned, plain)
+
+def test_interned_records_share_string_objects():
+    menu_model.clear_strings()
+    a, b = (records_from_json(json.loads(t))[0] for t in menu_set(files=2, menus=1))
+    assert a.names[0] is b.names[0]
+    assert a.actions[1] is b.actions[1]
+
+def test_reload_rebuilds_the_string_table(tmp_path, monkeypatch):
+    monkeypatch.setattr(menu_loader, "MENU_DIR", str(tmp_path) + "/")
+    (tmp_path / "main_menu.json").write_text(json.dumps(MAIN))
+    tools = {"menus": [{"title": "Tools", "options": [
+        {"name": "Old option name", "type": "message", "action": "old text"}]}]}
+    (tmp_path / "tools.json").write_text(json.dumps(tools))
+    menu = menu_loader.load_menus(RecordingScreen())
+    menu.dry_run = True
+    assert "Old option name" in menu_model._strings
+
+    tools["menus"][0]["options"][0]["name"] = "New option name"
+    (tmp_path / "tools.json").write_text(json.dumps(tools))
+    menu_loader.reload_menu_files(["tools.json"])
+    assert "New option name" in menu_model._strings
+    assert "Old option name" not in menu_model._strings
+    assert "Clear" in menu_model._strings       # main menu kept
+
+    (tmp_path / "tools.json").unlink()
+    menu.handle_command("reload_menu")          # reload_all_menu_files()
+    assert "New option name" not in menu_model._strings
+    assert "Tools" not in menu_model._strings
@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+import menu_loader
+from input_macro import SimScreen
+from menu_model import MAIN_TITLE
+
+MAIN = {"menus": [{"title": MAIN_TITLE, "options": [
+    {"name": "Clear", "type": "command", "action": "clear_screen"},
+]}]}
+
+def extra(title):
+    return {"menus": [{"title": title, "options": [
+        {"name": "Hello", "type": "message", "action": "hi"},
+    ]}]}
+
+class RecordingScreen(SimScreen):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def print_line(self, msg):
+        self.lines.append(msg)
+        super().print_line(msg)
+
+@pytest.fixture
+def menu(tmp_path, monkeypatch):
+    monkeypatch.setattr(menu_loader, "MENU_DIR", str(tmp_path) + "/")
+    (tmp_path / "main_menu.json").write_text(json.dumps(MAIN))
+    m = menu_loader.load_menus(RecordingScreen())
+    m.dry_run = True
+    return m
+
+def test_reload_without_hot_reloader_rereads_menus(menu, tmp_path):
+    assert menu.on_reload is None
+    (tmp_path / "tools.json").write_text(json.dumps(extra("Tools")))
+    menu.handle_command("reload_menu")
+    assert "Tools" in menu.menus
+    assert menu.screen.lines[-1] == "2: Menus reloaded"
+
+def test_reload_drops_deleted_files(menu, tmp_path):
+    (tmp_path / "tools.json").write_text(json.dumps(extra("Tools")))
+    menu.handle_command("reload_menu")
+    (tmp_path / "tools.json").unlink()
+    menu.handle_command("reload_menu")
+    assert "Tools" not in menu.menus
+
+def test_broken_main_menu_keeps_the_old_model(menu, tmp_path):
+    (tmp_path / "main_menu.json").write_text("{ not json")
+    menu.handle_command("reload_menu")
+    assert MAIN_TITLE in menu.menus
+    assert menu.screen.lines[-1] == "2: Menu error"
+
+def test_wired_reloader_is_used(menu):
+    menu.on_reload = lambda: "Up to date"
+    menu.handle_command("reload_menu")
+    assert menu.screen.lines[-1] == "2: Up to date"
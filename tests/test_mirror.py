@@ -0,0 +1,86 @@
+import binascii
+
+from conftest import FakeBitmap, FakeFourWire, FakeGroup, FakePalette, FakeTileGrid
+import mirror
+from mirror import FrameMirror, rle_decode
+from sh1106_display import SH1106Display
+
+def oled():
+    """The 1-bit SH1106 the board uses, with an empty root group."""
+    disp = SH1106Display(FakeFourWire(), width=128, height=64)
+    disp.root_group = FakeGroup()
+    return disp
+
+def pixel(x, y):
+    """One white pixel, as Screen.draw() adds it."""
+    bmp = FakeBitmap(1, 1, 2)
+    bmp[0, 0] = 1
+    pal = FakePalette(2)
+    pal[1] = 0xFFFFFF
+    return FakeTileGrid(bmp, pixel_shader=pal, x=x, y=y)
+
+class Stream:
+    def __init__(self):
+        self.lines = []
+
+    def write(self, data):
+        self.lines.append(bytes(data))
+
+def decode(line):
+    _, frame, page, b64 = line.decode().split(" ", 3)
+    body = binascii.a2b_base64(b64)
+    data = rle_decode(body[1:]) if body[0] == 1 else body[1:]
+    return int(frame), int(page), bytes(data)
+
+def run_frame(m, now):
+    for _ in range(m.pages):
+        m.poll(now)
+
+def test_keyframe_then_only_changed_pages():
+    disp = oled()
+    out = Stream()
+    m = FrameMirror(disp, fps=10, stream=out, pages_per_poll=1, keyframe_s=100)
+
+    run_frame(m, 0.0)
+    assert len(out.lines) == m.pages
+
+    out.lines.clear()
+    disp.root_group.append(pixel(5, 9))     # page 1, bit 1
+    run_frame(m, 1.0)
+    assert len(out.lines) == 1
+    frame, page, data = decode(out.lines[0])
+    assert (frame, page) == (1, 1)
+    assert data[5] == 0x02
+    assert sum(data) == 0x02
+
+def test_layers_compose_on_the_one_bit_panel():
+    disp = oled()
+    out = Stream()
+    m = FrameMirror(disp, fps=10, stream=out, keyframe_s=100)
+    back = FakeGroup()
+    back.append(pixel(0, 0))
+    top = FakeGroup()
+    cover = FakePalette(1)                  # opaque black, like Screen._solid()
+    top.append(FakeTileGrid(FakeBitmap(4, 8, 1), pixel_shader=cover))
+    top.append(pixel(2, 1))
+    disp.root_group.append(back)
+    disp.root_group.append(top)
+    run_frame(m, 0.0)
+    _, page, data = decode(out.lines[0])
+    assert page == 0
+    assert data[:4] == b"\x00\x00\x02\x00"
+
+    out.lines.clear()
+    top.hidden = True
+    run_frame(m, 1.0)
+    assert [decode(line)[2][:3] for line in out.lines] == [b"\x01\x00\x00"]
+
+def test_frame_rate_limits_captures():
+    disp = oled()
+    m = FrameMirror(disp, fps=2, stream=Stream(), pages_per_poll=mirror.PAGE_ROWS)
+    m.poll(0.0)
+    assert m.frame == 1
+    m.poll(0.1)                   # next frame not due until 0.5
+    assert m.frame == 1
+    m.poll(0.6)
+    assert m.frame == 2
@@ -0,0 +1,132 @@
+import os
+import struct
+
+import pytest
+
+from conftest import ROOT, FakeBitmap, FakeGroup, FakeOnDiskBitmap, FakePalette, FakeTileGrid
+import page_shadow
+from page_shadow import BmpFile, PageComposer
+
+def solid(w, h, color, x=0, y=0):
+    pal = FakePalette(1)
+    pal[0] = color
+    return FakeTileGrid(FakeBitmap(w, h, 1), pixel_shader=pal, x=x, y=y)
+
+def sprite(points, w, h, x=0, y=0):
+    """Lit points on a transparent background, like a font glyph."""
+    bmp = FakeBitmap(w, h, 2)
+    for p in points:
+        bmp[p] = 1
+    pal = FakePalette(2)
+    pal[1] = 0xFFFFFF
+    pal.make_transparent(0)
+    return FakeTileGrid(bmp, pixel_shader=pal, x=x, y=y)
+
+def write_bmp24(path, rows):
+    """Bottom-up 24-bit BMP from rows of RGB888 ints, top row first."""
+    h = len(rows)
+    w = len(rows[0])
+    stride = (w * 3 + 3) & ~3
+    data = bytearray()
+    for row in reversed(rows):
+        line = bytearray()
+        for c in row:
+            line += bytes((c & 0xFF, (c >> 8) & 0xFF, c >> 16))
+        data += line + bytes(stride - len(line))
+    head = struct.pack("<2sIHHI", b"BM", 54 + len(data), 0, 0, 54)
+    head += struct.pack("<IiiHHIIiiII", 40, w, h, 1, 24, 0, len(data), 0, 0, 0, 0)
+    with open(path, "wb") as f:
+        f.write(head + data)
+
+def lit(comp, width=128, height=64):
+    return {(x, y) for x in range(width) for y in range(height) if comp.cols[x] >> y & 1}
+
+def test_later_layers_cover_earlier_ones():
+    comp = PageComposer(128, 64)
+    root = FakeGroup()
+    root.append(solid(8, 8, 0xFFFFFF))
+    root.append(solid(4, 8, 0x000000, x=2))     # opaque black strip
+    root.append(sprite([(0, 0)], 2, 2, x=3, y=3))
+    comp.compose(root)
+    on = lit(comp)
+    assert (0, 0) in on and (7, 7) in on
+    assert (2, 0) not in on and (5, 7) not in on
+    assert (3, 3) in on
+    assert (4, 3) not in on                     # glyph background is transparent
+
+def test_hidden_groups_offsets_and_flip():
+    comp = PageComposer(128, 64)
+    root = FakeGroup()
+    hidden = FakeGroup()
+    hidden.hidden = True
+    hidden.append(solid(128, 64, 0xFFFFFF))
+    moved = FakeGroup(x=10, y=-2)
+    flipped = sprite([(0, 2)], 4, 4, x=1, y=0)
+    flipped.flip_x = True
+    moved.append(flipped)
+    root.append(hidden)
+    root.append(moved)
+    comp.compose(root)
+    assert lit(comp) == {(14, 0)}
+
+def test_group_scale_stretches_pixels():
+    comp = PageComposer(128, 64)
+    root = FakeGroup()
+    big = FakeGroup(scale=2, x=1, y=1)
+    big.append(sprite([(1, 1)], 2, 2))
+    root.append(big)
+    comp.compose(root)
+    assert lit(comp) == {(3, 3), (4, 3), (3, 4), (4, 4)}
+
+def test_page_bytes_follow_sh1106_layout():
+    comp = PageComposer(128, 64)
+    root = FakeGroup()
+    root.append(sprite([(0, 0)], 1, 1, x=5, y=9))
+    comp.compose(root)
+    buf = comp.page(1, bytearray(128))
+    assert buf[5] == 0x02 and sum(buf) == 0x02
+    assert sum(comp.page(0, bytearray(128))) == 0
+
+def test_tile_cache_follows_the_bitmap_object():
+    comp = PageComposer(128, 64)
+    root = FakeGroup()
+    tg = sprite([(0, 0)], 2, 1)
+    root.append(tg)
+    comp.compose(root)
+    assert lit(comp) == {(0, 0)}
+    tg.bitmap = sprite([(1, 0)], 2, 1).bitmap   # sprite RAM frame swap
+    comp.compose(root)
+    assert lit(comp) == {(1, 0)}
+
+def test_on_disk_bitmap_tiles_from_the_file(tmp_path):
+    W, K = 0xFFFFFF, 0x000000
+    path = str(tmp_path / "sheet.bmp")
+    write_bmp24(path, [[W, K, K, K],
+                       [K, K, K, W]])
+    odb = page_shadow.register(FakeOnDiskBitmap(path), path)
+    tg = FakeTileGrid(odb, width=1, height=1, tile_width=2, tile_height=2, x=0, y=0)
+    root = FakeGroup()
+    root.append(solid(2, 2, 0xFFFFFF))
+    root.append(tg)
+    comp = PageComposer(128, 64)
+    comp.compose(root)
+    assert lit(comp) == {(0, 0)}                # file pixels are opaque
+    tg[0] = 1
+    comp.compose(root)
+    assert lit(comp) == {(1, 1)}
+
+def test_bitfields_menu_button_decodes():
+    bmp = BmpFile(os.path.join(ROOT, "picoPebbleMenuButton.bmp"))
+    assert (bmp.width, bmp.height, bmp.bpp) == (128, 16, 32)
+    rows = list(bmp.rows(0, 0, 128, 16))
+    assert page_shadow.luma(rows[0][10]) >= page_shadow.LIT_LUMA     # top border
+    assert page_shadow.luma(rows[8][64]) < page_shadow.LIT_LUMA      # inside
+
+def test_compressed_bmp_is_refused(tmp_path):
+    path = tmp_path / "rle.bmp"
+    write_bmp24(str(path), [[0]])
+    raw = bytearray(path.read_bytes())
+    struct.pack_into("<I", raw, 30, 1)          # BI_RLE8
+    path.write_bytes(raw)
+    with pytest.raises(ValueError):
+        BmpFile(str(path))
@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+import metrics
+import payload_pack
+import payloader
+
+TEXT = "STRING hello\nENTER\n"
+
+@pytest.fixture
+def payload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(payloader, "PAYLOAD_DIR", str(tmp_path) + "/")
+    monkeypatch.setattr(payloader, "compress", False)
+    payloader.clear_frame_cache()
+    (tmp_path / "p.dd").write_text(TEXT)
+    data = bytearray(payload_pack.pack_payload(TEXT))
+    ddb = tmp_path / "p.ddb"
+    ddb.write_bytes(data)
+    # Container newer than the source, so it is the one used
+    st = os.stat(tmp_path / "p.dd")
+    os.utime(ddb, (st.st_atime + 10, st.st_mtime + 10))
+    return tmp_path
+
+def corrupt(path, offset=-3):
+    data = bytearray(path.read_bytes())
+    data[offset] ^= 0x20
+    st = os.stat(path)
+    path.write_bytes(data)
+    os.utime(path, (st.st_atime + 1, st.st_mtime + 1))
+
+def test_good_container_is_used(payload_dir):
+    frame, paylen, _ = payloader.stage_frame("p.dd")
+    assert isinstance(frame, memoryview)
+    assert bytes(frame) == payload_pack.build_frame(TEXT)[0]
+    assert paylen == len(TEXT)
+
+def test_crc_mismatch_raises_on_load(payload_dir):
+    corrupt(payload_dir / "p.ddb")
+    with pytest.raises(ValueError, match="CRC"):
+        payloader.load_container("p.dd")
+
+def test_corrupt_container_falls_back_to_source(payload_dir):
+    corrupt(payload_dir / "p.ddb")
+    fails = metrics._counters[payloader.C_CRC_FAIL]
+    frame, paylen, _ = payloader.stage_frame("p.dd")
+    assert not isinstance(frame, memoryview)
+    assert frame == payload_pack.build_frame(TEXT)[0]
+    assert metrics._counters[payloader.C_CRC_FAIL] == fails + 1
+
+def test_container_without_source_still_raises(payload_dir):
+    os.remove(payload_dir / "p.dd")
+    corrupt(payload_dir / "p.ddb")
+    with pytest.raises(ValueError):
+        payloader.stage_frame("p.ddb")
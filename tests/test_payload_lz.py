@@ -0,0 +1,135 @@
+import random
+
+import pytest
+
+import payload_pack
+import payloader
+from payload_lz import ESC, MIN_MATCH, WINDOW, compress, decompress
+
+TEXT = "REM demo\nSTRING hello world\nENTER\n" * 8 + "STRING done\nENTER\n"
+
+def tokens(packed):
+    """[("lit", byte)] / [("match", length, distance)] of a compressed stream."""
+    out = []
+    i = 0
+    while i < len(packed):
+        b = packed[i]
+        if b == ESC:
+            out.append(("lit", (packed[i + 1] & 0x0F) << 4 | packed[i + 2] & 0x0F))
+            i += 3
+        elif b < 0x80:
+            out.append(("lit", b))
+            i += 1
+        else:
+            length = ((b >> 2) & 0x1F) + MIN_MATCH
+            out.append(("match", length, ((b & 0x03) << 6 | packed[i + 1] & 0x3F) + 1))
+            i += 2
+    return out
+
+def unique_block(n, seed=1):
+    """n bytes with no repeated 3-byte sequence, so nothing inside matches."""
+    rng = random.Random(seed)
+    seen = set()
+    out = bytearray(rng.sample(range(256), 2))
+    while len(out) < n:
+        b = rng.randrange(256)
+        key = bytes(out[-2:]) + bytes((b,))
+        if key not in seen:
+            seen.add(key)
+            out.append(b)
+    return bytes(out)
+
+@pytest.mark.parametrize("data", [
+    b"",
+    b"a",
+    b"abc",
+    TEXT.encode(),
+    bytes(range(256)) * 3,
+    b"\x04\x05\x06" * 50,
+    b"x" * 1000,                            # one overlapping run
+    "STRING grüße ✓\n".encode() * 20,
+])
+def test_round_trip(data):
+    assert decompress(compress(data)) == data
+
+def test_random_round_trip():
+    rng = random.Random(7)
+    for _ in range(50):
+        alphabet = bytes(rng.sample(range(256), rng.randrange(2, 40)))
+        data = bytes(rng.choice(alphabet) for _ in range(rng.randrange(1, 2000)))
+        assert decompress(compress(data)) == data
+
+def test_match_at_the_window_edge():
+    block = unique_block(WINDOW)
+    data = block + block[:20]
+    packed = compress(data)
+    assert ("match", 20, WINDOW) in tokens(packed)
+    assert decompress(packed) == data
+
+def test_nothing_beyond_the_window():
+    block = unique_block(WINDOW + 1)
+    data = block + block[:20]
+    packed = compress(data)
+    assert not any(t[0] == "match" for t in tokens(packed))
+    assert decompress(packed) == data
+
+def test_framing_bytes_never_appear():
+    rng = random.Random(3)
+    data = bytes(rng.randrange(256) for _ in range(4000)) + bytes(range(256)) * 4
+    packed = compress(data)
+    assert 0x04 not in packed and 0x05 not in packed
+    assert decompress(packed) == data
+
+def test_malformed_streams_raise():
+    with pytest.raises(ValueError):
+        decompress(bytes((ESC, 0x41)))
+    with pytest.raises(ValueError):
+        decompress(bytes((0x80,)))
+    with pytest.raises(ValueError):
+        decompress(b"ab" + bytes((0x80, 0x85)))  # distance 6 with 2 bytes out
+
+##################################
+#     LZ= in the META line       #
+##################################
+def parse(frame):
+    head, _, body = bytes(frame).partition(b"\n")
+    fields = dict(f.split("=") for f in head.decode().split()[2:])
+    return {k: int(v) for k, v in fields.items()}, body
+
+def check_lz_frame(frame, paylen, paysum, payload):
+    meta, body = parse(frame)
+    assert meta["LEN"] == paylen == len(payload)
+    assert meta["SUM16"] == paysum == sum(payload) & 0xFFFF
+    assert meta["LZ"] == len(body) < len(payload)
+    assert decompress(body) == payload
+
+@pytest.fixture
+def payloader_text(monkeypatch):
+    def use(text, lz):
+        monkeypatch.setattr(payloader, "compress", lz)
+        monkeypatch.setattr(payloader, "load_payload", lambda name: text)
+        return payloader.build_frame("p.dd")
+    return use
+
+def test_payloader_frame_keeps_plain_len_and_sum(payloader_text):
+    frame, paylen, paysum = payloader_text(TEXT, True)
+    check_lz_frame(frame, paylen, paysum, TEXT.encode())
+
+def test_payload_pack_frame_keeps_plain_len_and_sum(payloader_text):
+    frame, paylen, paysum = payload_pack.build_frame(TEXT, lz=True)
+    check_lz_frame(frame, paylen, paysum, TEXT.encode())
+    # The host packer and the board build the same frame
+    assert payloader_text(TEXT, True) == (frame, paylen, paysum)
+
+def test_incompressible_payload_goes_out_plain(payloader_text):
+    text = "Zq7"
+    for frame, _, _ in (payloader_text(text, True), payload_pack.build_frame(text, lz=True)):
+        meta, body = parse(frame)
+        assert "LZ" not in meta
+        assert body == text.encode()
+
+def test_compression_off_has_no_lz_field(payloader_text):
+    meta, body = parse(payloader_text(TEXT, False)[0])
+    assert "LZ" not in meta and body == TEXT.encode()
+    meta, body = parse(payload_pack.build_frame(TEXT)[0])
+    assert "LZ" not in meta and body == TEXT.encode()
@@ -0,0 +1,85 @@
+import pytest
+
+import payloader
+import payload_queue
+from payload_queue import PayloadQueue, SENT, FAILED
+from spi_comm import STATUS_VALID
+
+class FakeDevice:
+    """Receiver that reports an idle, valid status and records sends."""
+
+    def __init__(self, name, fail=False):
+        self.name = name
+        self.fail = fail
+        self.sent = []
+        self.last_error = None
+
+    def read_status(self):
+        return STATUS_VALID
+
+    def try_send_bytes(self, payload, append_eot=True):
+        if self.fail:
+            self.last_error = "bus fault"
+            return False
+        self.sent.append(bytes(payload))
+        return True
+
+class FakeBus:
+    def __init__(self, *names):
+        self.devices = {n: FakeDevice(n) for n in names}
+
+    def device(self, name=None):
+        return self.devices.get(name)
+
+@pytest.fixture
+def staged(monkeypatch):
+    """Record prefetches; every payload stages as its own name."""
+    calls = []
+    monkeypatch.setattr(payloader, "prefetch_payload", calls.append)
+    monkeypatch.setattr(payloader, "stage_frame", lambda n: (n.encode(), len(n), 0))
+    return calls
+
+@pytest.fixture
+def bus(monkeypatch, staged):
+    b = FakeBus("main", "left", "right")
+    monkeypatch.setattr(payloader, "bus", b)
+    monkeypatch.setattr(payload_queue, "jobs", PayloadQueue(b.devices["main"], poll_interval=0))
+    monkeypatch.setattr(payload_queue, "_queues", {})
+    return b
+
+def test_submit_prefetches_only_the_head_job(staged):
+    q = PayloadQueue(FakeDevice("main"), poll_interval=0)
+    q.submit(["a.dd", "b.dd", "c.dd"])
+    assert staged == ["a.dd"]
+    q.poll(0.0)                     # a goes out, b is staged next
+    assert staged == ["a.dd", "b.dd"]
+
+def test_submit_behind_pending_jobs_prefetches_nothing(staged):
+    q = PayloadQueue(FakeDevice("main"), poll_interval=0)
+    q.submit(["a.dd"])
+    q.submit(["b.dd"])
+    assert staged == ["a.dd"]
+
+def test_send_failure_marks_the_job_failed(staged):
+    dev = FakeDevice("main", fail=True)
+    q = PayloadQueue(dev, poll_interval=0)
+    job, = q.submit(["a.dd"])
+    q.poll(0.0)
+    assert job.status == FAILED
+    assert job.error == "bus fault"
+    assert q.idle()
+    assert q.summary() == "1 done, 1 failed"
+
+def test_targets_route_to_their_receivers(bus):
+    queues = payload_queue.submit(["a.dd", "b.dd@left", "c.dd@all"])
+    assert len(queues) == 3
+    payload_queue.poll_all(0.0)
+    payload_queue.poll_all(1.0)
+    sent = {n: d.sent for n, d in bus.devices.items()}
+    assert sent == {"main": [b"a.dd", b"c.dd"], "left": [b"b.dd", b"c.dd"], "right": [b"c.dd"]}
+    assert payload_queue.queue_for("main") is payload_queue.jobs
+    assert all(j.status == SENT for q in queues for j in q.jobs)
+
+def test_unknown_receiver_raises(bus):
+    with pytest.raises(KeyError):
+        payload_queue.submit(["a.dd@nowhere"])
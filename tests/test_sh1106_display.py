@@ -0,0 +1,125 @@
+from conftest import FakeBitmap, FakeFourWire, FakeGroup, FakePalette, FakeTileGrid
+import sh1106_display
+from sh1106_display import SH1106Display, CMD_PAGE, CMD_COL_HIGH, CMD_COL_LOW
+
+def panel(bus, **kwargs):
+    """The 1-bit SH1106 wrapper with an empty root group."""
+    oled = SH1106Display(bus, width=128, height=64, **kwargs)
+    oled.root_group = FakeGroup()
+    return oled
+
+def light(oled, *points):
+    """Add one white pixel per (x, y), as Screen.draw() does."""
+    for x, y in points:
+        bmp = FakeBitmap(1, 1, 2)
+        bmp[0, 0] = 1
+        pal = FakePalette(2)
+        pal[1] = 0xFFFFFF
+        oled.root_group.append(FakeTileGrid(bmp, pixel_shader=pal, x=x, y=y))
+
+def writes(bus):
+    """(page, column, data) for each page/column addressed data write."""
+    out = []
+    page = col_high = None
+    for cmd, data in bus.sent:
+        if CMD_PAGE <= cmd < CMD_PAGE + 8:
+            page = cmd - CMD_PAGE
+        elif CMD_COL_HIGH <= cmd < CMD_COL_HIGH + 16:
+            col_high = cmd - CMD_COL_HIGH
+        elif cmd < CMD_COL_HIGH and data:
+            out.append((page, (col_high << 4) | cmd, data))
+    return out
+
+def test_full_mode_counts_a_full_frame_per_refresh():
+    bus = FakeFourWire()
+    oled = SH1106Display(bus, width=128, height=64)
+    oled.refresh()
+    oled.refresh()
+    assert oled.refreshes == 2
+    assert oled.refresh_calls == 2
+    assert bus.sent == []                   # the core sent these, not us
+    assert oled.last_transactions == 8 * 3
+    assert oled.last_bytes == 8 * (3 + 128)
+    assert oled.transactions == 2 * 8 * 3
+    assert oled.bytes_sent == 2 * 8 * (3 + 128)
+
+def test_partial_mode_on_the_one_bit_panel():
+    bus = FakeFourWire()
+    oled = panel(bus, partial=True)
+    assert oled.color_depth == 1
+    light(oled, (3, 0))
+    oled.refresh()
+    assert oled.refresh_calls == 0          # the core never pushed a frame
+    assert writes(bus)[0] == (0, 0, b"\x00\x00\x00\x01" + bytes(124))
+
+def test_partial_refresh_beats_full_frames():
+    bus = FakeFourWire()
+    full = SH1106Display(FakeFourWire(), width=128, height=64)
+    oled = panel(bus, partial=True)
+    for i in range(10):
+        light(oled, (i * 12, i * 6))
+        oled.refresh()
+        full.refresh()
+    assert oled.bytes_sent < full.bytes_sent // 5
+
+def test_contrast_invert_and_power_are_counted_commands():
+    bus = FakeFourWire()
+    oled = SH1106Display(bus, width=128, height=64)
+    oled.set_contrast(0.5)
+    oled.set_invert(True)
+    oled.sleep()
+    oled.sleep()                  # already asleep: nothing sent
+    oled.wake()
+    assert [cmd for cmd, _ in bus.sent] == [0x81, 127, 0xA7, 0xAE, 0xAF]
+    assert oled.transactions == 5
+    assert oled.bytes_sent == 5
+    assert oled.inverted
+
+def test_first_partial_refresh_sends_every_page():
+    bus = FakeFourWire()
+    oled = panel(bus, partial=True, col_offset=2)
+    assert not oled.auto_refresh
+    oled.refresh()
+    w = writes(bus)
+    assert [(p, c, len(d)) for p, c, d in w] == [(p, 2, 128) for p in range(8)]
+    assert oled.last_transactions == 8 * 3
+    assert oled.last_bytes == 8 * (3 + 128)
+
+def test_unchanged_frame_sends_nothing():
+    bus = FakeFourWire()
+    oled = panel(bus, partial=True)
+    oled.refresh()
+    bus.sent.clear()
+    oled.refresh()
+    assert bus.sent == []
+    assert oled.last_bytes == 0
+
+def test_changed_run_only_with_column_offset():
+    bus = FakeFourWire()
+    oled = panel(bus, partial=True, col_offset=2)
+    oled.refresh()
+    bus.sent.clear()
+    light(oled, (40, 19))        # page 2, bit 3
+    oled.refresh()
+    assert writes(bus) == [(2, 42, b"\x08")]
+    assert oled.last_transactions == 3
+    assert oled.last_bytes == 4
+
+def test_close_runs_merge_and_far_runs_do_not():
+    bus = FakeFourWire()
+    oled = panel(bus, partial=True)
+    oled.refresh()
+    bus.sent.clear()
+    gap = sh1106_display.MERGE_GAP
+    light(oled, (10, 0), (10 + gap, 0), (60, 0))
+    oled.refresh()
+    assert [(p, c, len(d)) for p, c, d in writes(bus)] == [(0, 10, gap + 1), (0, 60, 1)]
+
+def test_invalidate_resends_the_whole_frame():
+    bus = FakeFourWire()
+    oled = panel(bus, partial=True)
+    oled.refresh()
+    oled.invalidate()
+    bus.sent.clear()
+    oled.refresh()
+    assert len(writes(bus)) == 8
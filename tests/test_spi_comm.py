@@ -0,0 +1,112 @@
+import pytest
+
+import spi_comm
+from spi_comm import SPIBus, EOT
+
+class FakeSPI:
+    """busio.SPI stand-in that checks locking and records CS at each write."""
+
+    def __init__(self):
+        self.bus = None
+        self.locked = False
+        self.configures = []
+        self.writes = []        # (selected device names, data)
+        self.fail_on = None     # device name whose writes raise
+
+    def try_lock(self):
+        if self.locked:
+            return False
+        self.locked = True
+        return True
+
+    def unlock(self):
+        assert self.locked
+        self.locked = False
+
+    def configure(self, baudrate, phase, polarity):
+        assert self.locked, "configure outside a lock"
+        assert not self.selected(), "configure with a CS asserted"
+        self.configures.append((baudrate, phase, polarity))
+
+    def selected(self):
+        return [name for name, dev in self.bus.devices.items() if not dev.cs.value]
+
+    def write(self, data):
+        assert self.locked, "write outside a lock"
+        sel = self.selected()
+        if self.fail_on in sel:
+            raise OSError("bus fault")
+        self.writes.append((sel, bytes(data)))
+
+    def write_readinto(self, out, buf):
+        self.write(out)
+        buf[0] = 0
+        buf[1] = spi_comm.STATUS_VALID
+
+@pytest.fixture
+def bus(monkeypatch):
+    monkeypatch.setattr(spi_comm.time, "sleep", lambda s: None)
+    spi = FakeSPI()
+    b = SPIBus(spi=spi)
+    spi.bus = b
+    b.add("a", "GP17", baudrate=500000)
+    b.add("b", "GP20", baudrate=500000)
+    b.add("c", "GP21", baudrate=1000000, polarity=1)
+    return b
+
+def test_reconfigure_only_when_settings_change(bus):
+    a, b, c = bus.device("a"), bus.device("b"), bus.device("c")
+    a.send_bytes(b"x")
+    a.send_bytes(b"x")
+    b.send_bytes(b"x")            # same settings as a
+    assert bus.spi.configures == [(500000, 0, 0)]
+    c.send_bytes(b"x")
+    a.send_bytes(b"x")
+    assert bus.spi.configures == [(500000, 0, 0), (1000000, 0, 1), (500000, 0, 0)]
+    assert bus.reconfigures == 3
+
+def test_cs_low_only_inside_locked_transaction(bus):
+    dev = bus.device("b")
+    dev.send_bytes(b"hello")
+    assert bus.spi.writes == [(["b"], b"hello"), (["b"], EOT)]
+    assert not bus.spi.locked
+    assert bus.spi.selected() == []
+
+def test_status_poll_is_a_transaction_too(bus):
+    st = bus.poll_status()
+    assert all(spi_comm.status_valid(v) for v in st.values())
+    assert [sel for sel, _ in bus.spi.writes] == [["a"], ["b"], ["c"]]
+    assert not bus.spi.locked
+
+def test_lock_released_and_cs_raised_when_write_raises(bus):
+    bus.spi.fail_on = "a"
+    with pytest.raises(OSError):
+        bus.device("a").send_bytes(b"x")
+    assert not bus.spi.locked
+    assert bus.spi.selected() == []
+    bus.spi.fail_on = None
+    bus.device("a").send_bytes(b"y")          # bus still usable
+    assert bus.spi.writes[-2] == (["a"], b"y")
+
+def test_lock_released_when_configure_raises(bus):
+    def broken(**kwargs):
+        raise RuntimeError("bad settings")
+    bus.spi.configure = broken
+    with pytest.raises(RuntimeError):
+        bus.device("a").send_bytes(b"x")
+    assert not bus.spi.locked
+    assert bus.spi.selected() == []
+
+def test_broadcast_reports_each_device_and_continues_past_failure(bus):
+    bus.spi.fail_on = "b"
+    results = bus.broadcast(b"go")
+    assert results == {"a": True, "b": False, "c": True}
+    sent_to = [sel[0] for sel, data in bus.spi.writes if data == b"go"]
+    assert sent_to == ["a", "c"]
+    b = bus.device("b")
+    assert (b.state, b.errors, b.last_error) == ("error", 1, "bus fault")
+    assert bus.device("c").state == "sent"
+    assert not bus.spi.locked
+
+def test_broadcast_to_named_subset(bus):
+    assert bus.broadcast(b"go", names=("c",)) == {"c": True}
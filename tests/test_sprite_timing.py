@@ -0,0 +1,102 @@
+import pytest
+
+import metrics
+import sprite_api
+from sprite_api import Sprite, FRAME_UNIT
+from conftest import FakeGroup
+
+class Clock:
+    """Fake ticks_ms: advanced by hand, wraps like the real one."""
+
+    def __init__(self, t=0):
+        self.t = t
+
+    def __call__(self):
+        return self.t & ((1 << 29) - 1)
+
+    def advance(self, ms):
+        self.t += ms
+        return self()
+
+class FakeScreen:
+    def __init__(self):
+        self.display = object()
+        self.group = FakeGroup()
+
+    def layer(self, name):
+        return self.group
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = Clock()
+    monkeypatch.setattr(sprite_api, "ticks_ms", c)
+    return c
+
+def make_sprite(fps=10, count=8, loop=True):
+    spr = Sprite(FakeScreen(), "/sheet.bmp", 16, 16, cols=8, cache=False)
+    spr.add_clip("walk", start=0, count=count, fps=fps, loop=loop)
+    return spr
+
+def dropped():
+    return metrics._counters[sprite_api.C_DROPPED]
+
+def test_steady_clock_one_frame_per_period(clock):
+    spr = make_sprite(fps=10)
+    for i in range(1, 6):
+        spr._step_anim(clock.advance(100))
+        assert spr.frame == i
+        assert spr._phase == 0
+    assert spr.tg[0] == 5
+
+def test_stall_skips_frames_and_keeps_the_remainder(clock):
+    spr = make_sprite(fps=10)
+    d0 = dropped()
+    spr._step_anim(clock.advance(350))      # 3.5 frame periods in one pass
+    assert spr.frame == 3
+    assert spr._phase == FRAME_UNIT // 2
+    assert dropped() - d0 == 2
+    spr._step_anim(clock.advance(50))       # the half frame left over
+    assert spr.frame == 4
+    assert spr._phase == 0
+
+def test_short_passes_accumulate_without_advancing(clock):
+    spr = make_sprite(fps=10)
+    for _ in range(9):
+        spr._step_anim(clock.advance(10))
+    assert spr.frame == 0
+    assert spr._phase == 9 * 10 * 10000
+    spr._step_anim(clock.advance(10))
+    assert spr.frame == 1
+    assert spr._phase == 0
+
+def test_irregular_passes_and_stalls_do_not_drift(clock):
+    spr = make_sprite(fps=30, count=1000)
+    pattern = [16, 17, 16, 250, 1, 33, 16, 17, 634]     # sums to 1000 ms
+    for ms in pattern:
+        spr._step_anim(clock.advance(ms))
+    assert spr.frame == 30
+    assert spr._phase == 0
+
+def test_loop_wraps_and_one_shot_holds_last_frame(clock):
+    spr = make_sprite(fps=10, count=4)
+    spr._step_anim(clock.advance(1000))     # 10 frames on a 4-frame loop
+    assert spr.frame == 10 % 4
+
+    once = make_sprite(fps=10, count=4, loop=False)
+    once._step_anim(clock.advance(1000))
+    assert once.frame == 3
+
+def test_ticks_wraparound(clock):
+    clock.t = (1 << 29) - 30
+    spr = make_sprite(fps=10)
+    spr._step_anim(clock.advance(130))      # crosses the wrap
+    assert spr.frame == 1
+    assert spr._phase == 30 * 10000
+
+def test_clock_going_backwards_is_ignored(clock):
+    spr = make_sprite(fps=10)
+    clock.t = 1000
+    spr._last_t = 1000
+    spr._step_anim(900)
+    assert spr.frame == 0
+    assert spr._phase == 0
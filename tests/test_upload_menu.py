@@ -0,0 +1,82 @@
+import io
+import json
+
+import pytest
+
+import upload_menu
+from upload_menu import MenuError, sync, validate_menus
+
+MAIN = {"menus": [{"title": "Main Menu", "options": [
+    {"name": "Hello", "type": "run", "action": "run:hello.dd"},
+    {"name": "Left hello", "type": "run", "action": "run:hello.dd@left"},
+    {"name": "Tools", "type": "menu", "action": "Tools"},
+]}]}
+
+@pytest.fixture
+def src(tmp_path):
+    root = tmp_path / "src"
+    (root / "menus").mkdir(parents=True)
+    (root / "payloads").mkdir()
+    (root / "menus" / "main_menu.json").write_text(json.dumps(MAIN, indent=2))
+    (root / "payloads" / "hello.dd").write_text("STRING hello\nENTER\n")
+    (root / "config.json").write_text(json.dumps({"payload_compress": False}, indent=2))
+    return root
+
+@pytest.fixture
+def target(tmp_path):
+    t = tmp_path / "CIRCUITPY"
+    t.mkdir()
+    return t
+
+def run(src, target, **kwargs):
+    out = io.StringIO()
+    report = sync(str(target), src=str(src), out=out, **kwargs)
+    return report, out.getvalue()
+
+def test_targets_are_stripped_before_the_payload_check(src):
+    errors, _ = validate_menus({"main_menu.json": MAIN}, str(src / "payloads"))
+    assert errors == []
+    broken = {"menus": [{"title": "Main Menu", "options": [
+        {"name": "All", "type": "run", "action": "run:gone.dd@all"}]}]}
+    errors, _ = validate_menus({"main_menu.json": broken}, str(src / "payloads"))
+    assert errors == ["main_menu.json: 'All' runs missing payload 'gone.dd'"]
+
+def test_warnings_are_returned_not_printed(src, capsys):
+    errors, warnings = validate_menus({"main_menu.json": MAIN}, str(src / "payloads"))
+    assert errors == []
+    assert warnings == ["main_menu.json: 'Tools' links to unknown menu 'Tools'"]
+    assert capsys.readouterr().out == ""
+
+def test_first_sync_writes_everything_minified(src, target):
+    report, out = run(src, target)
+    assert report["changed"] == sorted(["config.json", "menus/main_menu.json",
+                                        "payloads/hello.dd", "payloads/hello.ddb"])
+    assert report["reloads_avoided"] == 3
+    assert report["bytes_saved_minify"] > 0
+    assert (target / "menus" / "main_menu.json").read_bytes() == upload_menu.minify_json(MAIN)
+    assert "[WARN] main_menu.json: 'Tools' links to unknown menu 'Tools'" in out
+    assert not list(target.rglob("*.tmp"))
+
+def test_unchanged_files_are_skipped(src, target):
+    run(src, target)
+    report, _ = run(src, target)
+    assert report["changed"] == []
+    assert report["bytes_written"] == 0
+    assert report["reloads_avoided"] == 0
+
+    (src / "payloads" / "hello.dd").write_text("STRING bye\n")
+    report, _ = run(src, target)
+    assert report["changed"] == ["payloads/hello.dd", "payloads/hello.ddb"]
+    assert report["reloads_avoided"] == 1
+
+def test_dry_run_writes_nothing(src, target):
+    report, out = run(src, target, dry_run=True)
+    assert len(report["changed"]) == 4
+    assert list(target.iterdir()) == []
+    assert "would write" in out
+
+def test_menu_errors_stop_the_sync(src, target):
+    (src / "menus" / "broken.json").write_text("{ not json")
+    with pytest.raises(MenuError):
+        run(src, target)
+    assert list(target.iterdir()) == []
@@ -0,0 +1,188 @@
+# textlayout.py (CircuitPython)
+# Measured text fitting for the menu, overlays and boot message.
+#
+# Widths come from the font's glyph advances (shift_x), read once per font
+# into a byte table for printable ASCII. fit() and wrap() results are cached
+# by (text, width, font) so a redraw of the same page measures nothing.
+# font=None measures in character cells, for the character LCD.
+#
+# Marquee gives the scroll offset for a line that overflows its box; the
+# caller moves an already built label by that offset instead of rebuilding
+# it (see screen.MenuPage).
+
+from metrics import ticks_ms, ticks_diff
+
+ELLIPSIS = "..."
+CACHE_SIZE = 48
+
+_FIRST = 32
+_LAST = 126
+
+_advances = {}   # font -> bytearray of ASCII advances
+_other = {}      # font -> advance for glyphs outside the table / missing
+_cache = {}      # (kind, text, width, font, max_lines) -> str or tuple
+_order = []      # cache keys, oldest first
+
+##########################
+#     Measuring          #
+##########################
+def _table(font):
+    table = _advances.get(font)
+    if table is None:
+        fallback = font.get_bounding_box()[0]
+        table = bytearray(_LAST - _FIRST + 1)
+        for i in range(len(table)):
+            glyph = font.get_glyph(_FIRST + i)
+            table[i] = glyph.shift_x if glyph is not None else fallback
+        _advances[font] = table
+        _other[font] = fallback
+    return table
+
+def char_width(c, font):
+    if font is None:
+        return 1
+    table = _table(font)
+    o = ord(c)
+    if _FIRST <= o <= _LAST:
+        return table[o - _FIRST]
+    glyph = font.get_glyph(o)
+    return glyph.shift_x if glyph is not None else _other[font]
+
+def measure(text, font):
+    """Advance width of text in pixels (cells when font is None)."""
+    if font is None:
+        return len(text)
+    table = _table(font)
+    w = 0
+    for c in text:
+        o = ord(c)
+        if _FIRST <= o <= _LAST:
+            w += table[o - _FIRST]
+        else:
+            w += char_width(c, font)
+    return w
+
+def _prefix(text, width, font):
+    # Longest prefix of text no wider than width
+    w = 0
+    for i in range(len(text)):
+        w += char_width(text[i], font)
+        if w > width:
+            return text[:i]
+    return text
+
+######################
+#     Cache          #
+######################
+def _cached(key):
+    return _cache.get(key)
+
+def _store(key, value):
+    if len(_order) >= CACHE_SIZE:
+        del _cache[_order.pop(0)]
+    _cache[key] = value
+    _order.append(key)
+    return value
+
+def clear_cache():
+    _cache.clear()
+    _order.clear()
+
+#######################
+#     Layout          #
+#######################
+def fit(text, width, font, ellipsis=ELLIPSIS):
+    """text if it fits in width, else its longest prefix plus ellipsis."""
+    text = str(text)
+    key = ("f", text, width, font, ellipsis)
+    hit = _cached(key)
+    if hit is not None:
+        return hit
+    if measure(text, font) <= width:
+        return _store(key, text)
+    room = width - measure(ellipsis, font)
+    if room <= 0:
+        return _store(key, _prefix(text, width, font))
+    return _store(key, _prefix(text, room, font).rstrip() + ellipsis)
+
+def wrap(text, width, font, max_lines=0):
+    """
+    Word-wrap text into lines no wider than width; words longer than a line
+    are split. With max_lines, the last kept line ends in an ellipsis when
+    text was cut. Returns a tuple of lines (at least one).
+    """
+    text = str(text).strip()
+    key = ("w", text, width, font, max_lines)
+    hit = _cached(key)
+    if hit is not None:
+        return hit
+
+    space = char_width(" ", font)
+    lines = []
+    line = ""
+    line_w = 0
+    for word in text.split(" "):
+        if not word:
+            continue
+        word_w = measure(word, font)
+
+        # Hard-split a word wider than a whole line
+        while word_w > width:
+            if line:
+                lines.append(line)
+                line, line_w = "", 0
+            head = _prefix(word, width, font) or word[0]
+            lines.append(head)
+            word = word[len(head):]
+            word_w = measure(word, font)
+        if not word:
+            continue
+
+        if not line:
+            line, line_w = word, word_w
+        elif line_w + space + word_w <= width:
+            line = line + " " + word
+            line_w += space + word_w
+        else:
+            lines.append(line)
+            line, line_w = word, word_w
+    if line or not lines:
+        lines.append(line)
+
+    if max_lines and len(lines) > max_lines:
+        rest = " ".join(lines[max_lines - 1:])
+        lines = lines[:max_lines - 1] + [fit(rest, width, font)]
+    return _store(key, tuple(lines))
+
+#######################
+#     Marquee         #
+#######################
+class Marquee:
+    """
+    Scroll offset for a line `overflow` units wider than its box: hold at
+    the start, move at `speed` units per second, hold at the end, repeat.
+    Time based, so a slow loop pass skips ahead instead of lagging.
+    """
+
+    def __init__(self, overflow, speed=24, hold_ms=1000, now=None):
+        self.overflow = max(0, overflow)
+        self.speed = max(1, speed)
+        self.hold_ms = hold_ms
+        self._scroll_ms = self.overflow * 1000 // self.speed
+        self.restart(now)
+
+    def restart(self, now=None):
+        self._t0 = ticks_ms() if now is None else now
+
+    def offset(self, now=None):
+        if not self.overflow:
+            return 0
+        if now is None:
+            now = ticks_ms()
+        t = ticks_diff(now, self._t0) % (2 * self.hold_ms + self._scroll_ms)
+        if t < self.hold_ms:
+            return 0
+        t -= self.hold_ms
+        if t >= self._scroll_ms:
+            return self.overflow
+        return t * self.speed // 1000
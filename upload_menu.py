@@ -1,29 +1,309 @@
-import os
-import yaml
+# upload_menu.py (host side, CPython)
+# Validate, minify and delta-sync the project onto a CIRCUITPY drive.
+#
+#   python upload_menu.py /media/CIRCUITPY            # deploy changed files
+#   python upload_menu.py /media/CIRCUITPY --dry-run  # report only
+#   python upload_menu.py --check                     # validate menus only
+#
+# Menus may be authored as YAML or JSON in ./menus; YAML is converted in
+# memory. JSON is minified on the way out, every asset is hashed, and only
+# files whose bytes differ from the target are written. All writes happen in
+# one tight batch so CircuitPython sees a single auto-reload instead of one
+# per copied file.
+
+import argparse
+import hashlib
 import json
+import os
+import sys
+
+import payload_pack
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+MENU_DIR = "menus"
+OPTION_TYPES = ("menu", "run", "message", "command", "action", "custom")
+
+# (source directory, suffixes) copied to the same relative path on the drive
+ASSET_DIRS = [
+    (".", (".py", ".bmp", ".toml")),
+    ("menus", (".json", ".yaml", ".yml")),
+    ("sprites", (".json",)),
+    ("bitmaps", (".bmp",)),
+    ("payloads", (".dd",)),
+    ("ir", (".bin",)),
+]
+ASSET_FILES = ["config.json"]
+LIB_DIR = "lib"
+
+# Host-only tools never go to the device
+HOST_ONLY = {"upload_menu.py", "ir_codes.py", "payload_pack.py", "mirror_viewer.py", "build_bundle.py",
+             "ducky_sim.py"}
+
+class MenuError(ValueError):
+    pass
+
+#####################################
+#     YAML / JSON menu handling     #
+#####################################
+def load_menu_source(path):
+    with open(path, "r") as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise MenuError(f"{path}: PyYAML is required for YAML menus")
+            try:
+                return yaml.safe_load(f)
+            except yaml.YAMLError as e:
+                raise MenuError(f"{path}: {e}")
+        try:
+            return json.load(f)
+        except ValueError as e:
+            raise MenuError(f"{path}: {e}")
+
+def validate_menu_data(data, fname):
+    """Check one menu file against the shape menu_loader/Menu expect."""
+    errors = []
+    if not isinstance(data, dict) or not isinstance(data.get("menus"), list):
+        return [f"{fname}: top level must be an object with a 'menus' list"]
+
+    for m_i, menu in enumerate(data["menus"]):
+        where = f"{fname}: menus[{m_i}]"
+        if not isinstance(menu, dict):
+            errors.append(f"{where}: must be an object")
+            continue
+        title = menu.get("title")
+        if not isinstance(title, str) or not title:
+            errors.append(f"{where}: missing 'title'")
+        else:
+            where = f"{fname}: '{title}'"
+        options = menu.get("options", [])
+        if not isinstance(options, list):
+            errors.append(f"{where}: 'options' must be a list")
+            continue
+        for o_i, opt in enumerate(options):
+            owhere = f"{where} options[{o_i}]"
+            if not isinstance(opt, dict):
+                errors.append(f"{owhere}: must be an object")
+                continue
+            if not isinstance(opt.get("name"), str):
+                errors.append(f"{owhere}: missing 'name'")
+            otype = opt.get("type", "action")
+            if otype not in OPTION_TYPES:
+                errors.append(f"{owhere}: unknown type '{otype}'")
+            if "action" in opt and not isinstance(opt["action"], str):
+                errors.append(f"{owhere}: 'action' must be a string")
+    return errors
+
+def validate_menus(menu_files, payload_dir=None):
+    """
+    menu_files: {fname: data}. Cross-checks links and payload names.
+    Returns (errors, warnings); warnings don't stop a deploy.
+    """
+    errors = []
+    warnings = []
+    titles = set()
+    for fname, data in menu_files.items():
+        errors.extend(validate_menu_data(data, fname))
+        if isinstance(data, dict) and isinstance(data.get("menus"), list):
+            for menu in data["menus"]:
+                if isinstance(menu, dict) and menu.get("title"):
+                    titles.add(menu["title"])
+    if errors:
+        return errors, warnings
+
+    if "main_menu.json" in menu_files and "Main Menu" not in titles:
+        errors.append("main_menu.json: no 'Main Menu' title")
+
+    for fname, data in menu_files.items():
+        for menu in data["menus"]:
+            for opt in menu.get("options", []):
+                otype = opt.get("type", "action")
+                action = opt.get("action") or ""
+                if otype == "menu" and not action.startswith("run:") and action not in titles:
+                    # A dangling submenu link is ignored by Menu.select
+                    warnings.append(f"{fname}: '{opt.get('name')}' links to unknown menu '{action}'")
+                if action.startswith("run:") and payload_dir:
+                    payload, _ = payload_pack.split_target(action[len("run:"):])
+                    if not os.path.exists(os.path.join(payload_dir, payload)):
+                        errors.append(f"{fname}: '{opt.get('name')}' runs missing payload '{payload}'")
+    return errors, warnings
+
+def minify_json(data):
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
 
-# Simulate the /menus/ directory
-menu_dir = "./menus"
-os.makedirs(menu_dir, exist_ok=True)
+#############################
+#     Asset collection      #
+#############################
+def collect_assets(src=SRC_DIR):
+    """
+    Return (assets, raw_sizes, errors, warnings). assets maps a
+    drive-relative path to the bytes that belong on the drive; raw_sizes
+    holds source sizes.
+    """
+    assets = {}
+    raw_sizes = {}
+    menu_files = {}
+    errors = []
 
-def convert_yaml_to_json(menu_dir):
-    converted_files = []
-    for fname in os.listdir(menu_dir):
-        if fname.endswith(".yaml") or fname.endswith(".yml"):
-            yaml_path = os.path.join(menu_dir, fname)
-            json_path = os.path.join(menu_dir, fname.rsplit(".", 1)[0] + ".json")
+    # Containers are packed for the link setting the board will run with
+    try:
+        with open(os.path.join(src, "config.json"), "r") as f:
+            lz = bool(json.load(f).get("payload_compress"))
+    except (OSError, ValueError):
+        lz = False
 
-            with open(yaml_path, "r") as yf:
+    for rel_dir, suffixes in ASSET_DIRS:
+        d = os.path.join(src, rel_dir)
+        if not os.path.isdir(d):
+            continue
+        for name in sorted(os.listdir(d)):
+            path = os.path.join(d, name)
+            if not os.path.isfile(path) or not name.endswith(suffixes):
+                continue
+            if rel_dir == "." and name in HOST_ONLY:
+                continue
+            rel = name if rel_dir == "." else f"{rel_dir}/{name}"
+
+            if rel_dir == MENU_DIR:
                 try:
-                    data = yaml.safe_load(yf)
-                    with open(json_path, "w") as jf:
-                        json.dump(data, jf, indent=2)
-                    converted_files.append(json_path)
-                except yaml.YAMLError as e:
-                    print(f"Error parsing {fname}: {e}")
-    return converted_files
-
-# Run the converter (simulate once for now)
-converted = convert_yaml_to_json(menu_dir)
-converted
+                    data = load_menu_source(path)
+                except MenuError as e:
+                    errors.append(str(e))
+                    continue
+                rel = f"{MENU_DIR}/{name.rsplit('.', 1)[0]}.json"
+                menu_files[rel.split("/", 1)[1]] = data
+                assets[rel] = minify_json(data)
+            elif name.endswith(".json"):
+                with open(path, "r") as f:
+                    assets[rel] = minify_json(json.load(f))
+            else:
+                with open(path, "rb") as f:
+                    assets[rel] = f.read()
+                if name.endswith(".dd"):
+                    # Pre-normalized container for the zero-copy send path
+                    packed = payload_pack.pack_payload(assets[rel].decode("utf-8"), lz)
+                    assets[payload_pack.container_path(rel)] = packed
+                    raw_sizes[payload_pack.container_path(rel)] = len(packed)
+            raw_sizes[rel] = raw_sizes.get(rel, 0) + os.path.getsize(path)
+
+    for rel in ASSET_FILES:
+        path = os.path.join(src, rel)
+        if os.path.isfile(path):
+            with open(path, "r") as f:
+                assets[rel] = minify_json(json.load(f))
+            raw_sizes[rel] = os.path.getsize(path)
+
+    lib = os.path.join(src, LIB_DIR)
+    for root, dirs, names in os.walk(lib):
+        dirs[:] = [d for d in dirs if d != "__pycache__"]
+        for name in sorted(names):
+            if name.endswith(".pyc"):
+                continue
+            path = os.path.join(root, name)
+            rel = os.path.relpath(path, src).replace(os.sep, "/")
+            with open(path, "rb") as f:
+                assets[rel] = f.read()
+            raw_sizes[rel] = os.path.getsize(path)
+
+    menu_errors, warnings = validate_menus(menu_files, os.path.join(src, "payloads"))
+    errors.extend(menu_errors)
+    return assets, raw_sizes, errors, warnings
+
+def file_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+def plan_sync(assets, target):
+    """Return the sorted list of drive-relative paths that need writing."""
+    changed = []
+    for rel, data in assets.items():
+        dest = os.path.join(target, rel)
+        try:
+            with open(dest, "rb") as f:
+                same = file_hash(f.read()) == file_hash(data)
+        except OSError:
+            same = False
+        if not same:
+            changed.append(rel)
+    return sorted(changed)
+
+def write_batch(assets, changed, target):
+    # Write to a temp name and rename so a half-written file never runs
+    for rel in changed:
+        dest = os.path.join(target, rel)
+        os.makedirs(os.path.dirname(dest) or target, exist_ok=True)
+        tmp = dest + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(assets[rel])
+        os.replace(tmp, dest)
+
+def sync(target, src=SRC_DIR, dry_run=False, out=sys.stdout):
+    """Validate, minify and copy changed files. Returns a report dict."""
+    assets, raw_sizes, errors, warnings = collect_assets(src)
+    if errors:
+        raise MenuError("\n".join(errors))
+    for w in warnings:
+        print(f"[WARN] {w}", file=out)
+
+    changed = plan_sync(assets, target)
+    raw_total = sum(raw_sizes.values())
+    out_total = sum(len(b) for b in assets.values())
+    written = sum(len(assets[rel]) for rel in changed)
+
+    report = {
+        "files": len(assets),
+        "changed": changed,
+        "bytes_written": written,
+        "bytes_saved_minify": raw_total - out_total,
+        "bytes_saved_skip": out_total - written,
+        # Copying the changed files one by one costs an auto-reload each
+        "reloads_avoided": max(len(changed) - 1, 0),
+        "warnings": warnings,
+    }
+
+    if not dry_run and changed:
+        write_batch(assets, changed, target)
+
+    verb = "would write" if dry_run else "wrote"
+    for rel in changed:
+        print(f"  {verb} {rel} ({len(assets[rel])} bytes)", file=out)
+    print(
+        f"{len(changed)}/{report['files']} files {verb}, {written} bytes; "
+        f"saved {report['bytes_saved_minify']} by minify, "
+        f"{report['bytes_saved_skip']} by skipping unchanged; "
+        f"{report['reloads_avoided']} reloads avoided",
+        file=out,
+    )
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate and delta-sync Pico Pebble files to a CIRCUITPY drive")
+    parser.add_argument("target", nargs="?", help="mounted CIRCUITPY drive (or any directory)")
+    parser.add_argument("--src", default=SRC_DIR, help="project directory (default: this script's directory)")
+    parser.add_argument("--dry-run", action="store_true", help="report what would change without writing")
+    parser.add_argument("--check", action="store_true", help="only validate menus")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        _, _, errors, warnings = collect_assets(args.src)
+        for w in warnings:
+            print(f"[WARN] {w}")
+        for e in errors:
+            print(f"[ERR] {e}")
+        return 1 if errors else 0
+
+    if not args.target:
+        parser.error("target is required unless --check is given")
+    if not os.path.isdir(args.target):
+        parser.error(f"{args.target} is not a directory")
+
+    try:
+        sync(args.target, src=args.src, dry_run=args.dry_run)
+    except MenuError as e:
+        print(f"[ERR] {e}")
+        return 1
+    return 0
 
+if __name__ == "__main__":
+    sys.exit(main())